@@ -31,8 +31,10 @@ from .queue import Queue
 from .request import Request, Subscribe, Unsubscribe, Get, Put, Post
 from .response import Response, Delta, Update, Return, Error
 from .serializable import Serializable, deserialize_object, serialize_object, \
-    json_decode, json_encode, snake_to_camel, camel_to_title
+    json_decode, json_encode, snake_to_camel, camel_to_title, binary_decode, \
+    binary_encode
 from .spawned import Spawned
+from .spawnpool import SpawnPool, DEFAULT_POOL, HOOK_POOL, COMMS_POOL
 from .stringarray import StringArray
 from .table import Table
 from .timestamp import TimeStamp
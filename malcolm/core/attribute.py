@@ -1,9 +1,13 @@
-from .view import View
+from .attributemodel import AttributeModel
+from .model import Model
+from .view import View, make_subscribe_method
 
 
 class Attribute(View):
     """Represents a value with type information that may be backed elsewhere"""
 
+    _endpoints = tuple(AttributeModel.endpoints)
+
     def __init__(self, controller, context, data):
         self._do_init(controller, context, data)
 
@@ -11,9 +15,25 @@ class Attribute(View):
     def meta(self):
         return self._controller.make_view(self._context, self._data, "meta")
 
+    @property
+    def snapshot(self):
+        """The latest AttributeSnapshot of value, alarm and timeStamp. This
+        is read without taking the controller's lock, so works from any
+        thread without spawning"""
+        return self._data.snapshot
+
+    def _snapshot_view(self, index, endpoint):
+        data = self._data.snapshot[index]
+        if isinstance(data, (Model, dict, list)):
+            # Needs wrapping in views, so must be done by the controller
+            return self._controller.make_view(
+                self._context, self._data, endpoint)
+        else:
+            return data
+
     @property
     def value(self):
-        return self._controller.make_view(self._context, self._data, "value")
+        return self._snapshot_view(0, "value")
 
     def put_value(self, value, timeout=None):
         """Put a value to the Attribute and wait for completion"""
@@ -25,12 +45,15 @@ class Attribute(View):
 
     @property
     def alarm(self):
-        return self._controller.make_view(self._context, self._data, "alarm")
+        return self._snapshot_view(1, "alarm")
 
     @property
     def timeStamp(self):
-        return self._controller.make_view(
-            self._context, self._data, "timeStamp")
+        return self._snapshot_view(2, "timeStamp")
 
     def __repr__(self):
         return "<%s value=%r>" % (self.__class__.__name__, self.value)
+
+
+for endpoint in Attribute._endpoints:
+    make_subscribe_method(Attribute, endpoint)
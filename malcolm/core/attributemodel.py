@@ -1,13 +1,22 @@
+from collections import namedtuple
+
 from .model import Model
 from .serializable import deserialize_object
 from .alarm import Alarm
 from .timestamp import TimeStamp
 
 
+# The value, alarm and timeStamp of an AttributeModel at one instant
+AttributeSnapshot = namedtuple("AttributeSnapshot", "value,alarm,timeStamp")
+
+
 class AttributeModel(Model):
     """Data Model for an Attribute"""
 
     endpoints = ["meta", "value", "alarm", "timeStamp"]
+    #: The latest AttributeSnapshot. It is replaced rather than modified, so
+    #: can be read from any thread without taking the controller's lock
+    snapshot = AttributeSnapshot(None, None, None)
 
     def __init__(self, meta, value=None, alarm=None, timeStamp=None):
         #: The `VMeta` for validating value sets
@@ -64,6 +73,13 @@ class AttributeModel(Model):
             self.notifier.add_squashed_change(self.path + ["alarm"], alarm)
             self.timeStamp = ts
             self.notifier.add_squashed_change(self.path + ["timeStamp"], ts)
+            self.snapshot = AttributeSnapshot(value, alarm, ts)
+
+    def set_endpoint_data(self, name, value):
+        value = super(AttributeModel, self).set_endpoint_data(name, value)
+        if name in AttributeSnapshot._fields:
+            self.snapshot = self.snapshot._replace(**{name: value})
+        return value
 
     def set_alarm(self, alarm=None):
             """Set the Alarm"""
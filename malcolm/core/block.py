@@ -1,29 +1,49 @@
+from .attribute import Attribute
+from .attributemodel import AttributeModel
 from .methodmodel import MethodModel
-from .view import View, make_get_property
+from .view import View, get_view_subclass, make_get_property, \
+    make_subscribe_method
 
 
 class Block(View):
     """Object consisting of a number of Attributes and Methods"""
+    _endpoints_version = None
+
+    def _do_init(self, controller, context, data):
+        super(Block, self)._do_init(controller, context, data)
+        object.__setattr__(
+            self, "_endpoints_version", data.endpoints_version)
+
+    def endpoints_changed(self):
+        """Whether endpoints have been added, replaced or removed from the
+        block since this view was made"""
+        return self._endpoints_version != self._data.endpoints_version
+
     @property
     def mri(self):
         return self._data.path[0]
 
-    def _prepare_endpoints(self, data):
+    @classmethod
+    def _make_endpoint_members(cls, data):
         for endpoint in data:
-            if isinstance(data[endpoint], MethodModel):
-                # Add _async versions of method
-                self._make_async_method(endpoint)
-        return super(Block, self)._prepare_endpoints(data)
-
-    def _make_async_method(self, endpoint):
-        def post_async(*args, **kwargs):
-            child = getattr(self, endpoint)
-            return child.post_async(*args, **kwargs)
+            child = data[endpoint]
+            if isinstance(child, AttributeModel):
+                make_attribute_property(cls, endpoint)
+            else:
+                make_get_property(cls, endpoint)
+                if isinstance(child, MethodModel):
+                    # Add _async versions of method
+                    make_async_method(cls, endpoint)
+            make_subscribe_method(cls, endpoint)
 
-        object.__setattr__(self, "%s_async" % endpoint, post_async)
+    @classmethod
+    def _subclass_key(cls, data):
+        # Attributes and Methods need different members
+        return tuple((endpoint, _endpoint_kind(data[endpoint]))
+                     for endpoint in data)
 
     def put_attribute_values_async(self, params):
-        futures = []
+        path_values = []
         if type(params) is dict:
             # If we have a plain dictionary, then sort items
             items = sorted(params.items())
@@ -33,9 +53,9 @@ class Block(View):
         for attr, value in items:
             assert hasattr(self, attr), \
                 "Block does not have attribute %s" % attr
-            future = self._context.put_async(
-                self._data.path + [attr, "value"], value)
-            futures.append(future)
+            path_values.append((self._data.path + [attr, "value"], value))
+        # Send them all to the child controller as a single batch
+        futures = self._context.put_many_async(path_values)
         return futures
 
     def put_attribute_values(self, params, timeout=None):
@@ -56,14 +76,37 @@ class Block(View):
         self._context.wait_all_futures(futures, timeout)
 
 
-def make_block_view(controller, context, data):
-    class BlockSubclass(Block):
-        def __init__(self):
-            self._do_init(controller, context, data)
+def _endpoint_kind(child):
+    if isinstance(child, AttributeModel):
+        return AttributeModel
+    elif isinstance(child, MethodModel):
+        return MethodModel
+
+
+def make_attribute_property(cls, endpoint):
+    @property
+    def make_attribute_view(self):
+        # Endpoints are replaced with a single setattr, so we can get the
+        # current AttributeModel without the controller's lock
+        child = getattr(self._data, endpoint, None)
+        if isinstance(child, AttributeModel):
+            return Attribute(self._controller, self._context, child)
+        else:
+            # Removed or changed type since this class was made
+            return self._controller.make_view(
+                self._context, self._data, endpoint)
+
+    setattr(cls, endpoint, make_attribute_view)
+
 
-    for endpoint in data:
-        # make properties for the endpoints we know about
-        make_get_property(BlockSubclass, endpoint)
+def make_async_method(cls, endpoint):
+    def post_async(self, *args, **kwargs):
+        child = getattr(self, endpoint)
+        return child.post_async(*args, **kwargs)
 
-    block = BlockSubclass()
-    return block
\ No newline at end of file
+    setattr(cls, "%s_async" % endpoint, post_async)
+
+
+def make_block_view(controller, context, data):
+    block = get_view_subclass(Block, data)(controller, context, data)
+    return block
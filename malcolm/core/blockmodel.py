@@ -14,6 +14,9 @@ class BlockModel(Model):
     def __init__(self):
         # TODO: how do we take children while preserving order?
         self.endpoints = []
+        # Incremented whenever an endpoint is added, replaced or removed, so
+        # that cached Block views know when they need remaking
+        self.endpoints_version = 0
         self.meta = self.set_endpoint_data("meta", BlockMeta())
 
     def set_notifier_path(self, notifier, path):
@@ -35,6 +38,7 @@ class BlockModel(Model):
                 self.endpoints.append(name)
             value.set_notifier_path(self.notifier, self.path + [name])
             setattr(self, name, value)
+            self.endpoints_version += 1
             # Tell the notifier what changed
             self.notifier.add_squashed_change(self.path + [name], value)
             self._update_fields()
@@ -48,5 +52,6 @@ class BlockModel(Model):
             self[name].set_notifier_path(Model.notifier, ())
             self.endpoints.remove(name)
             delattr(self, name)
+            self.endpoints_version += 1
             self._update_fields()
             self.notifier.add_squashed_change(self.path + [name])
@@ -1,7 +1,7 @@
 import weakref
 import time
 
-from malcolm.compat import maybe_import_cothread
+from malcolm.compat import maybe_import_cothread, OrderedDict
 from .future import Future
 from .loggable import Loggable
 from .request import Put, Post, Subscribe, Unsubscribe
@@ -54,6 +54,7 @@ class Context(Loggable):
         self._subscriptions = {}  # dict {int id: (func, args)}
         self._requests = {}  # dict {Future: Request}
         self._pending_unsubscribes = {}  # dict {Future: Subscribe}
+        self._block_views = {}  # dict {mri: Block}
         # If not None, wait for this before listening to STOPs
         self._sentinel_stop = None
         self._cothread = maybe_import_cothread()
@@ -79,7 +80,12 @@ class Context(Loggable):
             Block: The block we control
         """
         controller = self.get_controller(mri)
-        block = controller.make_view(weakref.proxy(self))
+        block = self._block_views.get(mri, None)
+        # Reuse the last view we made unless the block has changed shape
+        if block is None or block._controller is not controller or \
+                block.endpoints_changed():
+            block = controller.make_view(weakref.proxy(self))
+            self._block_views[mri] = block
         return block
 
     def _get_next_id(self):
@@ -96,6 +102,30 @@ class Context(Loggable):
         """
         self._notify_dispatch_request = notify_dispatch_request
 
+    def _dispatch_requests(self, requests):
+        """Dispatch requests, sending all of those for the same controller to
+        it in a single call, then yield once"""
+        futures = []
+        # {controller: [request]}
+        batches = OrderedDict()
+        for request in requests:
+            future = Future(weakref.proxy(self))
+            self._futures[request.id] = future
+            self._requests[future] = request
+            futures.append(future)
+            controller = self.get_controller(request.path[0])
+            batches.setdefault(controller, []).append(request)
+            if self._notify_dispatch_request:
+                self._notify_dispatch_request(request)
+        for controller, batch in batches.items():
+            controller.handle_requests(batch)
+        # Yield control to allow the requests to be handled
+        if self._cothread:
+            self._cothread.Yield()
+        else:
+            time.sleep(0)
+        return futures
+
     def _dispatch_request(self, request):
         future = Future(weakref.proxy(self))
         self._futures[request.id] = future
@@ -146,6 +176,21 @@ class Context(Loggable):
         future = self._dispatch_request(request)
         return future
 
+    def put_many_async(self, path_values):
+        """Puts a number of values to paths and returns immediately. Puts to
+        the same Block are handled in the order given in a single spawn
+
+        Args:
+            path_values (list): [(path, value)] for each put
+
+        Returns:
+             list: [Future] which will resolve to the result of each put
+        """
+        requests = [Put(self._get_next_id(), path, value, self._q.put)
+                    for path, value in path_values]
+        futures = self._dispatch_requests(requests)
+        return futures
+
     def post(self, path, params=None, timeout=None):
         """Synchronously calls a method
 
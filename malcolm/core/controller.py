@@ -3,14 +3,16 @@ import inspect
 import weakref
 import time
 
-from malcolm.compat import OrderedDict
+from malcolm.compat import OrderedDict, maybe_import_cothread, \
+    get_thread_ident
 from .alarm import Alarm
 from .attribute import Attribute
 from .attributemodel import AttributeModel
 from .block import Block, make_block_view
 from .blockmodel import BlockModel
 from .context import Context
-from .errors import UnexpectedError, AbortedError, WrongThreadError
+from .errors import UnexpectedError, AbortedError, WrongThreadError, \
+    TimeoutError
 from .healthmeta import HealthMeta
 from .hook import Hook, get_hook_decorated
 from .loggable import Loggable
@@ -22,15 +24,46 @@ from .notifier import Notifier
 from .request import Get, Subscribe, Unsubscribe, Put, Post
 from .queue import Queue
 from .rlock import RLock
+from .spawnpool import DEFAULT_POOL
 from .serializable import serialize_object, deserialize_object, camel_to_title
 from .view import make_view
 
 
 ABORT_TIMEOUT = 5.0
 
+# How long the request worker waits for more requests before it exits
+REQUEST_WORKER_IDLE_TIMEOUT = 0.5
+
+# How often the request worker reports its batch size and latency
+REQUEST_STATS_PERIOD = 1.0
+
+
+class QueuedRequests(object):
+    """A batch of Gets, Subscribes and Unsubscribes waiting for the request
+    worker. Can be waited on like the Spawned that handle_requests would
+    otherwise return"""
+
+    def __init__(self, requests):
+        self.requests = requests
+        self.queued = time.time()
+        self._handled = Queue()
+
+    def set_handled(self):
+        self._handled.put(None)
+
+    def wait(self, timeout=None):
+        # Put the token back so others waiting can see it too
+        self._handled.put(self._handled.get(timeout))
+
 
 class Controller(Loggable):
     use_cothread = True
+    # Whether to handle Gets, Subscribes and Unsubscribes in a single
+    # long-lived cothread rather than spawning for every batch. Puts and Posts
+    # can block, so are always spawned. Only works if use_cothread
+    use_request_worker = False
+    # The name of the Process thread pool to spawn in if not use_cothread
+    spawn_pool = DEFAULT_POOL
 
     # Attributes
     health = None
@@ -40,6 +73,11 @@ class Controller(Loggable):
         self.process = process
         self.mri = mri
         self._request_queue = Queue()
+        # QueuedRequests waiting for the request worker
+        self._worker_queue = Queue()
+        self._cothread = maybe_import_cothread()
+        # The Spawned request worker, if it is running
+        self._request_worker = None
         # {Part: Alarm} for current faults
         self._faults = {}
         # {Hook: name}
@@ -141,7 +179,8 @@ class Controller(Loggable):
 
     def spawn(self, func, *args, **kwargs):
         """Spawn a function in the right thread"""
-        spawned = self.process.spawn(func, args, kwargs, self.use_cothread)
+        spawned = self.process.spawn(
+            func, args, kwargs, self.use_cothread, self.spawn_pool)
         return spawned
 
     @property
@@ -231,34 +270,141 @@ class Controller(Loggable):
 
     def handle_request(self, request):
         """Spawn a new thread that handles Request"""
+        return self.handle_requests([request])[0]
+
+    def handle_requests(self, requests):
+        """Handle a list of Requests. The Puts are handled in order in a single
+        spawn, taking the lock once and releasing it around each put function
+        and while sending each response. Posts can block for a long time, so
+        each gets its own spawn. The rest are handled in order in a single
+        spawn that takes the lock once for all of them
+
+        Returns:
+            list: The Spawned handling each request, in the same order
+        """
+        spawned = []
+        puts = []
+        batch = []
+        for request in requests:
+            if isinstance(request, Post):
+                spawned.append(self._spawn_for_requests([request]))
+            elif isinstance(request, Put):
+                puts.append(request)
+                spawned.append(puts)
+            else:
+                batch.append(request)
+                spawned.append(batch)
+        if puts:
+            puts_spawned = self._spawn_for_requests(puts)
+            spawned = [puts_spawned if s is puts else s for s in spawned]
+        if batch:
+            if self.use_request_worker and self.use_cothread and \
+                    self._cothread:
+                batch_spawned = QueuedRequests(batch)
+                if self._cothread.scheduler_thread_id == get_thread_ident():
+                    self._queue_for_request_worker(batch_spawned)
+                else:
+                    self._cothread.Callback(
+                        self._queue_for_request_worker, batch_spawned)
+            else:
+                batch_spawned = self._spawn_for_requests(batch)
+            spawned = [batch_spawned if s is batch else s for s in spawned]
+        return spawned
+
+    def _spawn_for_requests(self, requests):
         # Put data on the queue, so if spawns are handled out of order we
         # still get the most up to date data
-        self._request_queue.put(request)
-        return self.spawn(self._handle_request)
+        self._request_queue.put(requests)
+        return self.spawn(self._handle_requests)
+
+    def _queue_for_request_worker(self, queued):
+        """Called in cothread's thread, so can't race with the worker
+        deciding to exit"""
+        self._worker_queue.put(queued)
+        if self._request_worker is None:
+            self._request_worker = self.spawn(self._request_worker_loop)
+
+    def _request_worker_loop(self):
+        max_batch_size = 0
+        max_latency = 0.0
+        next_stats = time.time() + REQUEST_STATS_PERIOD
+        while True:
+            try:
+                queued = [self._worker_queue.get(
+                    timeout=REQUEST_WORKER_IDLE_TIMEOUT)]
+            except TimeoutError:
+                # Nothing to do, exit until the next request comes in
+                self._request_worker = None
+                self.update_request_stats(max_batch_size, max_latency)
+                return
+            # Take everything else that is waiting
+            while True:
+                try:
+                    queued.append(self._worker_queue.get(timeout=0))
+                except TimeoutError:
+                    break
+            requests = []
+            for q in queued:
+                requests += q.requests
+            start = time.time()
+            max_batch_size = max(max_batch_size, len(requests))
+            max_latency = max(max_latency, start - queued[0].queued)
+            self._service_requests(requests)
+            for q in queued:
+                q.set_handled()
+            if start > next_stats:
+                self.update_request_stats(max_batch_size, max_latency)
+                max_batch_size = 0
+                max_latency = 0.0
+                next_stats = start + REQUEST_STATS_PERIOD
+
+    def update_request_stats(self, batch_size, latency):
+        """Called by the request worker every REQUEST_STATS_PERIOD when busy,
+        and when it goes idle
+
+        Args:
+            batch_size (int): Max number of requests handled in one batch
+            latency (float): Max time in seconds a request waited before it
+                was handled
+        """
+        pass
 
-    def _handle_request(self):
+    def _handle_requests(self):
+        # We spawned just after putting on the queue, so there is definitely
+        # something there
+        requests = self._request_queue.get(timeout=0)
+        self._service_requests(requests)
+
+    def _service_requests(self, requests):
         responses = []
         with self._lock:
-            # We spawned just above, so there is definitely something on the
-            # queue
-            request = self._request_queue.get(timeout=0)
-            # self.log.debug(request)
-            if isinstance(request, Get):
-                handler = self._handle_get
-            elif isinstance(request, Put):
-                handler = self._handle_put
-            elif isinstance(request, Post):
-                handler = self._handle_post
-            elif isinstance(request, Subscribe):
-                handler = self._notifier.handle_subscribe
-            elif isinstance(request, Unsubscribe):
-                handler = self._notifier.handle_unsubscribe
-            else:
-                raise UnexpectedError("Unexpected request %s", request)
-            try:
-                responses += handler(request)
-            except Exception as e:
-                responses.append(request.error_response(e))
+            for request in requests:
+                # self.log.debug(request)
+                if isinstance(request, Get):
+                    handler = self._handle_get
+                elif isinstance(request, Put):
+                    handler = self._handle_put
+                elif isinstance(request, Post):
+                    handler = self._handle_post
+                elif isinstance(request, Subscribe):
+                    handler = self._notifier.handle_subscribe
+                elif isinstance(request, Unsubscribe):
+                    handler = self._notifier.handle_unsubscribe
+                else:
+                    raise UnexpectedError("Unexpected request %s", request)
+                try:
+                    responses += handler(request)
+                except Exception as e:
+                    responses.append(request.error_response(e))
+                if isinstance(request, Put):
+                    # We already released the lock for the put function, so
+                    # don't make the caller wait for the rest of the batch
+                    with self.lock_released:
+                        self._send_responses(responses)
+                    responses = []
+        self._send_responses(responses)
+
+    def _send_responses(self, responses):
         for cb, response in responses:
             try:
                 cb(response)
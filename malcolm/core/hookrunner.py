@@ -1,6 +1,7 @@
 import logging
 
 from malcolm.core.errors import AbortedError
+from malcolm.core.spawnpool import HOOK_POOL
 
 
 # Create a module level logger
@@ -14,7 +15,10 @@ class HookRunner(object):
         self.func = func
         self.context = context
         self.args = args
-        self.spawned = self.part.spawn(self.func_result_on_queue)
+        # Hooks wait on each other, so keep them out of the default pool
+        self.spawned = self.part.process.spawn(
+            self.func_result_on_queue, (), {}, self.part.use_cothread,
+            HOOK_POOL)
 
     def func_result_on_queue(self):
         try:
@@ -1,9 +1,12 @@
-from .view import View
+from .methodmodel import MethodModel
+from .view import View, make_subscribe_method
 
 
 class Method(View):
     """Exposes a function with metadata for arguments and return values"""
 
+    _endpoints = tuple(MethodModel.endpoints)
+
     def __init__(self, controller, context, data):
         self._do_init(controller, context, data)
 
@@ -56,3 +59,7 @@ class Method(View):
     @property
     def returns(self):
         return self._controller.make_view(self._context, self._data, "returns")
+
+
+for endpoint in Method._endpoints:
+    make_subscribe_method(Method, endpoint)
@@ -78,14 +78,54 @@ class Notifier(Loggable):
         try:
             self._squashed_count -= 1
             if self._squashed_count == 0:
-                changes = self._squashed_changes
+                changes = self._squash_changes(self._squashed_changes)
                 self._squashed_changes = []
-                # TODO: squash intermediate changes here?
-                responses += self._tree.notify_changes(changes)
+                # Each changed object is serialized at most once per batch,
+                # however many nodes and subscribers need it
+                responses += self._tree.notify_changes(changes, {})
+                # Let comms share encodings of the same payload between
+                # subscribers to this batch
+                notify_batch = {}
+                for _, response in responses:
+                    response.notify_batch = notify_batch
         finally:
             self._lock.release()
             self._callback_responses(responses)
 
+    @staticmethod
+    def _squash_changes(changes):
+        """Remove changes that are superseded by another in the same batch.
+
+        A change is dropped if a later change has the same path, or if any
+        change has an ancestor path, as the ancestor's data will be serialized
+        after all the changes are made so already contains it
+
+        Args:
+            changes (list): [[path, optional data]] in the order they were made
+
+        Returns:
+            list: [[path, optional data]] of the changes that need notifying
+        """
+        if len(changes) < 2:
+            return changes
+        # {tuple(path): index of last change to that path}
+        last_indexes = {}
+        for i, change in enumerate(changes):
+            last_indexes[tuple(change[0])] = i
+        squashed = []
+        for i, change in enumerate(changes):
+            path = tuple(change[0])
+            if last_indexes[path] != i:
+                # Overwritten by a later change to the same path
+                continue
+            for j in range(len(path)):
+                if path[:j] in last_indexes:
+                    # An ancestor changed, so this is included in it
+                    break
+            else:
+                squashed.append(change)
+        return squashed
+
     def _callback_responses(self, responses):
         for cb, response in responses:
             try:
@@ -111,17 +151,22 @@ class NotifierNode(object):
         # object
         self.data = data
 
-    def notify_changes(self, changes):
+    def notify_changes(self, changes, serialized_cache=None):
         """Set our data and notify anyone listening
 
         Args:
             changes (list): [[path, optional data]] where path is the path to
                 what has changed, and data is the unserialized object that has
                 changed
+            serialized_cache (dict): {id(data): (data, serialized)} shared by
+                all nodes for this batch of changes, so that each object is
+                only serialized once however many subscribers there are
 
         Returns:
             list: [(callback, Response)] that need to be called
         """
+        if serialized_cache is None:
+            serialized_cache = {}
         ret = []
         child_changes = {}
         for change in changes:
@@ -130,22 +175,36 @@ class NotifierNode(object):
 
         # If we have update subscribers, serialize at this level
         if self.update_requests:
-            serialized = serialize_object(self.data)
+            serialized = self._serialize(self.data, serialized_cache)
             for request in self.update_requests:
                 ret.append(request.update_response(serialized))
 
         # If we have delta subscribers, serialize the changes
         if self.delta_requests:
             for change in changes:
-                change[-1] = serialize_object(change[-1])
+                if len(change) == 2:
+                    change[1] = self._serialize(change[1], serialized_cache)
             for request in self.delta_requests:
                 ret.append(request.delta_response(changes))
 
         # Now notify our children
         for name, child_changes in child_changes.items():
-            ret += self.children[name].notify_changes(child_changes)
+            ret += self.children[name].notify_changes(
+                child_changes, serialized_cache)
         return ret
 
+    @staticmethod
+    def _serialize(data, serialized_cache):
+        """Serialize data, reusing the result if already done this batch"""
+        key = id(data)
+        try:
+            return serialized_cache[key][1]
+        except KeyError:
+            serialized = serialize_object(data)
+            # Keep a reference to data so its id can't be reused this batch
+            serialized_cache[key] = (data, serialized)
+            return serialized
+
     def _add_child_change(self, change, child_changes):
         path = change[0]
         if path:
@@ -4,6 +4,7 @@ from .hook import get_hook_decorated
 from .hookrunner import HookRunner
 from .loggable import Loggable
 from .methodmodel import get_method_decorated, MethodModel
+from .spawnpool import DEFAULT_POOL
 
 
 class Part(Loggable):
@@ -14,6 +15,7 @@ class Part(Loggable):
             "subclass __init__ in %s?" % (name, self)
         self.controller = None
         self.use_cothread = False
+        self.spawn_pool = DEFAULT_POOL
         self.process = None
         self.name = name
         self.method_models = {}
@@ -33,10 +35,12 @@ class Part(Loggable):
         self.controller = controller
         self.process = controller.process
         self.use_cothread = controller.use_cothread
+        self.spawn_pool = controller.spawn_pool
 
     def spawn(self, func, *args, **kwargs):
         """Spawn a function in the right thread"""
-        spawned = self.process.spawn(func, args, kwargs, self.use_cothread)
+        spawned = self.process.spawn(
+            func, args, kwargs, self.use_cothread, self.spawn_pool)
         return spawned
 
     def update_part_health(self, alarm=None):
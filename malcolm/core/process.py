@@ -1,5 +1,5 @@
-from multiprocessing.pool import ThreadPool
 import inspect
+import threading
 
 from malcolm.compat import OrderedDict, maybe_import_cothread, \
     get_pool_num_threads
@@ -7,14 +7,11 @@ from .context import Context
 from .hook import Hook, get_hook_decorated
 from .loggable import Loggable
 from .spawned import Spawned
+from .spawnpool import SpawnPool, DEFAULT_POOL
 from .rlock import RLock
 from .errors import WrongThreadError
 
 
-# Clear spawned handles after how many spawns?
-SPAWN_CLEAR_COUNT = 1000
-
-
 class Process(Loggable):
     """Hosts a number of Controllers and provides spawn capabilities"""
 
@@ -38,9 +35,12 @@ class Process(Loggable):
         self._controllers = OrderedDict()  # mri -> Controller
         self._published = []  # [mri] for publishable controllers
         self.started = False
-        self._spawned = []
-        self._spawn_count = 0
-        self._thread_pool = None
+        self._spawned = set()
+        # Spawned remove themselves from pool threads, so this can't be the
+        # cothread aware self._lock
+        self._spawned_lock = threading.Lock()
+        self._pools = OrderedDict()  # name -> SpawnPool
+        self._pool_sizes = {}  # name -> num_threads
         self._lock = RLock()
         self._hooked_func_names = {}
         self._hook_names = {}
@@ -92,19 +92,43 @@ class Process(Loggable):
         assert self.started, "Process not started"
         # Allow every controller a chance to clean up
         self._run_hook(self.Halt, timeout=timeout)
-        for s in self._spawned:
+        with self._spawned_lock:
+            spawned = list(self._spawned)
+        for s in spawned:
             self.log.debug("Waiting for %s", s._function)
             s.wait(timeout=timeout)
-        self._spawned = []
+        with self._spawned_lock:
+            self._spawned = set()
         self._controllers = OrderedDict()
         self._published = []
         self.started = False
-        if self._thread_pool:
-            self._thread_pool.close()
-            self._thread_pool.join()
-            self._thread_pool = None
+        for pool in self._pools.values():
+            pool.close()
+        self._pools = OrderedDict()
+
+    def set_pool_size(self, pool, num_threads):
+        """Set the number of worker threads a named thread pool will have
+
+        Args:
+            pool (str): The name of the pool, like "comms" or "hooks"
+            num_threads (int): The number of worker threads
+        """
+        with self._lock:
+            assert pool not in self._pools, \
+                "Pool %r already running with %d threads" % (
+                    pool, self._pools[pool].num_threads)
+            self._pool_sizes[pool] = num_threads
 
-    def spawn(self, function, args, kwargs, use_cothread):
+    @property
+    def pools(self):
+        """The SpawnPools that have been started, in order of creation
+
+        Returns:
+            list: [SpawnPool]
+        """
+        return list(self._pools.values())
+
+    def spawn(self, function, args, kwargs, use_cothread, pool=DEFAULT_POOL):
         """Runs the function in a worker thread, returning a Result object
 
         Args:
@@ -112,13 +136,15 @@ class Process(Loggable):
             args: Positional arguments to run the function with
             kwargs: Keyword arguments to run the function with
             use_cothread (bool): Whether to try and run this as a cothread
+            pool (str): The name of the thread pool to run it in if it is
+                not run as a cothread
 
         Returns:
             Spawned: Something you can call wait(timeout) on to see when it's
                 finished executing
         """
         return self._call_in_right_thread(
-            self._spawn, function, args, kwargs, use_cothread)
+            self._spawn, function, args, kwargs, use_cothread, pool)
 
     def _call_in_right_thread(self, func, *args):
         try:
@@ -127,24 +153,37 @@ class Process(Loggable):
             # called from outside cothread's thread, spawn it again
             return self._cothread.CallbackResult(func, *args)
 
-    def _spawn(self, function, args, kwargs, use_cothread):
+    def _spawn(self, function, args, kwargs, use_cothread, pool):
         with self._lock:
             assert self.started, "Can't spawn before process started"
-            if self._thread_pool is None:
-                if not self._cothread or not use_cothread:
-                    self._thread_pool = ThreadPool(get_pool_num_threads())
+            if self._cothread and use_cothread:
+                thread_pool = None
+            else:
+                thread_pool = self._get_pool(pool)
             spawned = Spawned(
-                function, args, kwargs, use_cothread, self._thread_pool)
-            self._spawned.append(spawned)
-            self._spawn_count += 1
-            # Filter out things that are ready to avoid memory leaks
-            if self._spawn_count > SPAWN_CLEAR_COUNT:
-                self._clear_spawn_list()
+                function, args, kwargs, use_cothread, thread_pool,
+                self._forget_spawned)
+            with self._spawned_lock:
+                self._spawned.add(spawned)
+                # It may have finished before we added it, so remove it
+                if spawned.ready():
+                    self._spawned.discard(spawned)
         return spawned
 
-    def _clear_spawn_list(self):
-        self._spawn_count = 0
-        self._spawned = [s for s in self._spawned if not s.ready()]
+    def _forget_spawned(self, spawned):
+        """Called by a Spawned when it finishes, from whichever thread it ran
+        in"""
+        with self._spawned_lock:
+            self._spawned.discard(spawned)
+
+    def _get_pool(self, name):
+        try:
+            return self._pools[name]
+        except KeyError:
+            num_threads = self._pool_sizes.get(name, get_pool_num_threads())
+            pool = SpawnPool(name, num_threads)
+            self._pools[name] = pool
+            return pool
 
     def add_controller(self, mri, controller, publish=True, timeout=None):
         """Add a controller to be hosted by this process
@@ -88,6 +88,9 @@ class Update(Response):
     __slots__ = []
 
     value = None
+    # Shared by all Responses from the same Notifier batch, for comms to cache
+    # things like encoded payloads in
+    notify_batch = None
 
     def __init__(self, id=None, value=None):
         """
@@ -115,6 +118,9 @@ class Delta(Response):
     __slots__ = []
 
     changes = None
+    # Shared by all Responses from the same Notifier batch, for comms to cache
+    # things like encoded payloads in
+    notify_batch = None
 
     def __init__(self, id=None, changes=None):
         """
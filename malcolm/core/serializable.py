@@ -1,6 +1,7 @@
 import re
 import logging
 import json
+import struct
 
 import numpy as np
 
@@ -22,15 +23,108 @@ def json_decode(s):
     return o
 
 
+# Marker in the JSON header of a binary message that stands for an ndarray
+NDARRAY_TYPEID = "malcolm:core/NDArrayBuffer:1.0"
+
+# Array buffers in a binary message start on multiples of this
+BINARY_ALIGNMENT = 8
+
+# dtype.kind of arrays that can be sent as raw bytes
+BINARY_KINDS = "biuf"
+
+
+def _aligned(n):
+    return (n + BINARY_ALIGNMENT - 1) // BINARY_ALIGNMENT * BINARY_ALIGNMENT
+
+
+def binary_encode(o):
+    """Encode an object into a binary message. This is a JSON header with
+    any numeric numpy arrays replaced by a marker, followed by the raw bytes
+    of each array. The layout is:
+
+    - uint32 little endian length of the (space padded) JSON header
+    - UTF-8 JSON header
+    - each array's bytes, starting a multiple of BINARY_ALIGNMENT bytes from
+      the start of the message
+
+    Args:
+        o: The object to encode
+
+    Returns:
+        bytes: The encoded message
+    """
+    arrays = []
+    offsets = [0]
+
+    def hook(x):
+        if isinstance(x, np.ndarray) and x.dtype.kind in BINARY_KINDS:
+            x = np.ascontiguousarray(x)
+            d = OrderedDict()
+            d["typeid"] = NDARRAY_TYPEID
+            d["dtype"] = x.dtype.str
+            d["shape"] = list(x.shape)
+            d["offset"] = offsets[-1]
+            arrays.append(x)
+            offsets.append(_aligned(offsets[-1] + x.nbytes))
+            return d
+        else:
+            return serialize_hook(x)
+
+    header = json.dumps(o, default=hook).encode("utf-8")
+    # Pad the header with spaces so the array buffers are aligned
+    header += b" " * (_aligned(4 + len(header)) - 4 - len(header))
+    data_start = 4 + len(header)
+    message = bytearray(data_start + offsets[-1])
+    struct.pack_into("<I", message, 0, len(header))
+    message[4:data_start] = header
+    for x, offset in zip(arrays, offsets):
+        start = data_start + offset
+        # Copy straight into the message with no intermediate bytes objects
+        np.frombuffer(message, np.uint8, x.nbytes, start)[:] = \
+            x.reshape(-1).view(np.uint8)
+    return bytes(message)
+
+
+def binary_decode(b):
+    """Decode a message made by binary_encode. Arrays are returned as read-only
+    views into b rather than copies
+
+    Args:
+        b (bytes): The binary message
+
+    Returns:
+        The decoded object
+    """
+    header_len = struct.unpack_from("<I", b, 0)[0]
+    data_start = 4 + header_len
+    header = bytes(b[4:data_start]).decode("utf-8")
+
+    def object_pairs_hook(pairs):
+        d = OrderedDict(pairs)
+        if d.get("typeid", None) == NDARRAY_TYPEID:
+            count = int(np.prod(d["shape"]))
+            x = np.frombuffer(b, d["dtype"], count, data_start + d["offset"])
+            x = x.reshape(d["shape"])
+            x.flags.writeable = False
+            return x
+        else:
+            return d
+
+    o = json.loads(header, object_pairs_hook=object_pairs_hook)
+    return o
+
+
 def serialize_hook(o):
-    o = serialize_object(o)
-    if isinstance(o, (np.number, np.bool_)):
-        return o.tolist()
-    elif isinstance(o, np.ndarray):
+    # Check for numpy first as they are the most common things we are passed,
+    # and serialize_object() would have to raise an AttributeError for them
+    if isinstance(o, np.ndarray):
         assert len(o.shape) == 1, "Expected 1d array, got {}".format(o.shape)
         return o.tolist()
+    elif isinstance(o, (np.number, np.bool_)):
+        return o.tolist()
     else:
-        return o
+        # json will call us again for any numpy objects this returns
+        return serialize_object(o)
 
 
 def check_camel_case(name):
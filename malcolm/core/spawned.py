@@ -12,7 +12,7 @@ class Spawned(object):
     NO_RESULT = object()
 
     def __init__(self, function, args, kwargs, use_cothread=True,
-                 thread_pool=None):
+                 thread_pool=None, on_done=None):
         self.cothread = maybe_import_cothread()
         if use_cothread and not self.cothread:
             use_cothread = False
@@ -21,6 +21,7 @@ class Spawned(object):
         self._function = function
         self._args = args
         self._kwargs = kwargs
+        self._on_done = on_done
 
         if use_cothread:
             if self.cothread.scheduler_thread_id != get_thread_ident():
@@ -42,12 +43,17 @@ class Spawned(object):
                 "Exception calling %s(*%s, **%s)",
                 self._function, self._args, self._kwargs, exc_info=True)
             self._result = e
+        # Tell on_done before waking waiters, so it has happened by the time
+        # wait() returns
+        if self._on_done:
+            self._on_done(self)
         self._result_queue.put(None)
 
     def wait(self, timeout=None):
-        # Only one person can wait on this at a time
         if self._result == self.NO_RESULT:
             self._result_queue.get(timeout)
+            # Put it back so anyone else waiting on us is woken too
+            self._result_queue.put(None)
 
     def ready(self):
         return self._result != self.NO_RESULT
@@ -0,0 +1,69 @@
+from multiprocessing.pool import ThreadPool
+import threading
+import time
+
+
+# Names of the thread pools that real threads are spawned in
+DEFAULT_POOL = "default"
+HOOK_POOL = "hooks"
+COMMS_POOL = "comms"
+
+
+class SpawnPool(object):
+    """A named ThreadPool that keeps track of how busy it is
+
+    Attributes:
+        name (str): The name of the pool, like "comms" or "hooks"
+        num_threads (int): The number of worker threads in the pool
+        queued (int): The number of functions waiting for a worker thread
+        active (int): The number of functions currently running
+    """
+
+    def __init__(self, name, num_threads):
+        self.name = name
+        self.num_threads = num_threads
+        self.queued = 0
+        self.active = 0
+        self._max_wait = 0.0
+        self._lock = threading.Lock()
+        self._thread_pool = ThreadPool(num_threads)
+
+    def apply_async(self, func):
+        """Run func in a worker thread, recording how long it waited for one
+
+        Args:
+            func: Function taking no arguments to run
+        """
+        with self._lock:
+            self.queued += 1
+        self._thread_pool.apply_async(self._run, (func, time.time()))
+
+    def _run(self, func, queued_time):
+        wait = time.time() - queued_time
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            if wait > self._max_wait:
+                self._max_wait = wait
+        try:
+            func()
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def pop_max_wait(self):
+        """Get the longest time a function waited for a worker thread since the
+        last call to this function
+
+        Returns:
+            float: The time in seconds
+        """
+        with self._lock:
+            max_wait, self._max_wait = self._max_wait, 0.0
+        return max_wait
+
+    def close(self):
+        """Stop accepting new functions and wait for the worker threads to
+        finish"""
+        self._thread_pool.close()
+        self._thread_pool.join()
@@ -17,6 +17,31 @@ class Table(Serializable):
             v = d[e] if e in d else []
             setattr(self, e, v)
 
+    @classmethod
+    def from_rows(cls, meta, rows):
+        """Make a Table from rows of values, validating each column once
+
+        This is much faster than making an empty Table and calling append()
+        for each row, as that makes every column again for each row
+
+        Args:
+            meta (TableMeta): The meta that describes the columns
+            rows: Iterable of rows, each a sequence with a value per column
+
+        Returns:
+            Table: The table with those rows
+        """
+        names = list(meta.elements)
+        columns = [[] for _ in names]
+        appends = [column.append for column in columns]
+        for row in rows:
+            if len(row) != len(names):
+                raise ValueError(
+                    "Row %s does not specify correct number of values" % row)
+            for append, v in zip(appends, row):
+                append(v)
+        return cls(meta, dict(zip(names, columns)))
+
     @property
     def endpoints(self):
         return list(self.meta.elements)
@@ -33,11 +58,7 @@ class Table(Serializable):
         """Get row"""
         if isinstance(idx, int):
             self.verify_column_lengths()
-            columns = len(self.meta.elements)
-            row = [None] * columns
-            for i in range(columns):
-                row[i] = getattr(self, list(self.meta.elements)[i])[idx]
-            return row
+            return [getattr(self, e)[idx] for e in self.meta.elements]
         else:
             return getattr(self, idx)
 
@@ -15,13 +15,21 @@ class View(object):
         object.__setattr__(self, "_data", data)
         if hasattr(data, "typeid"):
             object.__setattr__(self, "typeid", data.typeid)
-        self._prepare_endpoints(data)
 
-    def _prepare_endpoints(self, data):
-        object.__setattr__(self, "_endpoints", tuple(data))
-        for endpoint in self._endpoints:
+    @classmethod
+    def _make_endpoint_members(cls, data):
+        """Add properties and subscribe_ methods for each endpoint of data to
+        this class. Called once on each subclass that make_view creates"""
+        for endpoint in data:
+            # make properties for the endpoints we know about
+            make_get_property(cls, endpoint)
             # Add _subscribe methods for each endpoint
-            self._make_subscribe_method(endpoint)
+            make_subscribe_method(cls, endpoint)
+
+    @classmethod
+    def _subclass_key(cls, data):
+        """The key that make_view caches the subclass for data under"""
+        return tuple(data)
 
     def __iter__(self):
         return iter(self._endpoints)
@@ -38,14 +46,6 @@ class View(object):
     def __setattr__(self, name, value):
         raise NameError("Cannot set attribute %s on view" % name)
 
-    def _make_subscribe_method(self, endpoint):
-        # Make subscribe_endpoint method
-        def subscribe_child(callback, *args, **kwargs):
-            return self._context.subscribe(
-                self._data.path + [endpoint], callback, *args, **kwargs)
-
-        object.__setattr__(self, "subscribe_%s" % endpoint, subscribe_child)
-
 
 def make_get_property(cls, endpoint):
     @property
@@ -58,6 +58,46 @@ def make_get_property(cls, endpoint):
     setattr(cls, endpoint, make_child_view)
 
 
+def make_subscribe_method(cls, endpoint):
+    # Make subscribe_endpoint method
+    def subscribe_child(self, callback, *args, **kwargs):
+        return self._context.subscribe(
+            self._data.path + [endpoint], callback, *args, **kwargs)
+
+    setattr(cls, "subscribe_%s" % endpoint, subscribe_child)
+
+
+# {(View class, Model type, View class key): View subclass}
+_view_subclasses = {}
+
+
+def get_view_subclass(base, data):
+    """Get the subclass of base with properties for the endpoints of data,
+    creating it the first time that base has been asked for this structure
+
+    Args:
+        base (type): The View class to subclass
+        data (Model): The Model that will be viewed
+
+    Returns:
+        type: The subclass of base
+    """
+    key = (base, type(data), base._subclass_key(data))
+    try:
+        return _view_subclasses[key]
+    except KeyError:
+        # Properties can only be set on classes, so make subclass that we can
+        # use for any data with this structure
+        def __init__(self, controller, context, data):
+            self._do_init(controller, context, data)
+
+        subclass = type(base.__name__ + "Subclass", (base,), dict(
+            __init__=__init__, _endpoints=tuple(data)))
+        subclass._make_endpoint_members(data)
+        _view_subclasses[key] = subclass
+        return subclass
+
+
 def make_view(controller, context, data):
     """Make a View subclass containing properties specific for given data
 
@@ -71,20 +111,5 @@ def make_view(controller, context, data):
         View: A View subclass instance that provides a user-focused API to
             the given data
     """
-    # Properties can only be set on classes, so make subclass that we can use
-
-    class ViewSubclass(View):
-        def __init__(self):
-            self._do_init(controller, context, data)
-
-    for endpoint in data:
-        # make properties for the endpoints we know about
-        make_get_property(ViewSubclass, endpoint)
-
-    view = ViewSubclass()
+    view = get_view_subclass(View, data)(controller, context, data)
     return view
-
-
-
-
-
@@ -36,9 +36,10 @@ class DatasetTablePart(Part):
     @RunnableController.PostConfigure
     def update_datasets_table(self, context, part_info):
         # Update the dataset table
-        datasets_table = Table(dataset_table_meta)
+        rows = OrderedDict()
         for i in DatasetProducedInfo.filter_values(part_info):
-            if i.name not in datasets_table.name:
-                row = [i.name, i.filename, i.type, i.rank, i.path, i.uniqueid]
-                datasets_table.append(row)
+            if i.name not in rows:
+                rows[i.name] = [
+                    i.name, i.filename, i.type, i.rank, i.path, i.uniqueid]
+        datasets_table = Table.from_rows(dataset_table_meta, rows.values())
         self.datasets.set_value(datasets_table)
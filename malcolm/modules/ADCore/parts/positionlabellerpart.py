@@ -1,20 +1,24 @@
-from xml.etree import cElementTree as ET
+import numpy as np
 
-from malcolm.compat import et_to_string
 from malcolm.core import method_takes, REQUIRED
 from malcolm.modules.builtin.parts import StatefulChildPart
 from malcolm.modules.scanning.controllers import RunnableController
+from malcolm.modules.scanpointgenerator.points import get_points
 from malcolm.modules.scanpointgenerator.vmetas import PointGeneratorMeta
 from malcolm.modules.ADCore.infos import UniqueIdInfo
 
 # How big an XML file can the EPICS waveform receive?
 XML_MAX_SIZE = 1000000 - 2
 
-# How many to load each time
+# How many positions to load each time the plugin runs low. Configure loads
+# as many as will fit in an XML file
 POSITIONS_PER_XML = 1000
 
-# How far to load ahead
-N_LOAD_AHEAD = 4
+# Load more positions when the plugin has fewer than this many left
+LOAD_AHEAD_POSITIONS = 4 * POSITIONS_PER_XML
+
+# Values at or above each of these take one more digit to write
+DIGIT_THRESHOLDS = 10 ** np.arange(1, 19, dtype=np.int64)
 
 
 class PositionLabellerPart(StatefulChildPart):
@@ -30,42 +34,68 @@ class PositionLabellerPart(StatefulChildPart):
     # If we are currently loading then block loading more points
     loading = False
 
-    def _make_xml(self, start_index):
+    def _make_xml(self, start_index, max_positions=None):
+        """Make the XML for as many positions from start_index as will fit in
+        XML_MAX_SIZE, up to max_positions
 
-        # Make xml root
-        root_el = ET.Element("pos_layout")
-        dimensions_el = ET.SubElement(root_el, "dimensions")
+        The position lines are formatted in one go from the generator's index
+        arrays rather than built as ElementTree elements, with attributes in
+        the same sorted order that ElementTree would write them.
 
-        # Make an index for every hdf index
-        for i in range(len(self.generator.dimensions)):
-            ET.SubElement(dimensions_el, "dimension", name="d%d" % i)
+        Args:
+            start_index (int): The index of the first position
+            max_positions (int): The most positions to write, or None for as
+                many as will fit
 
+        Returns:
+            tuple: (xml, end_index) where end_index is one more than the index
+                of the last position in the xml
+        """
+        names = ["d%d" % i for i in range(len(self.generator.dimensions))]
         # Add the a file close command for the HDF writer
-        ET.SubElement(dimensions_el, "dimension", name="FilePluginClose")
-
-        # Add the actual positions
-        positions_el = ET.SubElement(root_el, "positions")
-
-        end_index = start_index + POSITIONS_PER_XML
+        header = '<?xml version="1.0" ?><pos_layout><dimensions>%s' \
+                 '<dimension name="FilePluginClose" /></dimensions>' \
+                 '<positions>' % "".join(
+                    '<dimension name="%s" />' % name for name in names)
+        footer = "</positions></pos_layout>"
+        columns = sorted(names + ["FilePluginClose"])
+        template = "<position %s />" % " ".join(
+            '%s="%%d"' % column for column in columns)
+        # How long a position line is without its numbers
+        line_size = len(template) - 2 * len(columns)
+        max_size = XML_MAX_SIZE - 1 - len(header) - len(footer)
+
+        # Every number takes at least one digit, so this is as many positions
+        # as could possibly fit
+        num_positions = max_size // (line_size + len(columns))
+        if max_positions is not None:
+            num_positions = min(num_positions, max_positions)
+        end_index = start_index + num_positions
         if end_index > self.steps_up_to:
             end_index = self.steps_up_to
-
-        for i in range(start_index, end_index):
-            point = self.generator.get_point(i)
-            if i == self.generator.size - 1:
-                do_close = True
+        points = get_points(self.generator, start_index, end_index)
+        values = np.empty((len(points), len(columns)), dtype=np.int64)
+        for i, column in enumerate(columns):
+            if column == "FilePluginClose":
+                values[:, i] = np.arange(start_index, end_index) == \
+                    self.generator.size - 1
             else:
-                do_close = False
-            positions = dict(FilePluginClose="%d" % do_close)
-            for j, value in enumerate(point.indexes):
-                positions["d%d" % j] = str(value)
-            position_el = ET.Element("position", **positions)
-            positions_el.append(position_el)
-
-        xml = et_to_string(root_el)
+                values[:, i] = points.indexes[:, int(column[1:])]
+
+        # Only keep the positions that fit
+        digits = np.searchsorted(DIGIT_THRESHOLDS, values, side="right") + 1
+        sizes = np.cumsum(line_size + np.sum(digits, axis=1))
+        num_positions = int(np.searchsorted(sizes, max_size, side="right"))
+        assert num_positions > 0, "No positions fit in XML"
+        values = values[:num_positions]
+
+        xml = "".join((
+            header,
+            (template * num_positions) % tuple(values.ravel().tolist()),
+            footer))
         xml_length = len(xml)
         assert xml_length < XML_MAX_SIZE, "XML size %d too big" % xml_length
-        return xml, end_index
+        return xml, start_index + num_positions
 
     @RunnableController.Reset
     def reset(self, context):
@@ -119,9 +149,10 @@ class PositionLabellerPart(StatefulChildPart):
 
     def load_more_positions(self, number_left, child):
         if not self.loading and self.end_index < self.steps_up_to and \
-                        number_left < POSITIONS_PER_XML * N_LOAD_AHEAD:
+                        number_left < LOAD_AHEAD_POSITIONS:
             self.loading = True
-            xml, self.end_index = self._make_xml(self.end_index)
+            xml, self.end_index = self._make_xml(
+                self.end_index, POSITIONS_PER_XML)
             child.xml.put_value(xml)
             self.loading = False
 
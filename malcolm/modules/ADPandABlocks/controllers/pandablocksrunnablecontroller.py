@@ -8,7 +8,8 @@ from malcolm.modules.builtin.controllers import StatefulController
 from malcolm.modules.builtin.parts import StringPart, ChoicePart
 from malcolm.modules.builtin.vmetas import StringMeta, StringArrayMeta
 from malcolm.modules.pandablocks.controllers import PandABlocksManagerController
-from malcolm.modules.scanning.controllers import RunnableController
+from malcolm.modules.scanning.controllers import RunnableController, \
+    RunnableStates
 
 
 @method_also_takes(
@@ -19,6 +20,13 @@ from malcolm.modules.scanning.controllers import RunnableController
 )
 class PandABlocksRunnableController(PandABlocksManagerController,
                                     RunnableController):
+    def _next_poll_period(self, period, changes):
+        # Don't back off while a scan is running
+        if self.state.value == RunnableStates.RUNNING:
+            return self.params.minPollPeriod
+        return super(PandABlocksRunnableController, self)._next_poll_period(
+            period, changes)
+
     def _make_child_controller(self, parts, mri):
         # Add some extra parts to determine the dataset name and type for
         # any CAPTURE field part
@@ -1,3 +1,4 @@
+from .processblock import process_block
 from .proxyblock import proxy_block
 
-__all__ = ["proxy_block"]
+__all__ = ["process_block", "proxy_block"]
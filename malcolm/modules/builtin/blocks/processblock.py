@@ -0,0 +1,21 @@
+from malcolm.modules.builtin.controllers import ProcessController
+from malcolm.core import method_takes, REQUIRED, call_with_params
+from malcolm.modules.builtin.vmetas import StringMeta, StringArrayMeta, \
+    NumberMeta
+
+
+# This is done in python rather than YAML so that the thread pools can be
+# sized when the block is created, before anything is spawned in them
+@method_takes(
+    "mri", StringMeta("MRI for the process block"), REQUIRED,
+    "poolSizes", StringArrayMeta(
+        "Number of threads for each named thread pool, like 'comms=4'"), [],
+    "statsPeriod", NumberMeta(
+        "float64", "How often to update the thread pool statistics"), 1.0
+)
+def process_block(process, params):
+    controller = call_with_params(
+        ProcessController, process, (), mri=params.mri,
+        poolSizes=params.poolSizes, statsPeriod=params.statsPeriod)
+    process.add_controller(params.mri, controller)
+    return controller
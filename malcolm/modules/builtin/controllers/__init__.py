@@ -3,6 +3,7 @@ from .statefulcontroller import StatefulController, StatefulStates
 from .managercontroller import ManagerController, ManagerStates
 from .clientcomms import ClientComms
 from .proxycontroller import ProxyController
+from .processcontroller import ProcessController
 from .servercomms import ServerComms
 
 # Expose all the classes
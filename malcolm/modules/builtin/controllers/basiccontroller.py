@@ -1,13 +1,40 @@
 from malcolm.core import Controller, method_takes, REQUIRED
-from malcolm.modules.builtin.vmetas import StringMeta
+from malcolm.modules.builtin.vmetas import StringMeta, BooleanMeta, NumberMeta
+from malcolm.tags import widget
 
 
 @method_takes(
     "mri", StringMeta("Malcolm resource id of created block"), REQUIRED,
-    "description", StringMeta("Description for the created block"), "")
+    "description", StringMeta("Description for the created block"), "",
+    "requestWorker", BooleanMeta(
+        "Handle Gets and Subscribes in one long-lived worker rather than "
+        "spawning for each"), False)
 class BasicController(Controller):
     """Basic Controller"""
+    # Attributes
+    request_batch_size = None
+    request_latency = None
+
     def __init__(self, process, parts, params):
         self.params = params
+        self.use_request_worker = params.requestWorker
         super(BasicController, self).__init__(
             process, params.mri, parts, params.description)
+
+    def create_attribute_models(self):
+        for y in super(BasicController, self).create_attribute_models():
+            yield y
+        if self.use_request_worker:
+            self.request_batch_size = NumberMeta(
+                "int32", "Max number of requests handled in one batch",
+                tags=[widget("textupdate")]).create_attribute_model()
+            yield "requestBatchSize", self.request_batch_size, None
+            self.request_latency = NumberMeta(
+                "float64", "Max time requests waited before being handled",
+                tags=[widget("textupdate")]).create_attribute_model()
+            yield "requestLatency", self.request_latency, None
+
+    def update_request_stats(self, batch_size, latency):
+        with self.changes_squashed:
+            self.request_batch_size.set_value(batch_size)
+            self.request_latency.set_value(latency)
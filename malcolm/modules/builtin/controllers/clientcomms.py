@@ -1,9 +1,11 @@
+from malcolm.core import COMMS_POOL
 from .statefulcontroller import StatefulController
 
 
 class ClientComms(StatefulController):
     """Abstract class for dispatching requests to a server and responses to
     a method"""
+    spawn_pool = COMMS_POOL
 
     def send_to_server(self, request):
         """Abstract method to dispatch request to a server
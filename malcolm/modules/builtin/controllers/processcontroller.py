@@ -0,0 +1,81 @@
+from malcolm.compat import OrderedDict
+from malcolm.core import method_also_takes, Process, Queue, TimeoutError, \
+    Table
+from malcolm.modules.builtin.vmetas import NumberMeta, StringArrayMeta, \
+    NumberArrayMeta, TableMeta
+from malcolm.tags import widget
+from .basiccontroller import BasicController
+
+
+def parse_pool_sizes(pool_sizes):
+    """Turn ["comms=4", "hooks=16"] into {"comms": 4, "hooks": 16}"""
+    sizes = OrderedDict()
+    for pool_size in pool_sizes:
+        name, _, size = pool_size.partition("=")
+        assert name and size.isdigit(), \
+            "Expected pool size like 'comms=4', got %r" % pool_size
+        sizes[name] = int(size)
+    return sizes
+
+
+@method_also_takes(
+    "poolSizes", StringArrayMeta(
+        "Number of threads for each named thread pool, like 'comms=4'"), [],
+    "statsPeriod", NumberMeta(
+        "float64", "How often to update the thread pool statistics"), 1.0)
+class ProcessController(BasicController):
+    """Sizes the Process thread pools and publishes how busy they are"""
+    # Attributes
+    pools = None
+
+    def __init__(self, process, parts, params):
+        for name, size in parse_pool_sizes(params.poolSizes).items():
+            process.set_pool_size(name, size)
+        super(ProcessController, self).__init__(process, parts, params)
+        self._stop_queue = Queue()
+        self._stats_spawned = None
+
+    def create_attribute_models(self):
+        for y in super(ProcessController, self).create_attribute_models():
+            yield y
+        elements = OrderedDict()
+        elements["name"] = StringArrayMeta("Name of the thread pool")
+        elements["size"] = NumberArrayMeta(
+            "int32", "Number of worker threads")
+        elements["queued"] = NumberArrayMeta(
+            "int32", "Number of functions waiting for a worker thread")
+        elements["active"] = NumberArrayMeta(
+            "int32", "Number of functions currently running")
+        elements["maxWait"] = NumberArrayMeta(
+            "float64", "Max time a function waited for a worker thread")
+        self.pools = TableMeta(
+            "Process thread pool statistics", elements=elements,
+            tags=[widget("table")]).create_attribute_model()
+        yield "pools", self.pools, None
+
+    @Process.Init
+    def init(self):
+        self._stats_spawned = self.spawn(self._stats_loop)
+
+    @Process.Halt
+    def halt(self):
+        if self._stats_spawned:
+            self._stop_queue.put(None)
+            self._stats_spawned.wait()
+            self._stats_spawned = None
+
+    def _stats_loop(self):
+        while True:
+            try:
+                return self._stop_queue.get(timeout=self.params.statsPeriod)
+            except TimeoutError:
+                # No stop, no problem
+                pass
+            self.update_pool_stats()
+
+    def update_pool_stats(self):
+        rows = []
+        for pool in self.process.pools:
+            rows.append([pool.name, pool.num_threads, pool.queued,
+                         pool.active, pool.pop_max_wait()])
+        self.pools.set_value(Table.from_rows(self.pools.meta, rows))
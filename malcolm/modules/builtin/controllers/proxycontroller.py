@@ -30,12 +30,21 @@ class ProxyController(Controller):
         unsubscribe = Unsubscribe(callback=self.handle_response)
         self.client_comms.send_to_server(unsubscribe)
 
-    def handle_request(self, request):
-        # Forward Puts and Posts to the client_comms
-        if isinstance(request, (Put, Post)):
-            return self.client_comms.send_to_server(request)
-        else:
-            return super(ProxyController, self).handle_request(request)
+    def handle_requests(self, requests):
+        # Forward Puts and Posts to the client_comms, and handle the rest here
+        ret = []
+        local_requests = []
+        for request in requests:
+            if isinstance(request, (Put, Post)):
+                ret.append(self.client_comms.send_to_server(request))
+            else:
+                local_requests.append(request)
+                ret.append(None)
+        if local_requests:
+            spawned = super(ProxyController, self).handle_requests(
+                local_requests)
+            ret = [spawned.pop(0) if r is None else r for r in ret]
+        return ret
 
     def handle_response(self, response):
         self._response_queue.put(response)
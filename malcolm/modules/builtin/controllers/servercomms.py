@@ -1,6 +1,7 @@
+from malcolm.core import COMMS_POOL
 from .statefulcontroller import StatefulController
 
 
 class ServerComms(StatefulController):
     """Abstract class for dealing with requests from outside"""
-    pass
+    spawn_pool = COMMS_POOL
@@ -1,7 +1,10 @@
+import time
+
 from malcolm.modules.builtin.controllers import StatefulController
 from malcolm.core import Part, method_takes, REQUIRED, MethodModel
 from malcolm.modules.builtin.vmetas import StringMeta, NumberMeta, BooleanMeta
 from .catoolshelper import CaToolsHelper
+from .capart import LatencyHistogram
 
 
 @method_takes(
@@ -22,6 +25,8 @@ class CAActionPart(Part):
         """
         self.method = None
         self.params = params
+        # How long caputs to pv take
+        self.put_latency = LatencyHistogram()
         self.catools = CaToolsHelper.instance()
         super(CAActionPart, self).__init__(params.name)
 
@@ -31,15 +36,21 @@ class CAActionPart(Part):
         # TODO: set widget tag?
         yield self.params.name, self.method, self.caput
 
+    def create_attribute_models(self):
+        for y in self.put_latency.create_attribute_models(
+                self.params.name + "PutLatency",
+                "caputs to %s" % self.params.pv):
+            yield y
+
     @StatefulController.Reset
     def connect_pvs(self, _):
         pvs = [self.params.pv]
         if self.params.statusPv:
             pvs.append(self.params.statusPv)
-        ca_values = self.catools.caget(pvs)
+        ca_values = self.catools.caget_batched(pvs)
         # check connection is ok
         for i, v in enumerate(ca_values):
-            assert v.ok, "CA connect failed with %s" % v.state_strings[v.state]
+            assert v.ok, "CA connect failed with %s" % (v,)
 
     def caput(self):
         if self.params.wait:
@@ -47,9 +58,11 @@ class CAActionPart(Part):
         else:
             cmd = "caput"
         self.log.info("%s %s %s", cmd, self.params.pv, self.params.value)
+        start = time.time()
         self.catools.caput(
             self.params.pv, self.params.value,
             wait=self.params.wait, timeout=None)
+        self.put_latency.record(time.time() - start, self.controller)
         if self.params.statusPv:
             status = self.catools.caget(
                 self.params.statusPv,
@@ -1,12 +1,45 @@
+import zlib
+
+import numpy as np
+
 from .capart import CAPart
 
 
+class ArraySummary(object):
+    """Formats an array for logging, but only when the log message is emitted.
+    Arrays longer than MAX_ELEMENTS are summarized rather than listed"""
+
+    MAX_ELEMENTS = 100
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        value = self.value
+        if len(value) <= self.MAX_ELEMENTS:
+            return " ".join(str(x) for x in value)
+        arr = np.ascontiguousarray(value)
+        crc = zlib.crc32(arr.tobytes()) & 0xffffffff
+        return "<%s[%d] min=%s max=%s crc32=%08x>" % (
+            arr.dtype, len(arr), arr.min(), arr.max(), crc)
+
+
 class CAArrayPart(CAPart):
     """Abstract class with better logging for CAParts with array types"""
 
     def format_caput_value(self, value):
-        l = len(value)
-        v = " ".join(str(x) for x in value)
         self.log.info("caput -c -w %s %s -a %d %s",
-                      self.params.timeout, self.params.pv, l, v)
+                      self.params.timeout, self.params.pv, len(value),
+                      ArraySummary(value))
         return value
+
+    def validate_value(self, value):
+        # catools gives us a freshly allocated array for every update, so if
+        # it is already the right dtype we can use it without revalidating or
+        # copying, as a read-only view that drops the ca_array subclass
+        if getattr(value, "dtype", None) == self.attr.meta.dtype:
+            view = value.view(np.ndarray)
+            view.flags.writeable = False
+            return view
+        else:
+            return super(CAArrayPart, self).validate_value(value)
@@ -1,14 +1,167 @@
+import bisect
 import time
+import weakref
 
+from malcolm.compat import OrderedDict
 from malcolm.modules.builtin.controllers import StatefulController
 from malcolm.core import method_takes, REQUIRED, Alarm, AlarmStatus, TimeStamp
 from malcolm.modules.builtin.parts.attributepart import AttributePart
-from malcolm.tags import widget_types, inport, port_types
+from malcolm.tags import widget_types, inport, port_types, widget
 from malcolm.modules.builtin.vmetas import StringMeta, ChoiceMeta, \
-    BooleanMeta, NumberMeta
+    BooleanMeta, NumberMeta, NumberArrayMeta
 from .catoolshelper import CaToolsHelper
 
 
+class MonitorCoalescer(object):
+    """Stores the latest monitor value for each CAPart of a controller, and
+    applies the ones that are due in one batch, updating each part at most
+    once every minDelta seconds"""
+
+    # {Controller: MonitorCoalescer}
+    _instances = weakref.WeakKeyDictionary()
+
+    def __init__(self, controller, cothread):
+        # Don't keep the controller alive, it is our key in _instances
+        self.controller = weakref.proxy(controller)
+        self.cothread = cothread
+        # {CAPart: latest value}
+        self.pending = OrderedDict()
+        # {CAPart: when it can next be updated}
+        self.next_flush = {}
+        self.timer = None
+        # When the timer will fire
+        self.timer_due = 0
+
+    @classmethod
+    def for_controller(cls, controller, cothread):
+        try:
+            return cls._instances[controller]
+        except KeyError:
+            inst = cls._instances[controller] = cls(controller, cothread)
+            return inst
+
+    def add(self, part, value):
+        """Store the latest value for part, applying it with any others that
+        are due when it is"""
+        self.pending[part] = value
+        self._schedule(self.next_flush.get(part, 0))
+
+    def _schedule(self, due):
+        if self.timer is not None:
+            if due >= self.timer_due:
+                return
+            self.timer.cancel()
+        self.timer_due = due
+        self.timer = self.cothread.Timer(max(due - time.time(), 0), self.flush)
+
+    def discard(self, part):
+        self.pending.pop(part, None)
+        self.next_flush.pop(part, None)
+
+    def flush(self):
+        self.timer = None
+        now = time.time()
+        due = OrderedDict()
+        for part, value in self.pending.items():
+            if self.next_flush.get(part, 0) <= now:
+                due[part] = value
+        for part in due:
+            del self.pending[part]
+            self.next_flush[part] = now + part.params.minDelta
+        try:
+            if due:
+                with self.controller.changes_squashed:
+                    for part, value in due.items():
+                        # Don't let one bad value stop the others updating
+                        try:
+                            part.update_value(value)
+                        except Exception:
+                            part.log.exception(
+                                "Error updating from %s", value)
+        finally:
+            if self.pending:
+                self._schedule(
+                    min(self.next_flush[part] for part in self.pending))
+
+
+class LatencyHistogram(object):
+    """Counts of how long some operation took, in buckets with upper bounds of
+    BOUNDS seconds, plus a final bucket for anything slower. The bucket counts
+    and the overall count, mean and max are published as read-only Attributes
+    if create_attribute_models() has been called"""
+
+    BOUNDS = (0.001, 0.01, 0.1, 1.0, 10.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # The published Attributes
+        self.counts_attr = None
+        self.count_attr = None
+        self.mean_attr = None
+        self.max_attr = None
+
+    def create_attribute_models(self, name, description):
+        """Make Attributes for the bucket counts, count, mean and max
+
+        Args:
+            name (str): Prefix for the Attribute names, like "exposurePut"
+            description (str): What was timed, like "caputs to PV:EXPOSURE"
+        """
+        self.counts_attr = NumberArrayMeta(
+            "int32", "Number of %s taking up to %s seconds, then longer" % (
+                description, ", ".join(str(b) for b in self.BOUNDS)),
+            tags=[widget("textupdate")]).create_attribute_model(self.counts)
+        yield name + "Counts", self.counts_attr, None
+        self.count_attr = NumberMeta(
+            "int32", "Number of %s" % description,
+            tags=[widget("textupdate")]).create_attribute_model()
+        yield name + "Count", self.count_attr, None
+        self.mean_attr = NumberMeta(
+            "float64", "Mean time in seconds of %s" % description,
+            tags=[widget("textupdate")]).create_attribute_model()
+        yield name + "Mean", self.mean_attr, None
+        self.max_attr = NumberMeta(
+            "float64", "Max time in seconds of %s" % description,
+            tags=[widget("textupdate")]).create_attribute_model()
+        yield name + "Max", self.max_attr, None
+
+    def record(self, latency, controller=None):
+        """Record how long the operation took
+
+        Args:
+            latency (float): The time in seconds
+            controller (Controller): If given, update the published Attributes
+                in a single change under its changes_squashed
+        """
+        self.counts[bisect.bisect_left(self.BOUNDS, latency)] += 1
+        self.count += 1
+        self.total += latency
+        self.max = max(self.max, latency)
+        if self.count_attr is None:
+            return
+        elif controller is None:
+            self._update_attributes()
+        else:
+            with controller.changes_squashed:
+                self._update_attributes()
+
+    def _update_attributes(self):
+        self.counts_attr.set_value(self.counts)
+        self.count_attr.set_value(self.count)
+        self.mean_attr.set_value(self.mean)
+        self.max_attr.set_value(self.max)
+
+    @property
+    def mean(self):
+        if self.count:
+            return self.total / self.count
+        else:
+            return 0.0
+
+
 @method_takes(
     "name", StringMeta("Name of the created attribute"), REQUIRED,
     "description", StringMeta("Description of created attribute"), REQUIRED,
@@ -35,10 +188,20 @@ class CAPart(AttributePart):
                 params.rbv = params.pv
         # Camonitor subscription
         self.monitor = None
+        # How long caputs to pv take
+        self.put_latency = LatencyHistogram()
         self.catools = CaToolsHelper.instance()
-        self._update_after = 0
         super(CAPart, self).__init__(params)
 
+    def create_attribute_models(self):
+        for y in super(CAPart, self).create_attribute_models():
+            yield y
+        if self.is_writeable():
+            for y in self.put_latency.create_attribute_models(
+                    self.params.name + "PutLatency",
+                    "caputs to %s" % self.params.pv):
+                yield y
+
     def is_writeable(self):
         return bool(self.params.pv)
 
@@ -64,19 +227,22 @@ class CAPart(AttributePart):
     def reset(self, context=None):
         # release old monitor
         self.close_monitor()
-        # make the connection in cothread's thread, use caget for initial value
+        # make the connection in cothread's thread, use caget for initial
+        # value. The other parts of the block are doing this at the same time
+        # so this will be sent as part of a single caget with all their pvs
         pvs = [self.params.rbv]
         if self.params.pv:
             pvs.append(self.params.pv)
-        ca_values = self.catools.caget(
+        ca_values = self.catools.caget_batched(
             pvs, format=self.catools.FORMAT_CTRL, datatype=self.get_datatype())
         # check connection is ok
         for i, v in enumerate(ca_values):
-            assert v.ok, "CA connect failed with %s" % v.state_strings[v.state]
+            assert v.ok, "CA connect failed with %s" % (v,)
         self.set_initial_metadata(ca_values[0])
         self.update_value(ca_values[0])
-        # now setup monitor on rbv
-        self.monitor = self.catools.camonitor(
+        # now setup monitor on rbv, which will also be sent with the other
+        # parts' monitors as a single camonitor
+        self.monitor = self.catools.camonitor_batched(
             self.params.rbv, self.monitor_callback,
             format=self.catools.FORMAT_TIME, datatype=self.get_datatype(),
             notify_disconnect=True)
@@ -86,6 +252,9 @@ class CAPart(AttributePart):
         if self.monitor is not None:
             self.monitor.close()
             self.monitor = None
+            if self.controller is not None:
+                MonitorCoalescer.for_controller(
+                    self.controller, self.catools.cothread).discard(self)
 
     def format_caput_value(self, value):
         self.log.info("caput -c -w %s %s %s",
@@ -98,9 +267,11 @@ class CAPart(AttributePart):
             timeout = None
         else:
             timeout = self.params.timeout
+        start = time.time()
         self.catools.caput(
             self.params.pv, value, wait=True, timeout=timeout,
             datatype=self.get_datatype())
+        self.put_latency.record(time.time() - start, self.controller)
         # now do a caget
         value = self.catools.caget(
             self.params.rbv,
@@ -108,20 +279,17 @@ class CAPart(AttributePart):
         self.update_value(value)
 
     def monitor_callback(self, value):
-        now = time.time()
-        delta = now - self._update_after
-        self.update_value(value)
-        # See how long to sleep for to make sure we don't get more than one
-        # update at < minDelta interval
-        if delta > self.params.minDelta:
-            # If we were more than minDelta late then reset next update time
-            self._update_after = now + self.params.minDelta
-        elif delta < 0:
-            # If delta is less than zero sleep for a bit
-            self.catools.cothread.Sleep(-delta)
+        if self.controller is None:
+            self.update_value(value)
         else:
-            # If we were within the delta window just increment next update
-            self._update_after += self.params.minDelta
+            # Don't block the catools dispatcher, just store the value so it
+            # is applied with the rest of the controller's updates
+            MonitorCoalescer.for_controller(
+                self.controller, self.catools.cothread).add(self, value)
+
+    def validate_value(self, value):
+        """Validate a good value from catools before it is set"""
+        return self.attr.meta.validate(value)
 
     def update_value(self, value):
         if not value.ok:
@@ -136,5 +304,5 @@ class CAPart(AttributePart):
             # We only have a raw_stamp attr on monitor, the initial
             # caget with CTRL doesn't give us a timestamp
             ts = TimeStamp(*getattr(value, "raw_stamp", (None, None)))
-            value = self.attr.meta.validate(value)
+            value = self.validate_value(value)
             self.attr.set_value_alarm_ts(value, alarm, ts)
@@ -14,6 +14,25 @@ def _import_cothread(q):
     cothread.Event().Wait()
 
 
+class CagetBatch(object):
+    """The pvs that cothreads have asked to caget with the same arguments
+    before any of them yielded, and the result of getting them"""
+    def __init__(self, event):
+        self.pvs = []
+        self.event = event
+        self.values = None
+        self.error = None
+
+
+class CamonitorBatch(CagetBatch):
+    """The pvs that cothreads have asked to camonitor with the same arguments
+    before any of them yielded, their callbacks, and the subscriptions made
+    for them in values"""
+    def __init__(self, event):
+        super(CamonitorBatch, self).__init__(event)
+        self.callbacks = []
+
+
 class CaToolsHelper(object):
     _instance = None
 
@@ -39,6 +58,10 @@ class CaToolsHelper(object):
         self.FORMAT_TIME = catools.FORMAT_TIME
         self.DBR_ENUM = catools.DBR_ENUM
         self.DBR_CHAR_STR = catools.DBR_CHAR_STR
+        # {sorted kwargs tuple: CagetBatch} waiting to be sent
+        self._caget_batches = {}
+        # {sorted kwargs tuple: CamonitorBatch} waiting to be sent
+        self._camonitor_batches = {}
 
     def caget(self, *args, **kwargs):
         if self.in_cothread_thread:
@@ -47,6 +70,56 @@ class CaToolsHelper(object):
             return self.cothread.CallbackResult(
                 self.catools.caget, *args, **kwargs)
 
+    def caget_batched(self, pvs, **kwargs):
+        """Caget a list of pvs, not throwing if any of them fail. Calls with
+        the same kwargs that are made together, like from each part of a
+        block during Init or Reset, are sent as a single caget
+
+        Args:
+            pvs (list): The pvs to get
+            **kwargs: Keyword args to pass to caget, like format and datatype
+
+        Returns:
+            list: The values for pvs, which will have ok=False if they failed
+        """
+        if self.in_cothread_thread:
+            return self._caget_batched(pvs, kwargs)
+        else:
+            return self.cothread.CallbackResult(
+                self._caget_batched, pvs, kwargs)
+
+    def _get_batch(self, batches, batch_cls, send, kwargs):
+        key = tuple(sorted(kwargs.items()))
+        batch = batches.get(key, None)
+        if batch is None:
+            # Send the batch when everyone who has been spawned so far has
+            # had a chance to add to it
+            batch = batch_cls(self.cothread.Event(auto_reset=False))
+            batches[key] = batch
+            self.cothread.Spawn(self._send_batch, batches, key, batch, send)
+        return batch
+
+    def _send_batch(self, batches, key, batch, send):
+        del batches[key]
+        try:
+            batch.values = send(batch, **dict(key))
+        except Exception as e:  # pylint:disable=broad-except
+            batch.error = e
+        batch.event.Signal()
+
+    def _caget_batched(self, pvs, kwargs):
+        batch = self._get_batch(
+            self._caget_batches, CagetBatch, self._send_caget_batch, kwargs)
+        start = len(batch.pvs)
+        batch.pvs += pvs
+        batch.event.Wait()
+        if batch.error:
+            raise batch.error
+        return batch.values[start:start + len(pvs)]
+
+    def _send_caget_batch(self, batch, **kwargs):
+        return self.catools.caget(batch.pvs, throw=False, **kwargs)
+
     def caput(self, *args, **kwargs):
         if self.in_cothread_thread:
             return self.catools.caput(*args, **kwargs)
@@ -61,6 +134,46 @@ class CaToolsHelper(object):
             return self.cothread.CallbackResult(
                 self.catools.camonitor, *args, **kwargs)
 
+    def camonitor_batched(self, pv, callback, **kwargs):
+        """Camonitor a pv. Calls with the same kwargs that are made together,
+        like from each part of a block during Init or Reset, are sent as a
+        single camonitor
+
+        Args:
+            pv (str): The pv to monitor
+            callback: Function to call with each new value
+            **kwargs: Keyword args to pass to camonitor, like format and
+                datatype
+
+        Returns:
+            Subscription: The subscription to pv, which can be closed
+        """
+        if self.in_cothread_thread:
+            return self._camonitor_batched(pv, callback, kwargs)
+        else:
+            return self.cothread.CallbackResult(
+                self._camonitor_batched, pv, callback, kwargs)
+
+    def _camonitor_batched(self, pv, callback, kwargs):
+        batch = self._get_batch(
+            self._camonitor_batches, CamonitorBatch,
+            self._send_camonitor_batch, kwargs)
+        index = len(batch.pvs)
+        batch.pvs.append(pv)
+        batch.callbacks.append(callback)
+        batch.event.Wait()
+        if batch.error:
+            raise batch.error
+        return batch.values[index]
+
+    def _send_camonitor_batch(self, batch, **kwargs):
+        callbacks = batch.callbacks
+
+        def callback(value, index):
+            callbacks[index](value)
+
+        return self.catools.camonitor(batch.pvs, callback, **kwargs)
+
     @classmethod
     def instance(cls):
         if not cls._instance:
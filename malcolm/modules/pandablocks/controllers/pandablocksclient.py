@@ -1,9 +1,15 @@
 from collections import namedtuple, OrderedDict
 import logging
 
+from malcolm.compat import queue
+from malcolm.core.errors import TimeoutError
+
 # Create a module level logger
 log = logging.getLogger(__name__)
 
+# How much to ask for from the socket at a time
+RECV_SIZE = 65536
+
 
 BlockData = namedtuple("BlockData", "number,description,fields")
 FieldData = namedtuple("FieldData",
@@ -38,6 +44,8 @@ class PandABlocksClient(object):
         self._recv_spawned = None
         self._response_queues = None
         self._thread_pool = None
+        # {(block, field): {name: (bits_hi, bits_lo)}} of table layouts
+        self.table_fields = {}
 
     def start(self, spawn=None, socket_cls=None):
         if spawn is None:
@@ -99,28 +107,49 @@ class PandABlocksClient(object):
         return response
 
     def _send_loop(self):
-        """Service self._send_queue, sending requests to server"""
+        """Service self._send_queue, sending requests to server. Everything
+        that is queued up is sent in a single write"""
         while True:
             message, response_queue = self._send_queue.get()
+            messages = []
+            while message is not self.STOP:
+                messages.append(message)
+                self._response_queues.put(response_queue)
+                try:
+                    message, response_queue = self._send_queue.get(timeout=0)
+                except (queue.Empty, TimeoutError):
+                    break
+            if messages:
+                try:
+                    self._socket.sendall("".join(messages).encode())
+                except Exception:  # pylint:disable=broad-except
+                    log.exception("Exception sending messages %s", messages)
             if message is self.STOP:
                 break
-            try:
-                self._response_queues.put(response_queue)
-                self._socket.send(message)
-            except Exception:  # pylint:disable=broad-except
-                log.exception("Exception sending message %s", message)
 
     def _get_lines(self):
-        buf = ""
+        buf = bytearray()
+        # Where to start looking for the next newline
+        search_start = 0
         while True:
-            lines = buf.split("\n")
-            for line in lines[:-1]:
-                yield line
-            buf = lines[-1]
             # Get something new from the socket
-            rx = self._socket.recv(4096)
-            if rx:
-                buf += rx
+            rx = self._socket.recv(RECV_SIZE)
+            if not rx:
+                # Socket has been closed
+                return
+            buf += rx
+            line_start = 0
+            line_end = buf.find(b"\n", search_start)
+            while line_end >= 0:
+                line = bytes(buf[line_start:line_end])
+                if not isinstance(line, str):
+                    # Python 3
+                    line = line.decode()
+                yield line
+                line_start = line_end + 1
+                line_end = buf.find(b"\n", line_start)
+            del buf[:line_start]
+            search_start = len(buf)
 
     def _respond(self, resp):
         """Respond to the person waiting"""
@@ -137,6 +166,10 @@ class PandABlocksClient(object):
         while True:
             try:
                 line = next(lines_iterator)
+            except StopIteration:
+                # Socket has been closed
+                break
+            try:
                 if self._is_multiline is None:
                     self._is_multiline = line.startswith("!") or line == "."
                 if line.startswith("ERR"):
@@ -293,9 +326,44 @@ class PandABlocksClient(object):
             changes[field] = self.recv(q)
         return changes
 
+    def get_idn(self):
+        """Get the identification string of the box, which includes the
+        software and FPGA versions"""
+        resp = self.send_recv("*IDN?\n")
+        assert resp.startswith("OK ="), "Expected 'OK =idn', got %r" % resp
+        return resp[4:]
+
     def get_table_fields(self, block, field):
+        # The layout of a table can only change with the firmware, so only
+        # ask for it once
+        try:
+            return self.table_fields[(block, field)]
+        except KeyError:
+            pass
+        fields = self._parse_table_fields(
+            self.send_recv("%s.%s.FIELDS?\n" % (block, field)))
+        self.table_fields[(block, field)] = fields
+        return fields
+
+    def prefetch_table_fields(self, block_fields):
+        """Ask for the layouts of many tables in one batch, so that later
+        calls to get_table_fields() don't need a round trip each
+
+        Args:
+            block_fields (list): [(block, field)] for each table
+        """
+        queues = OrderedDict()
+        for block, field in block_fields:
+            if (block, field) not in self.table_fields:
+                queues[(block, field)] = self.send(
+                    "%s.%s.FIELDS?\n" % (block, field))
+        for (block, field), q in queues.items():
+            self.table_fields[(block, field)] = self._parse_table_fields(
+                self.recv(q))
+
+    def _parse_table_fields(self, lines):
         fields = OrderedDict()
-        for line in self.send_recv("%s.%s.FIELDS?\n" % (block, field)):
+        for line in lines:
             bits_str, name = line.split(" ", 1)
             name = name.strip()
             bits = tuple(int(x) for x in bits_str.split(":"))
@@ -5,25 +5,42 @@ from xml.etree import cElementTree as ET
 
 from malcolm.compat import OrderedDict, maybe_import_cothread, et_to_string
 from malcolm.core import method_also_takes, Queue, TimeoutError, \
-    call_with_params
+    call_with_params, json_encode, json_decode, Table
 from malcolm.modules.builtin.controllers import BasicController, \
     ManagerController
 from malcolm.modules.builtin.parts import ChildPart
 from malcolm.modules.builtin.vmetas import BooleanMeta, TableMeta, StringMeta, \
-    NumberMeta
+    NumberMeta, StringArrayMeta, NumberArrayMeta
+from malcolm.tags import widget
 from malcolm.modules.pandablocks.parts.pandablocksmaker import \
     PandABlocksMaker, SVG_DIR
-from .pandablocksclient import PandABlocksClient
+from .pandablocksclient import PandABlocksClient, BlockData, FieldData
 
 
 LUT_CONSTANTS = dict(
     A=0xffff0000, B=0xff00ff00, C=0xf0f0f0f0, D=0xcccccccc, E=0xaaaaaaaa)
 
+# How often to update the poll statistics attributes
+POLL_STATS_PERIOD = 1.0
+
 
 @method_also_takes(
     "hostname", StringMeta("Hostname of the box"), "localhost",
-    "port", NumberMeta("uint32", "Port number of the server client"), 8888)
+    "port", NumberMeta("uint32", "Port number of the server client"), 8888,
+    "minPollPeriod", NumberMeta(
+        "float64", "Time between polls while changes are coming in"), 0.02,
+    "maxPollPeriod", NumberMeta(
+        "float64", "Longest time between polls when idle"), 0.2,
+    "cacheDir", StringMeta(
+        "Directory to cache the box's blocks in between restarts, or empty "
+        "to always ask the box"), "")
 class PandABlocksManagerController(ManagerController):
+    # Attributes
+    poll_period = None
+    poll_time = None
+    max_poll_time = None
+    startup_timing = None
+
     def __init__(self, process, parts, params):
         super(PandABlocksManagerController, self).__init__(
             process, parts, params)
@@ -31,6 +48,8 @@ class PandABlocksManagerController(ManagerController):
         self._blocks_data = {}
         # {block_name: {field_name: Part}}
         self._blocks_parts = OrderedDict()
+        # {full_field: (block_name, field_name, Part, FieldData)}
+        self._fields = {}
         # src_attr -> [dest_attr]
         self._listening_attrs = {}
         # (block_name, src_field_name) -> [dest_field_name]
@@ -51,6 +70,32 @@ class PandABlocksManagerController(ManagerController):
         self._stop_queue = None
         self._poll_spawned = None
 
+    def create_attribute_models(self):
+        for data in super(PandABlocksManagerController,
+                          self).create_attribute_models():
+            yield data
+        # Create read-only attributes showing how the poll loop is doing
+        self.poll_period = NumberMeta(
+            "float64", "Current time between polls for changes",
+            tags=[widget("textupdate")]).create_attribute_model()
+        yield "pollPeriod", self.poll_period, None
+        self.poll_time = NumberMeta(
+            "float64", "Mean time taken to get and handle changes",
+            tags=[widget("textupdate")]).create_attribute_model()
+        yield "pollTime", self.poll_time, None
+        self.max_poll_time = NumberMeta(
+            "float64", "Max time taken to get and handle changes",
+            tags=[widget("textupdate")]).create_attribute_model()
+        yield "maxPollTime", self.max_poll_time, None
+        elements = OrderedDict()
+        elements["phase"] = StringArrayMeta("Phase of making the blocks")
+        elements["time"] = NumberArrayMeta(
+            "float64", "Time taken by this phase in seconds")
+        self.startup_timing = TableMeta(
+            "Time taken to make the blocks at startup", elements=elements,
+            tags=[widget("table")]).create_attribute_model()
+        yield "startupTiming", self.startup_timing, None
+
     def do_init(self):
         # start the poll loop and make block parts first to fill in our parts
         # before calling _set_block_children()
@@ -83,10 +128,14 @@ class PandABlocksManagerController(ManagerController):
         super(PandABlocksManagerController, self).do_reset()
 
     def _poll_loop(self):
-        """At 10Hz poll for changes"""
+        """Poll for changes, quickly while they are coming in and backing off
+        when idle"""
+        period = self.params.minPollPeriod
         next_poll = time.time()
+        next_stats = next_poll + POLL_STATS_PERIOD
+        poll_times = []
         while True:
-            next_poll += 0.1
+            next_poll += period
             timeout = next_poll - time.time()
             if timeout < 0:
                 timeout = 0
@@ -95,11 +144,34 @@ class PandABlocksManagerController(ManagerController):
             except TimeoutError:
                 # No stop, no problem
                 pass
+            start = time.time()
             try:
-                self.handle_changes(self.client.get_changes())
+                changes = self.client.get_changes()
+                self.handle_changes(changes)
             except Exception:
                 # TODO: should fault here?
                 self.log.exception("Error while getting changes")
+                changes = None
+            end = time.time()
+            poll_times.append(end - start)
+            period = self._next_poll_period(period, changes)
+            if end >= next_stats:
+                self._update_poll_stats(period, poll_times)
+                next_stats = end + POLL_STATS_PERIOD
+                poll_times = []
+
+    def _next_poll_period(self, period, changes):
+        if changes or self.changes:
+            # Something is happening, or bit_outs are waiting to toggle back
+            return self.params.minPollPeriod
+        else:
+            return min(period * 2, self.params.maxPollPeriod)
+
+    def _update_poll_stats(self, period, poll_times):
+        with self.changes_squashed:
+            self.poll_period.set_value(period)
+            self.poll_time.set_value(sum(poll_times) / len(poll_times))
+            self.max_poll_time.set_value(max(poll_times))
 
     def stop_poll_loop(self):
         if self._poll_spawned:
@@ -113,21 +185,106 @@ class PandABlocksManagerController(ManagerController):
         # {block_name_without_number: BlockData}
         self._blocks_data = OrderedDict()
         self._blocks_parts = OrderedDict()
-        for block_rootname, block_data in self.client.get_blocks_data().items():
-            block_names = []
+        self._fields = {}
+        # [(phase, time_taken)]
+        timing = []
+        start = time.time()
+        if self.params.cacheDir:
+            idn = self.client.get_idn()
+            blocks_data = self._load_cache(idn)
+        else:
+            blocks_data = None
+        # Only need to write the cache if we had to ask the box
+        cache_miss = blocks_data is None
+        if cache_miss:
+            blocks_data = self.client.get_blocks_data()
+        for block_rootname, block_data in blocks_data.items():
             if block_data.number == 1:
-                block_names.append(block_rootname)
+                self._blocks_data[block_rootname] = block_data
             else:
                 for i in range(block_data.number):
-                    block_names.append("%s%d" % (block_rootname, i + 1))
-            for block_name in block_names:
-                self._blocks_data[block_name] = block_data
-                self._make_parts(block_name, block_data)
+                    block_name = "%s%d" % (block_rootname, i + 1)
+                    self._blocks_data[block_name] = block_data
+        timing.append(("introspect", time.time() - start))
+        # Ask for all the table layouts in one go rather than letting each
+        # table part ask for its own
+        start = time.time()
+        self.client.prefetch_table_fields([
+            (block_name, field_name)
+            for block_name, block_data in self._blocks_data.items()
+            for field_name, field_data in block_data.fields.items()
+            if field_data.field_type == "table"])
+        if self.params.cacheDir and cache_miss:
+            self._save_cache(idn, blocks_data)
+        timing.append(("tables", time.time() - start))
+        start = time.time()
+        for block_name, block_data in self._blocks_data.items():
+            self._make_parts(block_name, block_data)
+        timing.append(("blocks", time.time() - start))
+        start = time.time()
         # Handle the initial set of changes to get an initial value
         self.handle_changes(self.client.get_changes())
         # Then once more to let bit_outs toggle back
         self.handle_changes({})
         assert not self.changes, "There are still changes %s" % self.changes
+        timing.append(("changes", time.time() - start))
+        self.log.info("Made %d blocks in %s", len(self._blocks_data), ", ".join(
+            "%s %.3fs" % phase_time for phase_time in timing))
+        self.startup_timing.set_value(
+            Table.from_rows(self.startup_timing.meta, timing))
+
+    def _cache_filename(self):
+        return os.path.join(self.params.cacheDir, "%s_%s.json" % (
+            self.params.hostname, self.params.port))
+
+    def _load_cache(self, idn):
+        """Load blocks data and table fields cached for this identification
+        string, returning the blocks data or None if it isn't there"""
+        try:
+            with open(self._cache_filename()) as f:
+                structure = json_decode(f.read())
+        except (IOError, ValueError):
+            self.log.info("No valid cache of PandA blocks")
+            return None
+        if structure.get("idn") != idn:
+            self.log.info("Cached PandA blocks are for %r not %r",
+                          structure.get("idn"), idn)
+            return None
+        blocks_data = OrderedDict()
+        for block_name, number, description, fields in structure["blocks"]:
+            field_datas = OrderedDict()
+            for field_name, field_type, field_subtype, field_description, \
+                    labels in fields:
+                field_datas[str(field_name)] = FieldData(
+                    str(field_type), str(field_subtype),
+                    str(field_description), [str(x) for x in labels])
+            blocks_data[str(block_name)] = BlockData(
+                number, str(description), field_datas)
+        for block_name, field_name, table_fields in structure["tables"]:
+            self.client.table_fields[(str(block_name), str(field_name))] = \
+                OrderedDict((str(name), (bits_hi, bits_lo))
+                            for name, bits_hi, bits_lo in table_fields)
+        return blocks_data
+
+    def _save_cache(self, idn, blocks_data):
+        structure = OrderedDict()
+        structure["idn"] = idn
+        structure["blocks"] = [
+            [block_name, block_data.number, block_data.description, [
+                [field_name] + list(field_data)
+                for field_name, field_data in block_data.fields.items()]]
+            for block_name, block_data in blocks_data.items()]
+        structure["tables"] = [
+            [block_name, field_name, [
+                [name, bits_hi, bits_lo]
+                for name, (bits_hi, bits_lo) in table_fields.items()]]
+            for (block_name, field_name), table_fields in sorted(
+                self.client.table_fields.items())]
+        try:
+            with open(self._cache_filename(), "w") as f:
+                f.write(json_encode(structure, indent=2))
+        except IOError:
+            self.log.exception("Couldn't cache PandA blocks")
 
     def _make_child_controller(self, parts, mri):
         controller = call_with_params(
@@ -150,6 +307,10 @@ class PandABlocksManagerController(ManagerController):
 
         # Store the parts so we can update them with the poller
         self._blocks_parts[block_name] = maker.parts
+        for field_name, part in maker.parts.items():
+            self._fields["%s.%s" % (block_name, field_name)] = (
+                block_name, field_name, part,
+                block_data.fields.get(field_name, None))
 
         # setup param pos on a block with pos_out to inherit SCALE OFFSET UNITS
         pos_fields = []
@@ -263,8 +424,15 @@ class PandABlocksManagerController(ManagerController):
             # If we have a mirrored field then fire off a request
             for dest_field in self._mirrored_fields.get(full_field, []):
                 self.client.send("%s=%s\n" % (dest_field, val))
-            block_name, field_name = full_field.split(".", 1)
-            ret = self.update_attribute(block_name, field_name, val)
+            try:
+                block_name, field_name, part, field_data = \
+                    self._fields[full_field]
+            except KeyError:
+                self.log.debug("Field %s not known", full_field)
+                self.changes.pop(full_field)
+                continue
+            ret = self.update_attribute(
+                block_name, field_name, part, field_data, val)
             if ret is not None:
                 self.changes[full_field] = ret
             else:
@@ -273,18 +441,9 @@ class PandABlocksManagerController(ManagerController):
             if block_name.startswith("LUT") and field_name == "FUNC":
                 self._set_lut_icon(block_name)
 
-    def update_attribute(self, block_name, field_name, val):
+    def update_attribute(self, block_name, field_name, part, field_data, val):
         ret = None
-        if block_name not in self._blocks_parts:
-            self.log.debug("Block %s not known", block_name)
-            return
-        parts = self._blocks_parts[block_name]
-        if field_name not in parts:
-            self.log.debug("Block %s has no field %s", block_name, field_name)
-            return
-        part = parts[field_name]
         attr = part.attr
-        field_data = self._blocks_data[block_name].fields.get(field_name, None)
         if val == Exception:
             # TODO: set error
             val = None
@@ -305,7 +464,8 @@ class PandABlocksManagerController(ManagerController):
 
         # if we changed the value of a mux, update the slaved values
         if field_data and field_data.field_type in ("bit_mux", "pos_mux"):
-            current_part = parts[field_name + ".CURRENT"]
+            current_part = self._blocks_parts[block_name][
+                field_name + ".CURRENT"]
             current_attr = current_part.attr
             self._update_current_attr(current_attr, val)
             if field_data.field_type == "pos_mux" and field_name == "INP":
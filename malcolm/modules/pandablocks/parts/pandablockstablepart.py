@@ -1,3 +1,5 @@
+import numpy as np
+
 from malcolm.compat import OrderedDict
 from malcolm.core import Table, snake_to_camel, camel_to_title
 from malcolm.tags import widget
@@ -52,39 +54,61 @@ class PandABlocksTablePart(PandABlocksFieldPart):
         nconsume = int((max_bits_hi + 31) / 32)
         return nconsume
 
+    def _word_parts(self, bits_hi, bits_lo):
+        """Split a field into the parts that are in each 32-bit word
+
+        Yields:
+            tuple: (word, word_shift, field_shift, mask) where the part is
+                (words[word] >> word_shift) & mask, and is at field_shift bits
+                up in the field value
+        """
+        for word in range(bits_lo // 32, bits_hi // 32 + 1):
+            part_lo = max(bits_lo, 32 * word)
+            part_hi = min(bits_hi, 32 * word + 31)
+            mask = np.uint64(2 ** (part_hi - part_lo + 1) - 1)
+            yield (word, np.uint64(part_lo - 32 * word),
+                   np.uint64(part_lo - bits_lo), mask)
+
     def list_from_table(self, table):
         int_values = []
         if self.fields:
             nconsume = self._calc_nconsume()
-            for row in range(len(table[list(self.fields)[0]])):
-                int_value = 0
-                for name, (bits_hi, bits_lo) in self.fields.items():
-                    max_value = 2 ** (bits_hi - bits_lo + 1)
-                    field_value = int(table[name][row])
-                    assert field_value < max_value, \
-                        "Expected %s[%d] < %s, got %s" % (
-                            name, row, max_value, field_value)
-                    int_value |= field_value << bits_lo
-                # Split the big int into 32-bit numbers
-                for i in range(nconsume):
-                    int_values.append(int_value & (2 ** 32 - 1))
-                    int_value = int_value >> 32
+            nrows = len(table[list(self.fields)[0]])
+            words = np.zeros((nrows, nconsume), dtype=np.uint64)
+            for name, (bits_hi, bits_lo) in self.fields.items():
+                max_value = 2 ** (bits_hi - bits_lo + 1)
+                field_values = np.asarray(table[name]).astype(np.uint64)
+                if max_value <= np.iinfo(np.uint64).max:
+                    too_big = field_values >= np.uint64(max_value)
+                    if too_big.any():
+                        row = int(np.argmax(too_big))
+                        raise AssertionError(
+                            "Expected %s[%d] < %s, got %s" % (
+                                name, row, max_value, field_values[row]))
+                for word, word_shift, field_shift, mask in self._word_parts(
+                        bits_hi, bits_lo):
+                    words[:, word] |= \
+                        ((field_values >> field_shift) & mask) << word_shift
+            # Each row is nconsume 32-bit numbers, least significant first
+            int_values = words.ravel().tolist()
         return int_values
 
     def table_from_list(self, int_values):
-        table = Table(self.meta)
+        columns = {}
         if self.fields:
             nconsume = self._calc_nconsume()
-
-            for i in range(int(len(int_values) / nconsume)):
-                int_value = 0
-                for c in range(nconsume):
-                    int_value += int(int_values[i*nconsume+c]) << (32 * c)
-                row = []
-                for name, (bits_hi, bits_lo) in self.fields.items():
-                    mask = 2 ** (bits_hi + 1) - 1
-                    field_value = (int_value & mask) >> bits_lo
-                    row.append(field_value)
-                table.append(row)
-        return table
-
+            nrows = int(len(int_values) / nconsume)
+            words = np.array(int_values[:nrows * nconsume]).astype(
+                np.uint64).reshape((nrows, nconsume))
+            for name, (bits_hi, bits_lo) in self.fields.items():
+                field_values = np.zeros(nrows, dtype=np.uint64)
+                for word, word_shift, field_shift, mask in self._word_parts(
+                        bits_hi, bits_lo):
+                    field_values |= \
+                        ((words[:, word] >> word_shift) & mask) << field_shift
+                column_meta = self.meta.elements[name]
+                if isinstance(column_meta, BooleanArrayMeta):
+                    columns[name] = field_values.astype(np.bool_)
+                else:
+                    columns[name] = field_values.astype(column_meta.dtype)
+        return Table(self.meta, columns)
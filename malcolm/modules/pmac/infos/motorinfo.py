@@ -31,32 +31,9 @@ class MotorInfo(Info):
         ramp_distance = (v1 + v2) * ramp_time / 2
         return ramp_distance
 
-    def _make_padded_ramp(self, v1, v2, pad_velocity, total_time):
-        """Makes a ramp that looks like this:
-
-        v1 \______ pad_velocity
-           |      |\
-           |      | \v2
-         t1   tp   t2
-        Such that whole section takes total_time
-        """
-        # The time taken to ramp from v1 to pad_velocity
-        t1 = self.acceleration_time(v1, pad_velocity)
-        # Then on to v2
-        t2 = self.acceleration_time(pad_velocity, v2)
-        # The distance during the pad
-        tp = total_time - t1 - t2
-        # Yield the points
-        yield t1, pad_velocity
-        yield tp, pad_velocity
-        yield t2, v2
-
     def _calculate_hat_params(self, v1, v2, acceleration, distance):
         # Calculate how long to spend at max velocity
-        if acceleration > 0:
-            vm = self.max_velocity
-        else:
-            vm = -self.max_velocity
+        vm = np.where(acceleration > 0, 1.0, -1.0) * self.max_velocity
         t1 = self.acceleration_time(v1, vm)
         d1 = self.ramp_distance(v1, vm, t1)
         t2 = self.acceleration_time(vm, v2)
@@ -65,8 +42,8 @@ class MotorInfo(Info):
         tm = dm / vm
         return t1, tm, t2, vm
 
-    def _make_hat(self, v1, v2, acceleration, distance, min_time):
-        """Make a hat that looks like this:
+    def _make_hats(self, v1, v2, acceleration, distance, min_time):
+        """Make hats that look like this:
 
             ______ vm
         v1 /|   | \
@@ -77,61 +54,175 @@ class MotorInfo(Info):
         Such that the area under the graph (d1+d2+d3) is distance and
         t1+t2+t3 >= min_time
         """
-        if min_time > 0:
-            # We are trying to meet time constraints
-            # Solve quadratic to give vm
-            b = v1 + v2 + min_time * acceleration
-            c = distance * acceleration + (v1*v1 + v2*v2) / 2
-            op = b*b - 4 * c
-            if np.isclose(op, 0):
-                # Might have a negative number as rounding error...
-                op = 0
-            elif op < 0:
-                # Can't do this, set something massive to fail vm check...
-                op = 10000000000
-
-            def get_times(vm):
-                t1 = (vm - v1) / acceleration
-                t2 = (vm - v2) / acceleration
-                tm = min_time - t1 - t2
-                assert -self.max_velocity <= vm <= self.max_velocity
-                assert t1 >= 0 and t2 >= 0 and tm >= 0
-                return t1, tm, t2
-
-            try:
-                # Try negative root
-                vm = (b - np.sqrt(op)) / 2
-                t1, tm, t2 = get_times(vm)
-            except AssertionError:
-                try:
-                    # Try positive root
-                    vm = (b + np.sqrt(op)) / 2
-                    t1, tm, t2 = get_times(vm)
-                except AssertionError:
-                    # If vm is out of range or any segment takes negative time,
-                    # we can't do it in min_time, so act as if unconstrained
-                    t1, tm, t2, vm = self._calculate_hat_params(
-                        v1, v2, acceleration, distance)
-        else:
-            t1, tm, t2, vm = self._calculate_hat_params(
-                v1, v2, acceleration, distance)
+        # If we can't do it in min_time, act as if unconstrained
+        t1, tm, t2, vm = self._calculate_hat_params(
+            v1, v2, acceleration, distance)
+        # Where we are trying to meet time constraints, solve quadratic to
+        # give vm
+        b = v1 + v2 + min_time * acceleration
+        c = distance * acceleration + (v1*v1 + v2*v2) / 2
+        op = b*b - 4 * c
+        # Might have a negative number as rounding error...
+        op[np.isclose(op, 0)] = 0
+        # Can't do this, set something massive to fail vm check...
+        op[op < 0] = 10000000000
+        solved = min_time <= 0
+        # Try negative root, then positive root
+        for root in (b - np.sqrt(op), b + np.sqrt(op)):
+            root_vm = root / 2
+            root_t1 = (root_vm - v1) / acceleration
+            root_t2 = (root_vm - v2) / acceleration
+            root_tm = min_time - root_t1 - root_t2
+            # If vm is out of range or any segment takes negative time, this
+            # root won't do
+            valid = ~solved & (-self.max_velocity <= root_vm) & \
+                (root_vm <= self.max_velocity) & (root_t1 >= 0) & \
+                (root_t2 >= 0) & (root_tm >= 0)
+            t1[valid] = root_t1[valid]
+            tm[valid] = root_tm[valid]
+            t2[valid] = root_t2[valid]
+            vm[valid] = root_vm[valid]
+            solved |= valid
 
         # If middle segment needs to be negative time then we need to cap
         # vm and spend no time at vm
-        if tm <= 0:
+        capped = tm <= 0
+        if capped.any():
             # Solve the quadratic to work out how long to spend accelerating
-            vm = np.sqrt(
-                (2 * acceleration * distance + v1 * v1 + v2 * v2) / 2)
-            if acceleration < 0:
-                vm = -vm
-            t1 = self.acceleration_time(v1, vm)
-            t2 = self.acceleration_time(vm, v2)
-            tm = 0
-
-        # Yield the result
-        yield t1, vm
-        yield tm, vm
-        yield t2, v2
+            with np.errstate(invalid="ignore"):
+                capped_vm = np.sqrt(
+                    (2 * acceleration * distance + v1 * v1 + v2 * v2) / 2)
+            capped_vm[acceleration < 0] *= -1
+            vm[capped] = capped_vm[capped]
+            t1[capped] = self.acceleration_time(v1, vm)[capped]
+            t2[capped] = self.acceleration_time(vm, v2)[capped]
+            tm[capped] = 0
+        return t1, tm, t2, vm
+
+    def _solve_moves(self, v1, v2, distance, min_time):
+        """Work out the velocity profile segments for each move
+
+        Returns:
+            tuple: (t1, tm, t2, vm) arrays where each move accelerates to vm
+                in t1, stays there for tm, then goes to v2 in t2, before
+                settling at v2 for velocity_settle
+        """
+        # Take off the settle time and distance
+        min_time = np.where(
+            min_time > 0, min_time - self.velocity_settle, min_time)
+        distance = distance - self.velocity_settle * v2
+        # The ramp time and distance of a continuous ramp from v1 to v2
+        ramp_time = self.acceleration_time(v1, v2)
+        ramp_distance = self.ramp_distance(v1, v2, ramp_time)
+        remaining_distance = distance - ramp_distance
+        # Check if we need to stretch in time
+        stretch = min_time > ramp_time
+        # Check how fast we would need to be going so that the total move
+        # completes in min_time
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pad_velocity = remaining_distance / (min_time - ramp_time)
+        # If we can't just pad the ramp, make a hat pointing up or down
+        hat_up = np.where(
+            stretch, pad_velocity > np.maximum(v1, v2),
+            remaining_distance >= 0)
+        hat_down = np.where(
+            stretch, pad_velocity < np.minimum(v1, v2),
+            remaining_distance < 0)
+        acceleration = np.where(
+            hat_down, -self.acceleration, self.acceleration)
+        t1, tm, t2, vm = self._make_hats(
+            v1, v2, acceleration, distance, min_time)
+        # Otherwise make a padded ramp that looks like this:
+        #
+        # v1 \______ pad_velocity
+        #    |      |\
+        #    |      | \v2
+        #  t1   tp   t2
+        padded = ~(hat_up | hat_down)
+        if padded.any():
+            vm[padded] = pad_velocity[padded]
+            t1[padded] = self.acceleration_time(v1, vm)[padded]
+            t2[padded] = self.acceleration_time(vm, v2)[padded]
+            tm[padded] = (min_time - t1 - t2)[padded]
+        return t1, tm, t2, vm
+
+    def make_velocity_profiles(self, v1, v2, distance, min_time):
+        """Calculate PVT points for many moves at once
+
+        Args:
+            v1 (np.ndarray): Starting velocities in EGUs/s
+            v2 (np.ndarray): Ending velocities in EGUs/s
+            distance (np.ndarray): Relative distances to travel in EGUs
+            min_time (np.ndarray): The minimum times the moves should take
+
+        Returns:
+            tuple: (time_array, velocity_array) 2D arrays with a row for each
+                move of the relative time points in seconds, and the velocity
+                in EGUs/s that the motor should be at them. Every row has the
+                same number of points, so some segments may take zero time
+        """
+        v1, v2, distance, min_time = np.broadcast_arrays(*[
+            np.asarray(x, dtype=float) for x in (v1, v2, distance, min_time)])
+        t1, tm, t2, vm = self._solve_moves(v1, v2, distance, min_time)
+        assert (t1 >= 0).all() and (tm >= 0).all() and (t2 >= 0).all(), \
+            "Got negative t %s %s %s" % (t1, tm, t2)
+        # Add on the settle time
+        settle = np.full(len(v1), self.velocity_settle)
+        time_array = np.cumsum(
+            [np.zeros(len(v1)), t1, tm, t2, settle], axis=0).T
+        velocity_array = np.array([v1, vm, vm, v2, v2]).T
+        return time_array, velocity_array
+
+    @staticmethod
+    def make_consistent_velocity_profiles(motor_infos, v1s, v2s, distances,
+                                          min_time):
+        """Calculate PVT points for many moves of several axes at once, making
+        each move take the same time for every axis
+
+        Args:
+            motor_infos (dict): {axis_name: MotorInfo}
+            v1s (dict): {axis_name: np.ndarray of starting velocities}
+            v2s (dict): {axis_name: np.ndarray of ending velocities}
+            distances (dict): {axis_name: np.ndarray of distances}
+            min_time (float): The minimum time any move should take
+
+        Returns:
+            tuple: (time_arrays, velocity_arrays) of {axis_name: 2D array}
+                as returned from make_velocity_profiles
+        """
+        num = len(next(iter(v1s.values())))
+        min_times = np.full(num, float(min_time))
+        time_arrays = {}
+        velocity_arrays = {}
+        # The moves that don't have a consistent time yet
+        todo = np.arange(num)
+        iterations = 5
+        while iterations > 0:
+            for axis_name, motor_info in motor_infos.items():
+                time_array, velocity_array = motor_info.make_velocity_profiles(
+                    v1s[axis_name][todo], v2s[axis_name][todo],
+                    distances[axis_name][todo], min_times[todo])
+                end_times = time_array[:, -1]
+                assert ((end_times >= min_times[todo]) |
+                        np.isclose(end_times, min_times[todo])).all(), \
+                    "Times %s for %s take less time than %s" % (
+                        end_times, axis_name, min_times[todo])
+                if axis_name not in time_arrays:
+                    time_arrays[axis_name] = time_array
+                    velocity_arrays[axis_name] = velocity_array
+                else:
+                    time_arrays[axis_name][todo] = time_array
+                    velocity_arrays[axis_name][todo] = velocity_array
+            new_min_times = np.max(
+                [t[todo, -1] for t in time_arrays.values()], axis=0)
+            # Stretch the moves that aren't consistent and go round again
+            consistent = np.isclose(new_min_times, min_times[todo])
+            min_times[todo] = new_min_times
+            todo = todo[~consistent]
+            if len(todo) == 0:
+                return time_arrays, velocity_arrays
+            iterations -= 1
+        raise ValueError("Can't get a consistent time in 5 iterations")
 
     def make_velocity_profile(self, v1, v2, distance, min_time):
         """Calculate PVT points that will perform the move within motor params
@@ -147,40 +238,13 @@ class MotorInfo(Info):
                 relative time points in seconds, and position_list is the
                 position in EGUs that the motor should be
         """
-        # Take off the settle time and distance
-        if min_time > 0:
-            min_time -= self.velocity_settle
-        distance -= self.velocity_settle * v2
-        # The ramp time and distance of a continuous ramp from v1 to v2
-        ramp_time = self.acceleration_time(v1, v2)
-        ramp_distance = self.ramp_distance(v1, v2, ramp_time)
-        remaining_distance = distance - ramp_distance
-        # Check if we need to stretch in time
-        if min_time > ramp_time:
-            # Check how fast we would need to be going so that the total move
-            # completes in min_time
-            pad_velocity = remaining_distance / (min_time - ramp_time)
-            if pad_velocity > max(v1, v2):
-                # Can't just pad the ramp, make a hat pointing up
-                it = self._make_hat(
-                    v1, v2, self.acceleration, distance, min_time)
-            elif pad_velocity < min(v1, v2):
-                # Can't just pad the ramp, make a hat pointing down
-                it = self._make_hat(
-                    v1, v2, -self.acceleration, distance, min_time)
-            else:
-                # Make a padded ramp
-                it = self._make_padded_ramp(v1, v2, pad_velocity, min_time)
-        elif remaining_distance < 0:
-            # Make a hat pointing down
-            it = self._make_hat(v1, v2, -self.acceleration, distance, min_time)
-        else:
-            # Make a hat pointing up
-            it = self._make_hat(v1, v2, self.acceleration, distance, min_time)
+        arrays = [np.array([x], dtype=float)
+                  for x in (v1, v2, distance, min_time)]
+        t1, tm, t2, vm = [x.item() for x in self._solve_moves(*arrays)]
         # Create the time and velocity arrays
         time_array = [0.0]
         velocity_array = [v1]
-        for t, v in it:
+        for t, v in ((t1, vm), (tm, vm), (t2, v2)):
             assert t >= 0, "Got negative t %s" % t
             if t == 0:
                 assert v == velocity_array[-1], \
@@ -2,6 +2,7 @@
 from __future__ import division
 
 from collections import Counter
+import time
 
 import numpy as np
 from scanpointgenerator import CompoundGenerator
@@ -12,6 +13,7 @@ from malcolm.modules.builtin.vmetas import StringArrayMeta, NumberMeta
 from malcolm.modules.pmac.infos import MotorInfo
 from malcolm.modules.scanning.controllers import RunnableController
 from malcolm.modules.scanning.infos import ParameterTweakInfo
+from malcolm.modules.scanpointgenerator.points import get_points
 from malcolm.modules.scanpointgenerator.vmetas import PointGeneratorMeta
 from malcolm.tags import widget, config
 
@@ -43,6 +45,16 @@ TRIG_ZERO = 8        # Capture 0, Frame 0, Detector 0
 # How many profile points to write each time
 PROFILE_POINTS = 10000
 
+# When sizing chunks from a target headroom, the smallest chunk to write
+MIN_PROFILE_POINTS = 100
+
+# When sizing chunks from a target headroom, how much longer than the last
+# chunk took to calculate the points written ahead of the PMAC should last
+COMPUTE_TIME_MARGIN = 1.5
+
+# How many points the PMAC profile arrays can hold
+MAX_NUM_POINTS = 4000000
+
 # All possible PMAC CS axis assignment
 cs_axis_names = list("ABCUVWXYZ")
 
@@ -55,9 +67,96 @@ configure_args = (
 )
 
 
+class ProfileBuffer(object):
+    """Profile points that have been calculated but not yet written, held in
+    a pair of numpy buffers preallocated to hold a chunk of points. Chunks
+    taken to write are views into one buffer while the leftover points are
+    moved to the start of the other, so a chunk can be put to the child Block
+    without copying, and stays valid until the next call to take()"""
+
+    def __init__(self, axis_names, size=PROFILE_POINTS):
+        self.axis_names = list(axis_names)
+        self.size = size
+        self._length = 0
+        self._arrays = self._allocate(size)
+        self._spare_arrays = self._allocate(size)
+
+    def _allocate(self, size):
+        arrays = dict(time_array=np.empty(size),
+                      velocity_mode=np.empty(size, dtype=np.int32),
+                      user_programs=np.empty(size, dtype=np.int32))
+        for axis_name in self.axis_names:
+            arrays[("trajectory", axis_name)] = np.empty(size)
+        return arrays
+
+    def _views(self, arrays, start, end):
+        views = dict(trajectory={})
+        for k, array in arrays.items():
+            if isinstance(k, tuple):
+                views["trajectory"][k[1]] = array[start:end]
+            else:
+                views[k] = array[start:end]
+        return views
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, item):
+        return self._views(self._arrays, 0, self._length)[item]
+
+    def extend(self, time_array, velocity_mode, user_programs, trajectory):
+        """Add points to the end of the profile
+
+        Args:
+            time_array (np.ndarray): Times in seconds
+            velocity_mode (np.ndarray): Velocity modes like PREV_TO_NEXT
+            user_programs (np.ndarray): User programs like TRIG_LIVE_FRAME
+            trajectory (dict): {axis_name: np.ndarray of positions in EGUs}
+        """
+        start = self._length
+        end = start + len(time_array)
+        capacity = len(self._arrays["time_array"])
+        if end > capacity:
+            # No chunk is a view of the current buffer, so we can replace it
+            arrays = self._allocate(max(end, 2 * capacity))
+            for k, array in self._arrays.items():
+                arrays[k][:start] = array[:start]
+            self._arrays = arrays
+        self._arrays["time_array"][start:end] = time_array
+        self._arrays["velocity_mode"][start:end] = velocity_mode
+        self._arrays["user_programs"][start:end] = user_programs
+        for axis_name in self.axis_names:
+            self._arrays[("trajectory", axis_name)][start:end] = \
+                trajectory[axis_name]
+        self._length = end
+
+    def take(self, num):
+        """Remove up to num points from the start of the profile
+
+        Returns:
+            dict: {time_array/velocity_mode/user_programs: np.ndarray,
+                trajectory: {axis_name: np.ndarray}}
+        """
+        num = min(num, self._length)
+        chunk = self._views(self._arrays, 0, num)
+        # Move the leftover points to the start of the spare buffer, which
+        # holds the previous chunk, and swap the buffers
+        leftover = self._length - num
+        if len(self._spare_arrays["time_array"]) < leftover:
+            self._spare_arrays = self._allocate(max(self.size, leftover))
+        for k, array in self._arrays.items():
+            self._spare_arrays[k][:leftover] = array[num:self._length]
+        self._arrays, self._spare_arrays = self._spare_arrays, self._arrays
+        self._length = leftover
+        return chunk
+
+
 @method_also_takes(
     "minTurnaround", NumberMeta(
-        "float64", "Min time for any gaps between frames"), 0.0)
+        "float64", "Min time for any gaps between frames"), 0.0,
+    "targetHeadroom", NumberMeta(
+        "float64", "Seconds of trajectory to keep written ahead of the PMAC, "
+        "or 0 to write chunks of PROFILE_POINTS"), 0.0)
 class PmacTrajectoryPart(StatefulChildPart):
     # Axis information stored from validate
     # {scannable_name: MotorInfo}
@@ -70,13 +169,26 @@ class PmacTrajectoryPart(StatefulChildPart):
     end_index = 0
     # Where we should stop loading points
     steps_up_to = 0
-    # Profile points that haven't been sent yet
-    # {time_array/velocity_mode/trajectory/user_programs: [elements]}
-    profile = {}
+    # ProfileBuffer of profile points that haven't been sent yet
+    profile = None
     # Stored generator for positions
     generator = None
     # Min turnaround time
     min_turnaround = None
+    # Number of profile points written to the PMAC since the last build
+    points_sent = 0
+    # Spawned calculating the next chunk of profile points in the background
+    prefetch = None
+    # Profile points written to the PMAC but not yet scanned
+    buffer_headroom = None
+    # How long the last chunk of profile points took to calculate
+    chunk_compute_time = None
+    # Seconds of trajectory to keep written ahead of the PMAC
+    target_headroom = None
+    # How many profile points to calculate and write each time
+    chunk_points = None
+    # How few profile points can be left before writing the next chunk
+    refill_points = None
 
     def create_attribute_models(self):
         for data in super(PmacTrajectoryPart, self).create_attribute_models():
@@ -90,6 +202,37 @@ class PmacTrajectoryPart(StatefulChildPart):
             self.params.minTurnaround)
         yield "minTurnaround", self.min_turnaround, \
               self.min_turnaround.set_value
+        # Create writeable attribute for how far ahead of the PMAC to write,
+        # and read-only attributes for the chunk sizes this gives
+        meta = NumberMeta(
+            "float64", "Seconds of trajectory to keep written ahead of the "
+            "PMAC, or 0 to write chunks of PROFILE_POINTS",
+            tags=[widget("textinput"), config()])
+        self.target_headroom = meta.create_attribute_model(
+            self.params.targetHeadroom)
+        yield "targetHeadroom", self.target_headroom, \
+              self.target_headroom.set_value
+        meta = NumberMeta(
+            "int32", "Number of profile points calculated and written at a "
+            "time", tags=[widget("textupdate")])
+        self.chunk_points = meta.create_attribute_model(PROFILE_POINTS)
+        yield "chunkPoints", self.chunk_points, None
+        meta = NumberMeta(
+            "int32", "Number of unscanned profile points that triggers "
+            "writing the next chunk", tags=[widget("textupdate")])
+        self.refill_points = meta.create_attribute_model(PROFILE_POINTS)
+        yield "refillPoints", self.refill_points, None
+        # Create read-only attributes to show how close we are to underrun
+        meta = NumberMeta(
+            "int32", "Profile points written to the PMAC but not yet scanned",
+            tags=[widget("textupdate")])
+        self.buffer_headroom = meta.create_attribute_model(0)
+        yield "bufferHeadroom", self.buffer_headroom, None
+        meta = NumberMeta(
+            "float64", "Time taken to calculate the last chunk of profile "
+            "points in seconds", tags=[widget("textupdate")])
+        self.chunk_compute_time = meta.create_attribute_model(0.0)
+        yield "chunkComputeTime", self.chunk_compute_time, None
 
     @RunnableController.Reset
     def reset(self, context):
@@ -156,26 +299,34 @@ class PmacTrajectoryPart(StatefulChildPart):
     def configure(self, context, completed_steps, steps_to_do, part_info,
                   params):
         context.unsubscribe_all()
+        # Let any chunk left over from the last scan finish calculating
+        if self.prefetch:
+            self.prefetch.wait()
         child = context.block_view(self.params.mri)
-        child.numPoints.put_value(4000000)
+        child.numPoints.put_value(MAX_NUM_POINTS)
         self.generator = params.generator
         cs_port, self.axis_mapping = self._make_axis_mapping(
             part_info, params.axesToMove)
         # Set the right CS to move
         child.cs.put_value(cs_port)
-        self.completed_steps_lookup = []
-        self.profile = dict(time_array=[], velocity_mode=[], user_programs=[],
-                            trajectory={name: [] for name in self.axis_mapping})
         future = self.move_to_start(child, completed_steps)
         self.steps_up_to = completed_steps + steps_to_do
         self.completed_steps_lookup = []
-        self.profile = dict(time_array=[], velocity_mode=[], user_programs=[],
-                            trajectory={name: [] for name in self.axis_mapping})
+        # Until we have calculated some points, assume they are all captures
+        # and live frames
+        self.size_chunks(2, self.generator.duration, 0.0)
+        self.profile = ProfileBuffer(
+            self.axis_mapping, self.chunk_points.value)
+        start = time.time()
         self.calculate_generator_profile(completed_steps, do_run_up=True)
+        self.chunk_calculated(time.time() - start)
         context.wait_all_futures(future)
-        self.profile = self.write_profile_points(child, **self.profile)
+        self.points_sent = self.write_profile_points(
+            child, self.profile, self.chunk_points.value)
+        self.buffer_headroom.set_value(self.points_sent)
         # Max size of array
         child.buildProfile()
+        self.start_prefetch()
 
     @RunnableController.Run
     @RunnableController.Resume
@@ -209,26 +360,89 @@ class PmacTrajectoryPart(StatefulChildPart):
         if scanned > 0:
             completed_steps = self.completed_steps_lookup[scanned - 1]
             update_completed_steps(completed_steps, self)
-            # Keep PROFILE_POINTS trajectory points in front
-            if not self.loading and self.end_index < self.steps_up_to and \
-                    len(self.completed_steps_lookup) - scanned < PROFILE_POINTS:
+            self.buffer_headroom.set_value(self.points_sent - scanned)
+            # Keep refill_points trajectory points in front
+            if not self.loading and (self.prefetch or self.profile) and \
+                    self.points_sent - scanned < self.refill_points.value:
                 self.loading = True
-                self.calculate_generator_profile(self.end_index)
-                self.profile = self.write_profile_points(child, **self.profile)
+                # The next chunk should already have been calculated
+                self.wait_for_prefetch()
+                self.points_sent += self.write_profile_points(
+                    child, self.profile, self.chunk_points.value)
                 child.appendProfile()
 
                 # If we got to the end, there might be some leftover points that
                 # need to be appended to finish
-                if self.end_index == self.steps_up_to and \
-                        self.profile["time_array"]:
-                    self.profile = self.write_profile_points(
-                        child, **self.profile)
-                    assert not self.profile["time_array"], \
-                        "Why do we still have points? %s" % self.profile
+                if self.end_index == self.steps_up_to and self.profile:
+                    self.points_sent += self.write_profile_points(
+                        child, self.profile, self.chunk_points.value)
+                    assert not self.profile, \
+                        "Why do we still have %d points?" % len(self.profile)
                     child.appendProfile()
 
+                self.buffer_headroom.set_value(self.points_sent - scanned)
+                self.start_prefetch()
                 self.loading = False
 
+    def start_prefetch(self):
+        """Start calculating the next chunk of profile points in the
+        background if there are any more to calculate"""
+        if self.end_index < self.steps_up_to:
+            self.prefetch = self.spawn(self.calculate_next_chunk)
+        else:
+            self.prefetch = None
+
+    def calculate_next_chunk(self):
+        start = time.time()
+        self.calculate_generator_profile(self.end_index)
+        self.chunk_calculated(time.time() - start)
+
+    def chunk_calculated(self, compute_time):
+        """Record how long a chunk took to calculate, and size the next one
+        from the points in the profile"""
+        self.chunk_compute_time.set_value(compute_time)
+        duration = self.profile["time_array"].sum()
+        if duration > 0:
+            self.size_chunks(len(self.profile), duration, compute_time)
+
+    def size_chunks(self, num_points, duration, compute_time):
+        """If there is a target headroom, set the refill threshold so the
+        points written ahead of the PMAC last for at least target_headroom
+        seconds, and for longer than it takes to calculate the next chunk, so
+        we are never left waiting for it with an empty PMAC. Chunks are then
+        the same size as the refill threshold. Otherwise use PROFILE_POINTS
+        for both
+
+        Args:
+            num_points (int): The number of profile points measured
+            duration (float): How long those points take to scan
+            compute_time (float): How long those points took to calculate
+        """
+        if self.target_headroom.value > 0:
+            points_per_second = num_points / duration
+            refill_time = max(self.target_headroom.value,
+                              compute_time * COMPUTE_TIME_MARGIN)
+            points = int(np.ceil(points_per_second * refill_time))
+            # The PMAC has to hold the points we are keeping in front, as well
+            # as the chunk we write when we get down to them
+            points = min(max(points, MIN_PROFILE_POINTS), MAX_NUM_POINTS // 2)
+            if compute_time > duration:
+                self.log.warning(
+                    "Calculating %d points took %.3fs, but they only take "
+                    "%.3fs to scan, so the PMAC will run out of points",
+                    num_points, compute_time, duration)
+        else:
+            points = PROFILE_POINTS
+        self.chunk_points.set_value(points)
+        self.refill_points.set_value(points)
+
+    def wait_for_prefetch(self):
+        """Wait for the next chunk of profile points to be calculated, raising
+        any error that occurred calculating it"""
+        if self.prefetch:
+            prefetch, self.prefetch = self.prefetch, None
+            prefetch.get()
+
     def point_velocities(self, point):
         """Find the velocities of each axis over the current point"""
         velocities = {}
@@ -241,89 +455,81 @@ class PmacTrajectoryPart(StatefulChildPart):
             velocities[axis_name] = velocity
         return velocities
 
-    def make_consistent_velocity_profiles(self, v1s, v2s, distances,
-                                          min_time=MIN_TIME):
-        """Make consistent time and velocity arrays for each axis"""
-        time_arrays = {}
-        velocity_arrays = {}
-        iterations = 5
-        while iterations > 0:
-            for axis_name, motor_info in self.axis_mapping.items():
-                time_arrays[axis_name], velocity_arrays[axis_name] = \
-                    motor_info.make_velocity_profile(
-                        v1s[axis_name], v2s[axis_name], distances[axis_name],
-                        min_time)
-                assert time_arrays[axis_name][-1] >= min_time or np.isclose(
-                        time_arrays[axis_name][-1], min_time), \
-                    "Time %s velocity %s for %s takes less time than %s" % (
-                        time_arrays[axis_name], velocity_arrays[axis_name],
-                        axis_name, min_time)
-            new_min_time = max(t[-1] for t in time_arrays.values())
-            if np.isclose(new_min_time, min_time):
-                # We've got our consistent set
-                return time_arrays, velocity_arrays
-            else:
-                min_time = new_min_time
-                iterations -= 1
-        raise ValueError("Can't get a consistent time in 5 iterations")
-
     def move_to_start(self, child, start_index):
         """Move to the run up position ready to start the scan"""
-        first_point = self.generator.get_point(start_index)
+        points = get_points(self.generator, start_index, start_index + 1)
+        velocities = self.points_velocities(points, [0])
         zero_velocities = {}
         current_positions = {}
         distances = {}
 
-        for axis_name, velocity in self.point_velocities(first_point).items():
+        for axis_name, velocity in velocities.items():
             motor_info = self.axis_mapping[axis_name]
-            acceleration_distance = motor_info.ramp_distance(0, velocity)
-            zero_velocities[axis_name] = 0
-            start_pos = first_point.lower[axis_name] - acceleration_distance
+            acceleration_distance = motor_info.ramp_distance(0, velocity[0])
+            zero_velocities[axis_name] = np.zeros(1)
+            start_pos = points.lower[axis_name][0] - acceleration_distance
             current_positions[axis_name] = motor_info.current_position
-            distances[axis_name] = start_pos - motor_info.current_position
+            distances[axis_name] = np.array(
+                [start_pos - motor_info.current_position])
 
         # Work out the velocity profiles of how to move to the start
-        time_arrays, velocity_arrays = self.make_consistent_velocity_profiles(
-            zero_velocities, zero_velocities, distances)
+        time_arrays, velocity_arrays = \
+            MotorInfo.make_consistent_velocity_profiles(
+                self.axis_mapping, zero_velocities, zero_velocities,
+                distances, MIN_TIME)
+        move_time = max(t[0, -1] for t in time_arrays.values())
 
         # If the reported move is tiny, we don't have to try and move
-        if max(ts[-1] for ts in time_arrays.values()) < 0.01:
+        if move_time < 0.01:
             return []
 
-        # Work out the Position trajectories from these velocity profiles
-        self.calculate_profile_from_velocities(
-            time_arrays, velocity_arrays, current_positions, 0)
-
-        # Write the profiles, checking there are no left over points
-        profile = self.write_profile_points(child, **self.profile)
-        assert not profile["time_array"], "Leftover points %s" % profile
+        # Interpolate the velocity profiles at about INTERPOLATE_INTERVAL,
+        # making sure there are at least 2 points
+        num_intervals = max(int(np.floor(move_time / INTERPOLATE_INTERVAL)), 2)
+        interval = move_time / num_intervals
+        times = interval * np.arange(1, num_intervals + 1)
+        velocity_mode = np.full(num_intervals, PREV_TO_NEXT, dtype=int)
+        velocity_mode[-1] = CURRENT_TO_NEXT
+        trajectory = {}
+        for axis_name in self.axis_mapping:
+            trajectory[axis_name] = self.interpolate_positions(
+                np.repeat(time_arrays[axis_name], num_intervals, axis=0),
+                np.repeat(velocity_arrays[axis_name], num_intervals, axis=0),
+                np.full(num_intervals, current_positions[axis_name]), times)
+        segment = dict(
+            time_array=np.full(num_intervals, interval),
+            velocity_mode=velocity_mode,
+            user_programs=np.full(num_intervals, TRIG_ZERO, dtype=int),
+            trajectory=trajectory)
+
+        # Write the profile, which is separate from the scan's profile
+        profile = ProfileBuffer(self.axis_mapping, len(segment["time_array"]))
+        profile.extend(
+            segment["time_array"], segment["velocity_mode"],
+            segment["user_programs"], segment["trajectory"])
+        self.write_profile_points(child, profile, len(profile))
         child.buildProfile()
         future = child.executeProfile_async()
         return future
 
-    def write_profile_points(self, child, time_array, velocity_mode,
-                             user_programs, trajectory):
-        """Build profile using given data
+    def write_profile_points(self, child, profile, num_points):
+        """Build profile using the next chunk of points from profile
 
         Args:
             child (Block): Child block for running
-            time_array (list): List of times in ms
-            velocity_mode (list): List of velocity modes like PREV_TO_NEXT
-            trajectory (dict): {axis_name: [positions in EGUs]}
-            user_programs (list): List of user programs like TRIG_LIVE_FRAME
+            profile (ProfileBuffer): Profile to take points from
+            num_points (int): The maximum number of points to take
+
+        Returns:
+            int: The number of points written
         """
-        # Overflow profiles go here
-        profile = dict(
-            time_array=time_array[PROFILE_POINTS:],
-            velocity_mode=velocity_mode[PROFILE_POINTS:],
-            user_programs=user_programs[PROFILE_POINTS:],
-            trajectory={k: v[PROFILE_POINTS:] for k, v in trajectory.items()})
+        chunk = profile.take(num_points)
 
         # Work out which axes should be used and set their resolutions and
         # offsets
         use = []
         attr_dict = dict()
-        for axis_name in trajectory:
+        for axis_name in chunk["trajectory"]:
             motor_info = self.axis_mapping[axis_name]
             cs_axis = motor_info.cs_axis
             use.append(cs_axis)
@@ -333,115 +539,74 @@ class PmacTrajectoryPart(StatefulChildPart):
             attr_dict["use%s" % cs_axis] = cs_axis in use
         child.put_attribute_values(attr_dict)
 
-        # Process the time in ticks
-        overflow = 0.0
-        time_array_ticks = []
-        for t in time_array[:PROFILE_POINTS]:
-            ticks = t / TICK_S
-            overflow += (ticks % 1)
-            ticks = int(ticks)
-            if overflow > 0.5:
-                overflow -= 1
-                ticks += 1
-            time_array_ticks.append(ticks)
-
         # Set the trajectories
+        time_array_ticks = self.time_array_to_ticks(chunk["time_array"])
         attr_dict = dict(
             timeArray=time_array_ticks,
-            velocityMode=velocity_mode[:PROFILE_POINTS],
-            userPrograms=user_programs[:PROFILE_POINTS],
+            velocityMode=chunk["velocity_mode"],
+            userPrograms=chunk["user_programs"],
             pointsToBuild=len(time_array_ticks)
         )
-        for axis_name, axis_points in trajectory.items():
+        for axis_name, axis_points in chunk["trajectory"].items():
             motor_info = self.axis_mapping[axis_name]
             cs_axis = motor_info.cs_axis
-            attr_dict["positions%s" % cs_axis] = axis_points[:PROFILE_POINTS]
+            attr_dict["positions%s" % cs_axis] = axis_points
         child.put_attribute_values(attr_dict)
-        return profile
+        return len(time_array_ticks)
+
+    @staticmethod
+    def time_array_to_ticks(time_array):
+        """Convert times in seconds to whole ticks, carrying the fractional
+        parts along so that the total time doesn't drift
+
+        Args:
+            time_array (np.ndarray): Times in seconds
+
+        Returns:
+            np.ndarray: int32 array of times in ticks
+        """
+        ticks = time_array / TICK_S
+        whole_ticks = np.floor(ticks)
+        # Add a tick to a point whenever the accumulated fractional part
+        # exceeds half a tick, leaving it in (-0.5, 0.5]
+        carried = np.ceil(np.cumsum(ticks - whole_ticks) - 0.5)
+        extra_ticks = np.diff(np.concatenate(([0], carried)))
+        return (whole_ticks + extra_ticks).astype(np.int32)
 
     def reset_triggers(self, context):
         """Just call a Move to the run up position ready to start the scan"""
         child = context.block_view(self.params.mri)
         child.numPoints.put_value(10)
-        self.write_profile_points(child,
-                                  time_array=[0.1],
-                                  velocity_mode=[ZERO_VELOCITY],
-                                  user_programs=[TRIG_ZERO],
-                                  trajectory={})
+        profile = ProfileBuffer([])
+        profile.extend(time_array=[0.1], velocity_mode=[ZERO_VELOCITY],
+                       user_programs=[TRIG_ZERO], trajectory={})
+        self.write_profile_points(child, profile, len(profile))
         child.buildProfile()
         child.executeProfile()
 
-    def calculate_profile_from_velocities(self, time_arrays, velocity_arrays,
-                                          current_positions, completed_steps):
-        trajectory = {}
-
-        # Interpolate the velocity arrays at about INTERPOLATE_INTERVAL
-        move_time = max(t[-1] for t in time_arrays.values())
-        # Make sure there are at least 2 of them
-        num_intervals = max(int(np.floor(move_time / INTERPOLATE_INTERVAL)), 2)
-        interval = move_time / num_intervals
-        self.profile["time_array"] += [interval] * num_intervals
-        self.profile["velocity_mode"] += \
-            [PREV_TO_NEXT] * (num_intervals - 1) + [CURRENT_TO_NEXT]
-        self.profile["user_programs"] += [TRIG_ZERO] * num_intervals
-        self.completed_steps_lookup += [completed_steps] * num_intervals
-
-        # Do this for each velocity array
-        for axis_name, motor_info in self.axis_mapping.items():
-            trajectory[axis_name] = []
-            ts = time_arrays[axis_name]
-            vs = velocity_arrays[axis_name]
-            position = current_positions[axis_name]
-            for i in range(num_intervals):
-                time = interval * (i + 1)
-                # If we have exceeded the current segment, pop it and add it's
-                # position in
-                if time > ts[1] and not np.isclose(time, ts[1]):
-                    position += motor_info.ramp_distance(
-                        vs[0], vs[1], ts[1] - ts[0])
-                    vs = vs[1:]
-                    ts = ts[1:]
-                assert len(ts) > 1, \
-                    "Bad %s time %s velocity %s" % (time, ts, vs)
-                fraction = (time - ts[0]) / (ts[1] - ts[0])
-                velocity = fraction * (vs[1] - vs[0]) + vs[0]
-                part_position = motor_info.ramp_distance(
-                    vs[0], velocity, time - ts[0])
-                self.profile["trajectory"][axis_name].append(
-                    position + part_position)
+    def add_profile_segment(self, segment):
+        """Add a segment made by make_generator_segment or
+        make_gap_segment to the end of the profile"""
+        self.profile.extend(
+            segment["time_array"], segment["velocity_mode"],
+            segment["user_programs"], segment["trajectory"])
+        self.completed_steps_lookup += segment["completed_steps"].tolist()
 
     def add_profile_point(self, time_point, velocity_point, user_point,
                           completed_step, axis_points):
+        segment = dict(
+            time_array=np.array([time_point]),
+            velocity_mode=np.array([velocity_point]),
+            user_programs=np.array([user_point]),
+            completed_steps=np.array([completed_step]),
+            trajectory={k: np.array([v]) for k, v in axis_points.items()})
 
         # Add padding if the move time exceeds the max pmac move time
         if time_point > MAX_MOVE_TIME:
-            assert self.profile["time_array"], \
-                "Can't stretch the first point of a profile"
             nsplit = int(time_point / MAX_MOVE_TIME + 1)
-            for _ in range(nsplit):
-                self.profile["time_array"].append(time_point / nsplit)
-            for _ in range(nsplit - 1):
-                self.profile["velocity_mode"].append(PREV_TO_NEXT)
-                self.profile["user_programs"].append(NO_PROGRAM)
-            for k, v in axis_points.items():
-                last_point = self.profile["trajectory"][k][-1]
-                per_section = float(v - last_point) / nsplit
-                for i in range(1, nsplit):
-                    self.profile["trajectory"][k].append(
-                        last_point + i * per_section)
-            last_completed_step = self.completed_steps_lookup[-1]
-            for _ in range(nsplit - 1):
-                self.completed_steps_lookup.append(last_completed_step)
-        else:
-            # Add point
-            self.profile["time_array"].append(time_point)
+            segment = self.split_long_moves(segment, np.array([nsplit]))
 
-        # Set the requested point
-        self.profile["velocity_mode"].append(velocity_point)
-        self.profile["user_programs"].append(user_point)
-        self.completed_steps_lookup.append(completed_step)
-        for k, v in axis_points.items():
-            self.profile["trajectory"][k].append(v)
+        self.add_profile_segment(segment)
 
     def calculate_generator_profile(self, start_index, do_run_up=False):
         # If we are doing the first build, do_run_up will be passed to flag
@@ -463,36 +628,19 @@ class PmacTrajectoryPart(StatefulChildPart):
                 run_up_time, CURRENT_TO_NEXT, TRIG_LIVE_FRAME, start_index,
                 axis_points)
 
-        for i in range(start_index, self.steps_up_to):
-            point = self.generator.get_point(i)
-
-            # Add position
-            self.add_profile_point(
-                point.duration / 2.0, PREV_TO_NEXT, TRIG_CAPTURE, i,
-                {name: point.positions[name] for name in self.axis_mapping})
-
-            # If there will be more frames, insert next live frame
-            if i + 1 < self.steps_up_to:
-                self.add_profile_point(
-                    point.duration / 2.0, PREV_TO_NEXT, TRIG_LIVE_FRAME, i + 1,
-                    {name: point.upper[name] for name in self.axis_mapping})
-
-                # Check if we need to insert the lower bound of next_point
-                next_point = self.generator.get_point(i + 1)
-
-                # Check if we need to insert a gap
-                if not self.points_joined(point, next_point):
-                    self.insert_gap(point, next_point, i + 1)
-            else:
-                # No more frames, dead frame to finish
-                self.add_profile_point(
-                    point.duration / 2.0, PREV_TO_CURRENT, TRIG_DEAD_FRAME,
-                    i + 1,
-                    {name: point.upper[name] for name in self.axis_mapping})
+        index = start_index
+        while index < self.steps_up_to:
+            # Every point makes at least 2 profile points, so this is the most
+            # we can need to fill the profile
+            needed = self.chunk_points.value - len(self.profile)
+            end_index = min(index + max((needed + 1) // 2, 1),
+                            self.steps_up_to)
+            segment, index = self.make_generator_segment(index, end_index)
+            self.add_profile_segment(segment)
 
             # Check if we have exceeded the points number and need to write
-            if len(self.profile["time_array"]) >= PROFILE_POINTS:
-                self.end_index = i + 1
+            if len(self.profile) >= self.chunk_points.value:
+                self.end_index = index
                 return
 
         # Add the last tail off point
@@ -513,38 +661,254 @@ class PmacTrajectoryPart(StatefulChildPart):
                                self.steps_up_to, axis_points)
         self.end_index = self.steps_up_to
 
-    def points_joined(self, point, next_point):
-        # Check for axes that need to move within the space between points
-        for axis_name, motor_info in self.axis_mapping.items():
-            if point.upper[axis_name] != next_point.lower[axis_name]:
-                return False
-        return True
-
-    def insert_gap(self, point, next_point, completed_steps):
-        # Change last point to be dead frame
-        self.profile["velocity_mode"][-1] = PREV_TO_CURRENT
-        self.profile["user_programs"][-1] = TRIG_DEAD_FRAME
-
-        # Work out the start and end velocities for each axis
-        start_velocities = self.point_velocities(point)
-        end_velocities = self.point_velocities(next_point)
-        start_positions = {}
+    def make_generator_segment(self, start_index, end_index):
+        """Make the profile segment for generator points start_index up to
+        end_index, stopping early if the profile would fill up
+
+        Returns:
+            tuple: (segment, next_index) where segment is a dict of
+                {time_array/velocity_mode/user_programs/completed_steps:
+                array, trajectory: {axis_name: array}}, and next_index is the
+                index of the first generator point not in it
+        """
+        # Get the next point too if there is one to see if we need a gap
+        points = get_points(self.generator, start_index,
+                            min(end_index + 1, self.steps_up_to))
+        num = end_index - start_index
+        half_durations = points.duration[:num] / 2.0
+        # A point is followed by a gap if it doesn't join onto the next point
+        gaps = np.zeros(num, dtype=bool)
+        has_next = len(points) - 1
+        for axis_name in self.axis_mapping:
+            gaps[:has_next] |= \
+                points.upper[axis_name][:-1] != points.lower[axis_name][1:]
+
+        # Each point makes a capture point, and a live frame point that is
+        # stretched into multiple points if it exceeds the max pmac move time
+        nsplits = np.ones(num, dtype=int)
+        long_moves = half_durations > MAX_MOVE_TIME
+        nsplits[long_moves] = \
+            (half_durations[long_moves] / MAX_MOVE_TIME + 1).astype(int)
+        cumulative = len(self.profile) + np.cumsum(2 * nsplits)
+
+        # Work out the moves for all the gaps at once
+        gap_indexes = np.nonzero(gaps)[0]
+        time_arrays, velocity_arrays = self.calculate_gap_velocity_profiles(
+            points, gap_indexes)
+        move_times = np.max(
+            [time_arrays[k][:, -1] for k in self.axis_mapping], axis=0)
+        # Interpolate them at about INTERPOLATE_INTERVAL, making sure there
+        # are at least 2 points
+        gap_lengths = np.zeros(num, dtype=int)
+        gap_lengths[gap_indexes] = np.maximum(
+            np.floor(move_times / INTERPOLATE_INTERVAL), 2)
+        cumulative += np.cumsum(gap_lengths)
+
+        # Stop after the point that fills up the profile
+        full = np.nonzero(cumulative >= self.chunk_points.value)[0]
+        if len(full):
+            num = full[0] + 1
+
+        # Make the capture and live frame points for each generator point
+        indexes = np.arange(start_index, start_index + num)
+        time_array = np.repeat(half_durations[:num], 2)
+        velocity_mode = np.full(2 * num, PREV_TO_NEXT, dtype=int)
+        user_programs = np.empty(2 * num, dtype=int)
+        user_programs[::2] = TRIG_CAPTURE
+        user_programs[1::2] = TRIG_LIVE_FRAME
+        completed_steps = np.repeat(indexes, 2)
+        completed_steps[1::2] += 1
+        trajectory = {}
+        for axis_name in self.axis_mapping:
+            trajectory[axis_name] = np.empty(2 * num)
+            trajectory[axis_name][::2] = points.positions[axis_name][:num]
+            trajectory[axis_name][1::2] = points.upper[axis_name][:num]
+        # The frame before a gap, or at the end of the scan, is a dead frame
+        dead_frames = gaps[:num].copy()
+        if start_index + num == self.steps_up_to:
+            dead_frames[-1] = True
+        velocity_mode[1::2][dead_frames] = PREV_TO_CURRENT
+        user_programs[1::2][dead_frames] = TRIG_DEAD_FRAME
+        segment = dict(
+            time_array=time_array, velocity_mode=velocity_mode,
+            user_programs=user_programs, completed_steps=completed_steps,
+            trajectory=trajectory)
+
+        # Insert the gaps after the live frame point of the relevant point
+        nsplits = np.repeat(nsplits[:num], 2)
+        included = gap_indexes < num
+        if included.any():
+            gap_indexes = gap_indexes[included]
+            gap_segment = self.make_gap_segment(
+                points, start_index, gap_indexes, gap_lengths[gap_indexes],
+                {k: v[included] for k, v in time_arrays.items()},
+                {k: v[included] for k, v in velocity_arrays.items()})
+            insert_at = np.repeat(2 * (gap_indexes + 1),
+                                  gap_lengths[gap_indexes])
+            for k in ("time_array", "velocity_mode", "user_programs",
+                      "completed_steps"):
+                segment[k] = np.insert(segment[k], insert_at, gap_segment[k])
+            for k, v in gap_segment["trajectory"].items():
+                segment["trajectory"][k] = np.insert(
+                    segment["trajectory"][k], insert_at, v)
+            # Gap points are never stretched
+            nsplits = np.insert(nsplits, insert_at, 1)
+
+        # Stretch the long moves
+        if long_moves[:num].any():
+            segment = self.split_long_moves(segment, nsplits)
+
+        return segment, start_index + num
+
+    def split_long_moves(self, segment, nsplits):
+        """Stretch any points with a time longer than the max pmac move time
+        into nsplits points that move evenly to the requested position
+
+        Args:
+            segment (dict): Profile segment of requested points
+            nsplits (np.ndarray): How many points to split each point into
+        """
+        assert self.profile or nsplits[0] == 1, \
+            "Can't stretch the first point of a profile"
+        # The points we are stretching from
+        num = len(nsplits)
+        is_last = np.cumsum(nsplits) - 1
+        # For each new point, which requested point it comes from, and how
+        # many sections it is into that move
+        requested = np.repeat(np.arange(num), nsplits)
+        section = np.arange(len(requested)) - np.repeat(
+            is_last - nsplits + 1, nsplits) + 1
+        split = dict(
+            time_array=np.repeat(segment["time_array"] / nsplits, nsplits),
+            velocity_mode=np.full(len(requested), PREV_TO_NEXT, dtype=int),
+            user_programs=np.full(len(requested), NO_PROGRAM, dtype=int),
+            completed_steps=np.empty(len(requested), dtype=int),
+            trajectory={})
+        for k in ("velocity_mode", "user_programs", "completed_steps"):
+            split[k][is_last] = segment[k]
+        # Padding points count as the previous point's completed step
+        previous_steps = np.empty(num, dtype=int)
+        if self.completed_steps_lookup:
+            previous_steps[0] = self.completed_steps_lookup[-1]
+        previous_steps[1:] = segment["completed_steps"][:-1]
+        padding = np.ones(len(requested), dtype=bool)
+        padding[is_last] = False
+        split["completed_steps"][padding] = previous_steps[requested[padding]]
+        for axis_name, positions in segment["trajectory"].items():
+            last_points = np.empty(num)
+            if self.profile:
+                last_points[0] = self.profile["trajectory"][axis_name][-1]
+            last_points[1:] = positions[:-1]
+            per_section = (positions - last_points) / nsplits
+            trajectory = last_points[requested] + \
+                section * per_section[requested]
+            trajectory[is_last] = positions
+            split["trajectory"][axis_name] = trajectory
+        return split
+
+    def calculate_gap_velocity_profiles(self, points, gap_indexes):
+        """Work out the velocity profiles of how to move from the end of each
+        of points[gap_indexes] to the start of the point after it
+
+        Returns:
+            tuple: (time_arrays, velocity_arrays) of {axis_name: 2D array}
+                as returned from MotorInfo.make_consistent_velocity_profiles
+        """
+        next_indexes = gap_indexes + 1
+        start_velocities = self.points_velocities(points, gap_indexes)
+        end_velocities = self.points_velocities(points, next_indexes)
         distances = {}
+        for axis_name in self.axis_mapping:
+            distances[axis_name] = points.lower[axis_name][next_indexes] - \
+                points.upper[axis_name][gap_indexes]
+        return MotorInfo.make_consistent_velocity_profiles(
+            self.axis_mapping, start_velocities, end_velocities, distances,
+            self.min_turnaround.value)
+
+    def points_velocities(self, points, indexes):
+        """Find the velocities of each axis over points[indexes]"""
+        velocities = {}
         for axis_name, motor_info in self.axis_mapping.items():
-            start_positions[axis_name] = point.upper[axis_name]
-            distances[axis_name] = \
-                next_point.lower[axis_name] - point.upper[axis_name]
+            full_distances = points.upper[axis_name][indexes] - \
+                points.lower[axis_name][indexes]
+            velocity = full_distances / points.duration[indexes]
+            invalid = np.abs(velocity) >= motor_info.max_velocity
+            assert not invalid.any(), \
+                "Velocity %s invalid for %r with max_velocity %s" % (
+                    velocity[invalid][0], axis_name, motor_info.max_velocity)
+            velocities[axis_name] = velocity
+        return velocities
 
-        # Work out the velocity profiles of how to move to the start
-        time_arrays, velocity_arrays = \
-            self.make_consistent_velocity_profiles(
-                start_velocities, end_velocities, distances,
-                self.min_turnaround.value)
+    def make_gap_segment(self, points, start_index, gap_indexes, gap_lengths,
+                         time_arrays, velocity_arrays):
+        """Make a profile segment with the moves from the end of each of
+        points[gap_indexes] to the start of the point after it
 
-        # Work out the Position trajectories from these profiles
-        self.calculate_profile_from_velocities(
-            time_arrays, velocity_arrays, start_positions, completed_steps)
+        Args:
+            points (Points): The generator points from start_index
+            start_index (int): The generator index of the first of points
+            gap_indexes (np.ndarray): Which of points are followed by a gap
+            gap_lengths (np.ndarray): How many profile points each gap takes
+            time_arrays (dict): {axis_name: 2D array of times for each gap}
+            velocity_arrays (dict): {axis_name: 2D array of velocities}
+        """
+        # For each profile point, which gap it is in and how far through
+        gaps = np.repeat(np.arange(len(gap_indexes)), gap_lengths)
+        ends = np.cumsum(gap_lengths)
+        intervals = np.max(
+            [t[:, -1] for t in time_arrays.values()], axis=0) / gap_lengths
+        sections = np.arange(len(gaps)) - np.repeat(ends - gap_lengths,
+                                                    gap_lengths) + 1
+        times = intervals[gaps] * sections
+        velocity_mode = np.full(len(gaps), PREV_TO_NEXT, dtype=int)
+        user_programs = np.full(len(gaps), TRIG_ZERO, dtype=int)
+        # Change the last point of each gap to be a live frame
+        velocity_mode[ends - 1] = CURRENT_TO_NEXT
+        user_programs[ends - 1] = TRIG_LIVE_FRAME
+        trajectory = {}
+        for axis_name, motor_info in self.axis_mapping.items():
+            start_positions = points.upper[axis_name][gap_indexes]
+            trajectory[axis_name] = self.interpolate_positions(
+                time_arrays[axis_name][gaps], velocity_arrays[axis_name][gaps],
+                start_positions[gaps], times)
+        segment = dict(
+            time_array=intervals[gaps], velocity_mode=velocity_mode,
+            user_programs=user_programs,
+            completed_steps=start_index + gap_indexes[gaps] + 1,
+            trajectory=trajectory)
+        return segment
+
+    @staticmethod
+    def interpolate_positions(time_arrays, velocity_arrays, start_positions,
+                              times):
+        """Find the positions along velocity profiles at the given times
+
+        Args:
+            time_arrays (np.ndarray): 2D array of time points for each profile
+            velocity_arrays (np.ndarray): 2D array of velocities at them
+            start_positions (np.ndarray): The position at the start of each
+            times (np.ndarray): The time to find the position at for each
 
-        # Change the last point to be a live frame
-        self.profile["velocity_mode"][-1] = CURRENT_TO_NEXT
-        self.profile["user_programs"][-1] = TRIG_LIVE_FRAME
+        Returns:
+            np.ndarray: The positions
+        """
+        rows = np.arange(len(times))
+        # Positions at the start of each segment of the profiles
+        distances = (velocity_arrays[:, :-1] + velocity_arrays[:, 1:]) * \
+            np.diff(time_arrays) / 2
+        segment_positions = np.cumsum(np.column_stack(
+            (start_positions, distances)), axis=1)
+        # Which segment each time is in, counting times that are within
+        # rounding error of the end of a segment as in it
+        later = times[:, None] > time_arrays[:, 1:-1]
+        later &= ~np.isclose(times[:, None], time_arrays[:, 1:-1])
+        segments = np.sum(later, axis=1)
+        t0 = time_arrays[rows, segments]
+        t1 = time_arrays[rows, segments + 1]
+        v0 = velocity_arrays[rows, segments]
+        v1 = velocity_arrays[rows, segments + 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fractions = np.where(t1 > t0, (times - t0) / (t1 - t0), 0)
+        velocities = fractions * (v1 - v0) + v0
+        return segment_positions[rows, segments] + \
+            (v0 + velocities) * (times - t0) / 2
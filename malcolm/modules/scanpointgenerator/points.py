@@ -0,0 +1,132 @@
+import numpy as np
+from scanpointgenerator import Point
+
+
+class Points(object):
+    """Arrays of data for a range of points from a CompoundGenerator. Has the
+    same attributes as the Points that newer scanpointgenerators return from
+    get_points(), so the two can be used interchangeably
+
+    Attributes:
+        positions (dict): {axis: float array of positions}
+        lower (dict): {axis: float array of lower bounds}
+        upper (dict): {axis: float array of upper bounds}
+        indexes (np.ndarray): int array of dataset indexes for each point, with
+            shape (num_points, num_dimensions)
+        duration (np.ndarray): float array of point durations
+    """
+
+    def __init__(self, positions, lower, upper, indexes, duration):
+        self.positions = positions
+        self.lower = lower
+        self.upper = upper
+        self.indexes = indexes
+        self.duration = duration
+
+    def __len__(self):
+        return len(self.duration)
+
+    def __getitem__(self, i):
+        """Get a single Point"""
+        point = Point()
+        for axis in self.positions:
+            point.positions[axis] = self.positions[axis][i]
+            point.lower[axis] = self.lower[axis][i]
+            point.upper[axis] = self.upper[axis][i]
+        point.indexes = list(self.indexes[i])
+        point.duration = self.duration[i]
+        return point
+
+
+def get_points(generator, start, finish):
+    """Get the data for points start to finish-1 of a prepared generator
+
+    Uses the generator's own vectorized get_points() if this version of
+    scanpointgenerator has one, otherwise calculates the arrays from the
+    positions of each Dimension. Generators with mutators are done with
+    get_point() as mutators work a point at a time
+
+    Args:
+        generator (CompoundGenerator): The prepared generator
+        start (int): The index of the first point
+        finish (int): One more than the index of the last point
+
+    Returns:
+        Points: The data for these points
+    """
+    assert finish > start, "Can't get points %d to %d" % (start, finish)
+    if hasattr(generator, "get_points"):
+        return generator.get_points(start, finish)
+    elif generator.mutators:
+        return _get_points_from_get_point(generator, start, finish)
+    else:
+        return _get_points_from_dimensions(generator, start, finish)
+
+
+def _get_points_from_dimensions(generator, start, finish):
+    # This is CompoundGenerator.get_point() done for an array of n
+    n = np.arange(start, finish)
+    positions, lower, upper = {}, {}, {}
+    indexes = np.empty((len(n), len(generator.dimensions)), dtype=np.int64)
+    # The "cumulative" index in each dimension, for working out alternation
+    kc = np.zeros(len(n), dtype=np.int64)
+    last_dim = generator.dimensions[-1]
+    for d, dim in enumerate(generator.dimensions):
+        repeat = int(generator._dim_meta[dim]["repeat"])
+        i = (n // repeat) % dim.size
+        k = dim.indices[i]
+        if dim.alternate:
+            dim_reverse = kc % 2 == 1
+            i = np.where(dim_reverse, dim.size - i - 1, i)
+        else:
+            dim_reverse = np.zeros(len(n), dtype=bool)
+        kc = kc * dim.size + k
+        k = dim.indices[i]
+        indexes[:, d] = i
+        for g in dim.generators:
+            g_repeat = int(generator._generator_dim_scaling[g]["repeat"])
+            j = k // g_repeat
+            r = j // g.size
+            j %= g.size
+            if g is dim.generators[0]:
+                # top level generator running in reverse has bounds swapped
+                j_lower = np.where(dim_reverse, j + 1, j)
+                j_upper = np.where(dim_reverse, j, j + 1)
+            elif dim.alternate:
+                # inner generators alternate on odd runs of the outer one
+                backwards = r % 2 == 1
+                j = np.where(backwards, g.size - j - 1, j)
+                j_lower = np.where(backwards, j + 1, j)
+                j_upper = np.where(backwards, j, j + 1)
+            else:
+                j_lower, j_upper = j, j + 1
+            for axis in g.axes:
+                positions[axis] = g.positions[axis][j]
+                # apply "real" bounds to the "innermost" generator only
+                if generator.continuous and dim is last_dim and \
+                        g is dim.generators[-1]:
+                    lower[axis] = g.bounds[axis][j_lower]
+                    upper[axis] = g.bounds[axis][j_upper]
+                else:
+                    lower[axis] = positions[axis]
+                    upper[axis] = positions[axis]
+    duration = np.full(len(n), generator.duration, dtype=np.float64)
+    return Points(positions, lower, upper, indexes, duration)
+
+
+def _get_points_from_get_point(generator, start, finish):
+    num = finish - start
+    positions = {axis: np.empty(num) for axis in generator.axes}
+    lower = {axis: np.empty(num) for axis in generator.axes}
+    upper = {axis: np.empty(num) for axis in generator.axes}
+    indexes = np.empty((num, len(generator.dimensions)), dtype=np.int64)
+    duration = np.empty(num)
+    for i in range(num):
+        point = generator.get_point(start + i)
+        for axis in generator.axes:
+            positions[axis][i] = point.positions[axis]
+            lower[axis][i] = point.lower[axis]
+            upper[axis][i] = point.upper[axis]
+        indexes[i] = point.indexes
+        duration[i] = point.duration
+    return Points(positions, lower, upper, indexes, duration)
@@ -5,16 +5,18 @@ from tornado.websocket import websocket_connect
 from malcolm.modules.builtin.controllers import ClientComms
 from malcolm.core import Subscribe, deserialize_object, method_also_takes, \
     json_decode, json_encode, Response, Error, Unsubscribe, Update, Return, \
-    Queue, TimeoutError
+    Queue, TimeoutError, binary_decode, binary_encode
 from malcolm.modules.builtin.vmetas import StringMeta, NumberMeta, \
-    StringArrayMeta
+    StringArrayMeta, BooleanMeta
 from malcolm.tags import widget
 
 
 @method_also_takes(
     "hostname", StringMeta("Hostname of malcolm websocket server"), "localhost",
     "port", NumberMeta("int32", "Port number to run up under"), 8080,
-    "connectTimeout", NumberMeta("float64", "Time to wait for connection"), 5.0)
+    "connectTimeout", NumberMeta("float64", "Time to wait for connection"), 5.0,
+    "binary", BooleanMeta(
+        "Send numpy arrays as raw bytes in binary messages"), False)
 class WebsocketClientComms(ClientComms):
     """A class for a client to communicate with the server"""
     use_cothread = False
@@ -77,6 +79,8 @@ class WebsocketClientComms(ClientComms):
     @gen.coroutine
     def recv_loop(self):
         url = "ws://%(hostname)s:%(port)d/ws" % self.params
+        if self.params.binary:
+            url += "?format=binary"
         self._conn = yield websocket_connect(
             url, self.loop, connect_timeout=self.params.connectTimeout - 0.5)
         self._connected_queue.put(True)
@@ -111,11 +115,15 @@ class WebsocketClientComms(ClientComms):
         """Pass response from server to process receive queue
 
         Args:
-            message(str): Received message
+            message(str): Received message, bytes if it is binary
         """
         try:
-            self.log.debug("Got message %s", message)
-            d = json_decode(message)
+            if isinstance(message, bytes):
+                self.log.debug("Got binary message of %d bytes", len(message))
+                d = binary_decode(message)
+            else:
+                self.log.debug("Got message %s", message)
+                d = json_decode(message)
             response = deserialize_object(d, Response)
             if isinstance(response, (Return, Error)):
                 request, old_id = self._request_lookup.pop(response.id)
@@ -156,6 +164,10 @@ class WebsocketClientComms(ClientComms):
         self._send_request(request)
 
     def _send_request(self, request):
-        message = json_encode(request)
-        self.log.debug("Sending message %s", message)
-        self._conn.write_message(message)
+        if self.params.binary:
+            message = binary_encode(request)
+            self.log.debug("Sending binary message for %s", request)
+        else:
+            message = json_encode(request)
+            self.log.debug("Sending message %s", message)
+        self._conn.write_message(message, binary=self.params.binary)
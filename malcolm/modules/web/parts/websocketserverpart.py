@@ -2,7 +2,8 @@ from tornado.websocket import WebSocketHandler, WebSocketError
 
 from malcolm.modules.web.controllers import HTTPServerComms
 from malcolm.core import method_takes, Part, json_decode, deserialize_object, \
-    Request, json_encode, Subscribe, Unsubscribe, Delta, Update
+    Request, json_encode, Subscribe, Unsubscribe, Delta, Update, \
+    binary_decode, binary_encode
 from malcolm.modules.web.infos import HandlerInfo
 from malcolm.modules.builtin.vmetas import StringMeta
 
@@ -10,14 +11,22 @@ from malcolm.modules.builtin.vmetas import StringMeta
 class MalcWebSocketHandler(WebSocketHandler):  # pylint:disable=abstract-method
     _server_part = None
     _loop = None
+    _binary = False
 
     def initialize(self, server_part=None, loop=None):
         self._server_part = server_part
         self._loop = loop
 
+    def open(self):
+        # Clients connecting to ws?format=binary get binary responses
+        self._binary = self.get_argument("format", "json") == "binary"
+
     def on_message(self, message):
         # called in tornado's thread
-        d = json_decode(message)
+        if isinstance(message, bytes):
+            d = binary_decode(message)
+        else:
+            d = json_decode(message)
         request = deserialize_object(d, Request)
         request.set_callback(self.on_response)
         self._server_part.on_request(request)
@@ -25,7 +34,8 @@ class MalcWebSocketHandler(WebSocketHandler):  # pylint:disable=abstract-method
     def on_response(self, response):
         # called from any thread
         self._loop.add_callback(
-            self._server_part.on_response, response, self.write_message)
+            self._server_part.on_response, response, self.write_message,
+            self._binary)
 
     # http://stackoverflow.com/q/24851207
     # TODO: remove this when the web gui is hosted from the box
@@ -77,11 +87,14 @@ class WebsocketServerPart(Part):
         controller = self.process.get_controller(mri)
         controller.handle_request(request)
 
-    def on_response(self, response, write_message):
+    def on_response(self, response, write_message, binary=False):
         # called from tornado thread
-        message = json_encode(response)
+        if binary:
+            message = binary_encode(response)
+        else:
+            message = self._encode_response(response)
         try:
-            write_message(message)
+            write_message(message, binary=binary)
         except WebSocketError:
             if isinstance(response, (Delta, Update)):
                 request = self._subscription_keys[response.id]
@@ -89,6 +102,31 @@ class WebsocketServerPart(Part):
                 controller = self.process.get_controller(request.path[0])
                 controller.handle_request(unsubscribe)
 
+    def _encode_response(self, response):
+        # called from tornado thread
+        if isinstance(response, Delta):
+            name, payload = "changes", response.changes
+        elif isinstance(response, Update):
+            name, payload = "value", response.value
+        else:
+            return json_encode(response)
+        if response.notify_batch is None:
+            json_payload = json_encode(payload)
+        else:
+            # Every subscriber to a given node gets Responses from a notify
+            # that share the same serialized payload object, so only encode it
+            # for the first one. Keep a reference to payload so its id can't
+            # be reused while the batch is alive
+            try:
+                _, json_payload = response.notify_batch[id(payload)]
+            except KeyError:
+                json_payload = json_encode(payload)
+                response.notify_batch[id(payload)] = (payload, json_payload)
+        message = '{"typeid": %s, "id": %s, "%s": %s}' % (
+            json_encode(response.typeid), json_encode(response.id), name,
+            json_payload)
+        return message
+
     @HTTPServerComms.Publish
     def publish(self, context, publish):
         # called from any thread
@@ -1,7 +1,9 @@
 import unittest
-from mock import Mock
+from mock import Mock, MagicMock
 
+from malcolm.core.alarm import Alarm
 from malcolm.core.attribute import Attribute
+from malcolm.core.timestamp import TimeStamp
 from malcolm.core.ntscalar import NTScalar
 from malcolm.modules.builtin.vmetas import StringMeta
 
@@ -9,7 +11,7 @@ from malcolm.modules.builtin.vmetas import StringMeta
 class TestAttribute(unittest.TestCase):
     def setUp(self):
         self.data = NTScalar(StringMeta())
-        self.data.set_notifier_path(Mock(), ["block", "attr"])
+        self.data.set_notifier_path(MagicMock(), ["block", "attr"])
         self.controller = Mock()
         self.context = Mock()
         self.o = Attribute(self.controller, self.context, self.data)
@@ -33,7 +35,18 @@ class TestAttribute(unittest.TestCase):
         assert f == self.context.put_async.return_value
 
     def test_repr(self):
-        self.controller.make_view.return_value = "foo"
+        self.data.set_value("foo")
         assert repr(self.o) == "<Attribute value='foo'>"
-        self.controller.make_view.assert_called_once_with(
-            self.context, self.o, "value")
+        self.controller.make_view.assert_not_called()
+
+    def test_snapshot(self):
+        alarm = Alarm.major("bad")
+        ts = TimeStamp()
+        self.data.set_value_alarm_ts("foo", alarm, ts)
+        assert self.o.snapshot == ("foo", alarm, ts)
+        assert self.o.value == "foo"
+        assert self.o.alarm is alarm
+        assert self.o.timeStamp is ts
+        self.data.set_alarm()
+        assert self.o.snapshot == ("foo", Alarm.ok, ts)
+        self.controller.make_view.assert_not_called()
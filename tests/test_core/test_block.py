@@ -1,5 +1,5 @@
 import unittest
-from mock import Mock
+from mock import Mock, MagicMock
 
 from malcolm.core.block import make_block_view
 from malcolm.core.blockmodel import BlockModel
@@ -24,11 +24,23 @@ class TestBlock(unittest.TestCase):
 
     def test_put_attribute_values(self):
         self.o.put_attribute_values(dict(attr=43))
-        self.context.put_async.assert_called_once_with(
-            ["block", "attr", "value"], 43)
+        self.context.put_many_async.assert_called_once_with(
+            [(["block", "attr", "value"], 43)])
         self.context.wait_all_futures.assert_called_once_with(
-            [self.context.put_async.return_value], timeout=None)
+            self.context.put_many_async.return_value, timeout=None)
 
     def test_async_call(self):
         self.o.method_async(a=3)
         self.o.method.post_async.assert_called_once_with(a=3)
+
+    def test_subclass_cached(self):
+        o2 = make_block_view(self.controller, self.context, self.data)
+        assert type(o2) is type(self.o)
+        assert not self.o.endpoints_changed()
+        self.data.set_notifier_path(MagicMock(), ["block"])
+        self.data.set_endpoint_data(
+            "method", StringMeta().create_attribute_model())
+        assert self.o.endpoints_changed()
+        o3 = make_block_view(self.controller, self.context, self.data)
+        assert type(o3) is not type(self.o)
+        assert not hasattr(o3, "method_async")
@@ -43,6 +43,25 @@ class TestContext(unittest.TestCase):
         self.controller.handle_request.assert_called_once_with(
             Put(1, ["block", "attr", "value"], 32))
 
+    def test_put_many_async(self):
+        controller2 = MagicMock()
+        self.process.add_controller("block2", controller2)
+        fs = self.o.put_many_async([
+            (["block", "attr", "value"], 32),
+            (["block2", "attr", "value"], 33),
+            (["block", "attr2", "value"], 34)])
+        assert len(fs) == 3
+        self.controller.handle_requests.assert_called_once_with([
+            Put(1, ["block", "attr", "value"], 32),
+            Put(3, ["block", "attr2", "value"], 34)])
+        controller2.handle_requests.assert_called_once_with([
+            Put(2, ["block2", "attr", "value"], 33)])
+        self.controller.handle_request.assert_not_called()
+        self.o._q.put(Return(3, None))
+        self.o._q.put(Return(1, None))
+        self.o._q.put(Return(2, None))
+        self.o.wait_all_futures(fs, timeout=0.01)
+
     def test_put_failure(self):
         self.o._q.put(Error(1, "Test Exception"))
         with self.assertRaises(ResponseError) as cm:
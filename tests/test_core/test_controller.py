@@ -146,6 +146,54 @@ class TestController(unittest.TestCase):
         assert dict_view['a'].value == "hello_block"
         assert list_view[0].value == "hello_block"
 
+    def test_handle_requests(self):
+        q = Queue()
+        requests = [
+            Put(id=42, path=["mri", "myAttribute"], value="hello",
+                callback=q.put),
+            Get(id=43, path=["mri", "myAttribute", "meta"],
+                callback=q.put),
+            Put(id=44, path=["mri", "notAnAttribute"], value="no",
+                callback=q.put),
+            Subscribe(id=45, path=["mri", "myAttribute", "value"],
+                      callback=q.put)]
+        with patch.object(self.o, "spawn", wraps=self.o.spawn) as spawn:
+            spawned = self.o.handle_requests(requests)
+            for s in spawned:
+                s.wait(timeout=1)
+        # One spawn for the Puts, and one for the Get and Subscribe
+        assert spawn.call_count == 2
+        assert spawned[0] is spawned[2]
+        assert spawned[1] is spawned[3]
+        responses = {}
+        for _ in requests:
+            response = q.get(timeout=.1)
+            responses[response.id] = response
+        self.assertIsInstance(responses[42], Return)
+        assert responses[43].value["typeid"] == "malcolm:core/StringMeta:1.0"
+        self.assertIsInstance(responses[44], Error)
+        assert responses[45].value == "hello"
+
+    def test_handle_requests_put_responses_not_held(self):
+        q = Queue()
+
+        def put_second(value):
+            # The first put has already been responded to
+            assert q.get(timeout=0).id == 1
+
+        self.o.add_block_field("first", StringMeta().create_attribute_model(),
+                               lambda value: None)
+        self.o.add_block_field("second", StringMeta().create_attribute_model(),
+                               put_second)
+        self.o.handle_requests([
+            Put(id=1, path=["mri", "first", "value"], value="first",
+                callback=q.put),
+            Put(id=2, path=["mri", "second", "value"], value="second",
+                callback=q.put)])[0].wait(timeout=1)
+        response = q.get(timeout=1)
+        assert response.id == 2
+        self.assertIsInstance(response, Return)
+
     def test_handle_request(self):
         q = Queue()
 
@@ -1,5 +1,5 @@
 import unittest
-from mock import Mock
+from mock import Mock, patch
 from threading import RLock
 
 # module imports
@@ -140,3 +140,88 @@ class TestNotifier(unittest.TestCase):
             assert self.block.attr2.value == "tr"
         r1.callback.assert_called_once_with(Delta(
             changes=[[["attr", "value"], 33], [["attr2", "value"], "tr"]]))
+
+    def test_responses_share_notify_batch(self):
+        self.block["attr"] = Dummy()
+        self.block.attr["value"] = 32
+        r1 = Subscribe(path=["b"], delta=True, callback=Mock())
+        r2 = Subscribe(path=["b", "attr", "value"], callback=Mock())
+        self.handle_subscribe(r1)
+        self.handle_subscribe(r2)
+        batches = []
+        for i in range(2):
+            with self.o.changes_squashed:
+                self.block.attr["value"] = i
+                self.o.add_squashed_change(["b", "attr", "value"], i)
+            batch = r1.callback.call_args[0][0].notify_batch
+            assert r2.callback.call_args[0][0].notify_batch is batch
+            batches.append(batch)
+        assert batches[0] is not batches[1]
+
+    def test_serialize_once_for_many_subscribers(self):
+        # set some data
+        self.block["attr"] = Dummy()
+        self.block.attr["value"] = Dummy()
+        self.block.attr.value["x"] = 32
+        calls = {}
+        for n_subscribers in (1, 10, 40):
+            for i in range(n_subscribers):
+                for path, delta in ((["b"], True), (["b", "attr"], True),
+                                    (["b", "attr", "value"], False)):
+                    self.handle_subscribe(
+                        Subscribe(path=path, delta=delta, callback=Mock()))
+            with patch("malcolm.core.notifier.serialize_object",
+                       side_effect=serialize_object) as mock_serialize:
+                with self.o.changes_squashed:
+                    self.block.attr["value"] = Dummy()
+                    self.block.attr.value["x"] = n_subscribers
+                    self.o.add_squashed_change(
+                        ["b", "attr", "value"], self.block.attr.value)
+                calls[n_subscribers] = mock_serialize.call_count
+        # The changed value should be serialized once however many
+        # subscribers are listening to it
+        assert calls == {1: 1, 10: 1, 40: 1}
+
+    def test_intermediate_changes_squashed(self):
+        # set some data
+        self.block["attr"] = Dummy()
+        self.block.attr["value"] = 32
+        self.block.attr["alarm"] = "ok"
+        self.block["attr2"] = Dummy()
+        self.block.attr2["value"] = "st"
+        r1 = Subscribe(path=["b"], delta=True, callback=Mock())
+        self.handle_subscribe(r1)
+        r1.callback.reset_mock()
+        with self.o.changes_squashed:
+            # Same path set several times
+            for v in (33, 34, 35):
+                self.block.attr["value"] = v
+                self.o.add_squashed_change(["b", "attr", "value"], v)
+            self.block.attr["alarm"] = "bad"
+            self.o.add_squashed_change(["b", "attr", "alarm"], "bad")
+            # Child path set, then superseded by setting its parent
+            self.block.attr2["value"] = "tr"
+            self.o.add_squashed_change(["b", "attr2", "value"], "tr")
+            self.block["attr2"] = Dummy()
+            self.block.attr2["value"] = "uv"
+            self.o.add_squashed_change(["b", "attr2"], self.block.attr2)
+            # Child path set after parent is already included in it
+            self.block.attr2["value"] = "wx"
+            self.o.add_squashed_change(["b", "attr2", "value"], "wx")
+        r1.callback.assert_called_once_with(Delta(changes=[
+            [["attr", "value"], 35],
+            [["attr", "alarm"], "bad"],
+            [["attr2"], dict(value="wx")]]))
+
+    def test_squash_deletion(self):
+        self.block["attr"] = Dummy()
+        self.block.attr["value"] = 32
+        r1 = Subscribe(path=["b"], delta=True, callback=Mock())
+        self.handle_subscribe(r1)
+        r1.callback.reset_mock()
+        with self.o.changes_squashed:
+            self.block.attr["value"] = 33
+            self.o.add_squashed_change(["b", "attr", "value"], 33)
+            self.block.data.pop("attr")
+            self.o.add_squashed_change(["b", "attr"])
+        r1.callback.assert_called_once_with(Delta(changes=[[["attr"]]]))
@@ -1,6 +1,7 @@
 import unittest
 from mock import MagicMock
 
+from malcolm.compat import get_pool_num_threads, maybe_import_cothread
 from malcolm.core.process import Process
 from malcolm.core.controller import Controller
 
@@ -49,3 +50,27 @@ class TestProcess(unittest.TestCase):
         assert c.published == ["mri", "mri2"]
         self.o.remove_controller("mri2")
         assert c.published == ["mri"]
+
+    def test_spawn_in_named_pools(self):
+        self.o.set_pool_size("io", 2)
+        s = self.o.spawn(lambda: 3, (), {}, False, "io")
+        assert s.get(timeout=1) == 3
+        s = self.o.spawn(lambda: 4, (), {}, False)
+        assert s.get(timeout=1) == 4
+        assert [(p.name, p.num_threads) for p in self.o.pools] == [
+            ("io", 2), ("default", get_pool_num_threads())]
+        with self.assertRaises(AssertionError):
+            self.o.set_pool_size("io", 4)
+
+    @unittest.skipIf(not maybe_import_cothread(), "Needs cothread")
+    def test_cothread_spawn_makes_no_pool(self):
+        s = self.o.spawn(lambda: 3, (), {}, True)
+        assert s.get(timeout=1) == 3
+        assert self.o.pools == []
+
+    def test_finished_spawns_are_forgotten(self):
+        spawned = [self.o.spawn(lambda: None, (), {}, False)
+                   for _ in range(100)]
+        for s in spawned:
+            s.wait(timeout=1)
+        assert len(self.o._spawned) == 0
@@ -4,7 +4,7 @@ import unittest
 import numpy as np
 
 from malcolm.core.serializable import Serializable, deserialize_object, \
-    repr_object, json_encode
+    repr_object, json_encode, json_decode, binary_encode, binary_decode
 from malcolm.modules.builtin.vmetas.stringmeta import StringMeta
 
 
@@ -117,3 +117,44 @@ class TestSerialization(unittest.TestCase):
         s1 = DummySerializable(3, "foo", np.array([3, 4]))
         assert json_encode(s1) == \
             '{"typeid": "foo:1.0", "boo": 3, "bar": "foo", "NOT_CAMEL": [3, 4]}'
+
+
+class TestBinary(unittest.TestCase):
+    def test_round_trip(self):
+        s1 = DummySerializable(
+            np.arange(5, dtype=np.int32), u"foo",
+            dict(b=np.array([True, False]), e=np.zeros(0), n=np.int64(3),
+                 s=np.array(["a", "b"])))
+        d = binary_decode(binary_encode(s1))
+        assert d["typeid"] == "foo:1.0"
+        assert d["boo"].dtype == np.int32
+        assert not d["boo"].flags.writeable
+        np.testing.assert_equal(d["boo"], np.arange(5))
+        assert d["bar"] == "foo"
+        np.testing.assert_equal(d["NOT_CAMEL"]["b"], [True, False])
+        assert d["NOT_CAMEL"]["e"].shape == (0,)
+        assert d["NOT_CAMEL"]["n"] == 3
+        # Non-numeric arrays are sent as JSON lists
+        assert d["NOT_CAMEL"]["s"] == ["a", "b"]
+
+    def test_arrays_aligned(self):
+        message = binary_encode(
+            [np.arange(3, dtype=np.int8), np.arange(3, dtype=np.float64)])
+        a, b = binary_decode(message)
+        a_start = a.__array_interface__["data"][0]
+        b_start = b.__array_interface__["data"][0]
+        assert (a_start - b_start) % 8 == 0
+        assert (a_start - np.frombuffer(message, np.uint8).__array_interface__[
+            "data"][0]) % 8 == 0
+        np.testing.assert_equal(b, [0, 1, 2])
+
+    def test_large_array_not_copied(self):
+        value = dict(value=np.random.random(int(1e6)))
+        message = binary_encode(value)
+        # 8 bytes per float64 plus a small JSON header
+        assert int(8e6) < len(message) < int(8e6) + 1000
+        binary_value = binary_decode(message)["value"]
+        # The decoded array is a view into the message, not a copy
+        assert binary_value.base is not None
+        assert not binary_value.flags.owndata
+        np.testing.assert_equal(binary_value, value["value"])
@@ -57,3 +57,23 @@ class TestSpawned(unittest.TestCase):
 
     def test_not_use_cothread_err(self):
         self.do_spawn_err(False)
+
+    def test_on_done(self):
+        done = Queue()
+        s = Spawned(do_div, (40, 2, self.q), {}, False, self.pool, done.put)
+        assert done.get(1) is s
+        assert s.get() == 20
+
+    def test_on_done_before_wait_returns(self):
+        done = []
+        s = Spawned(do_div, (40, 2, self.q), {}, False, self.pool, done.append)
+        s.wait(1)
+        assert done == [s]
+
+    def test_many_waiters(self):
+        s = self.do_spawn(False)
+        waiters = [Spawned(s.wait, (1,), {}, False, self.pool)
+                   for _ in range(3)]
+        for w in waiters:
+            w.get(timeout=1)
+        assert s.get(timeout=1) == 20
@@ -0,0 +1,44 @@
+import unittest
+import time
+
+from malcolm.core.spawnpool import SpawnPool
+from malcolm.core.queue import Queue
+
+
+class TestSpawnPool(unittest.TestCase):
+
+    def setUp(self):
+        self.o = SpawnPool("pool", 1)
+
+    def tearDown(self):
+        self.o.close()
+
+    def test_init(self):
+        assert self.o.name == "pool"
+        assert self.o.num_threads == 1
+        assert self.o.queued == 0
+        assert self.o.active == 0
+        assert self.o.pop_max_wait() == 0
+
+    def test_queued_and_active(self):
+        started, release, done = Queue(), Queue(), Queue()
+
+        def blocker():
+            started.put(None)
+            release.get(1)
+
+        self.o.apply_async(blocker)
+        started.get(1)
+        # Only one thread, so the second has to wait for it
+        self.o.apply_async(lambda: done.put(None))
+        assert self.o.active == 1
+        assert self.o.queued == 1
+        time.sleep(0.05)
+        release.put(None)
+        done.get(1)
+        self.o.close()
+        assert self.o.active == 0
+        assert self.o.queued == 0
+        assert self.o.pop_max_wait() >= 0.05
+        # Popping resets it
+        assert self.o.pop_max_wait() == 0
@@ -1,7 +1,10 @@
 import unittest
+import threading
 
 from malcolm.core import call_with_params, Process, Post, Subscribe, Return, \
-    Update, Controller, Queue, TimeoutError
+    Update, Controller, Queue, TimeoutError, Context, Part, Alarm, Put, Get, \
+    Unsubscribe, Error
+from malcolm.modules.builtin.vmetas import NumberMeta
 from malcolm.modules.demo.parts import HelloPart, CounterPart
 
 
@@ -58,3 +61,150 @@ class TestCounterDemoSystem(unittest.TestCase):
         assert response.value == None
         with self.assertRaises(TimeoutError):
             q.get(timeout=0.05)
+
+
+class ManyAttributesPart(Part):
+    def create_attribute_models(self):
+        for i in range(200):
+            attr = NumberMeta("float64").create_attribute_model(i)
+            yield "attr%d" % i, attr, None
+
+
+class TestManyAttributesSystem(unittest.TestCase):
+    def setUp(self):
+        self.process = Process("proc")
+        parts = [ManyAttributesPart("many")]
+        self.controller = Controller(self.process, "many", parts)
+        self.process.add_controller("many", self.controller)
+        self.process.start()
+
+    def tearDown(self):
+        self.process.stop(timeout=1)
+
+    def test_block_view_reused(self):
+        context = Context(self.process)
+        block = context.block_view("many")
+        assert context.block_view("many") is block
+        # A new context gets a new view, but of the same class
+        block2 = Context(self.process).block_view("many")
+        assert block2 is not block
+        assert type(block2) is type(block)
+        # Changing the endpoints makes a new view of a new class
+        self.controller.add_block_field(
+            "extra", NumberMeta("int32").create_attribute_model(), None)
+        block3 = context.block_view("many")
+        assert block3 is not block
+        assert block3.extra.value == 0
+        assert not hasattr(block, "extra")
+
+    def test_attribute_access(self):
+        context = Context(self.process)
+        block = context.block_view("many")
+        for i in range(1000):
+            view = context.block_view("many")
+            assert view is block
+            assert view["attr%d" % (i % 200)].value == i % 200
+
+    def test_contended_reads(self):
+        attr = self.controller._block.attr0
+        attr.set_value(0, alarm=Alarm.major("0"))
+        n_readers = 8
+        reads = [0] * n_readers
+        errors = []
+        done = threading.Event()
+
+        # Each reader is a plain thread with its own context
+        blocks = [Context(self.process).block_view("many")
+                  for _ in range(n_readers)]
+
+        def read(i):
+            block = blocks[i]
+            last = -1
+            try:
+                while not done.is_set():
+                    snapshot = block.attr0.snapshot
+                    # Value, alarm and timeStamp always agree
+                    assert float(snapshot.alarm.message) == snapshot.value
+                    assert snapshot.value >= last
+                    last = snapshot.value
+                    reads[i] += 1
+            except Exception as e:
+                errors.append(e)
+
+        def write():
+            for i in range(2000):
+                attr.set_value(i, alarm=Alarm.major(str(i)))
+
+        threads = [threading.Thread(target=read, args=(i,))
+                   for i in range(n_readers)]
+        for t in threads:
+            t.start()
+        self.controller.spawn(write).wait(timeout=10)
+        done.set()
+        for t in threads:
+            t.join()
+        assert not errors
+        assert all(reads)
+        assert self.process.block_view("many").attr0.value == 1999
+
+
+class WritablePart(Part):
+    def create_attribute_models(self):
+        attr = NumberMeta("float64").create_attribute_model()
+        yield "attr", attr, attr.set_value
+
+
+class TestRequestStormSystem(unittest.TestCase):
+    def setUp(self):
+        self.process = Process("proc")
+        self.process.start()
+
+    def tearDown(self):
+        self.process.stop(timeout=1)
+
+    def storm(self, use_request_worker):
+        controller = Controller(self.process, "storm", [WritablePart("p")])
+        controller.use_request_worker = use_request_worker
+        self.process.add_controller("storm", controller)
+        queues = dict(put=Queue(), get=Queue(), sub=Queue())
+        n = 500
+        for i in range(n):
+            controller.handle_request(Put(
+                id=i * 4, path=["storm", "attr", "value"], value=i,
+                callback=queues["put"].put))
+            # Handled in order, so the Subscribe is gone by the next Put
+            controller.handle_requests([
+                Get(id=i * 4 + 1, path=["storm", "attr", "value"],
+                    callback=queues["get"].put),
+                Subscribe(id=i * 4 + 2, path=["storm", "attr", "value"],
+                          callback=queues["sub"].put),
+                Unsubscribe(id=i * 4 + 2, callback=queues["sub"].put)])
+        responses = {}
+        for name in ("put", "get"):
+            responses[name] = [queues[name].get(timeout=5) for _ in range(n)]
+        # Subscribes give Updates until their Unsubscribe gives a Return
+        responses["unsub"] = []
+        while len(responses["unsub"]) < n:
+            r = queues["sub"].get(timeout=5)
+            if not isinstance(r, Update):
+                responses["unsub"].append(r)
+        self.process.remove_controller("storm")
+        for name, rs in responses.items():
+            for r in rs:
+                self.assertNotIsInstance(r, Error)
+        # Each request got a response
+        assert sorted(r.id for r in responses["put"]) == list(
+            range(0, n * 4, 4))
+        assert sorted(r.id for r in responses["get"]) == list(
+            range(1, n * 4, 4))
+        assert sorted(r.id for r in responses["unsub"]) == list(
+            range(2, n * 4, 4))
+        # Every Get saw a value that was Put
+        for r in responses["get"]:
+            assert r.value in range(n)
+
+    def test_storm(self):
+        self.storm(use_request_worker=False)
+
+    def test_storm_request_worker(self):
+        self.storm(use_request_worker=True)
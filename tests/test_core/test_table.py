@@ -37,6 +37,42 @@ class TestTableInit(unittest.TestCase):
         assert "malcolm:core/Table:1.0" == t.typeid
 
 
+class TestTableFromRows(unittest.TestCase):
+    def setUp(self):
+        self.meta = Mock()
+        self.meta.elements = OrderedDict()
+        self.meta.elements["e1"] = StringArrayMeta()
+        self.meta.elements["e2"] = NumberArrayMeta("int32")
+        self.meta.elements["e3"] = NumberArrayMeta("float64")
+
+    def test_from_rows(self):
+        t = Table.from_rows(self.meta, [["a", 1, 1.5], ["b", 2, 2.5]])
+        assert ("a", "b") == t.e1
+        assert [1, 2] == list(t.e2)
+        assert "int32" == t.e2.dtype
+        assert [1.5, 2.5] == list(t.e3)
+        assert ["b", 2, 2.5] == t[1]
+
+    def test_from_no_rows(self):
+        t = Table.from_rows(self.meta, iter([]))
+        assert () == t.e1
+        assert [] == list(t.e2)
+
+    def test_from_rows_bad_row_raises(self):
+        with self.assertRaises(ValueError):
+            Table.from_rows(self.meta, [["a", 1, 1.5], ["b", 2]])
+
+    def test_from_rows_validates_each_column_once(self):
+        rows = [["row%d" % i, i, i / 2.0] for i in range(10000)]
+        for meta in self.meta.elements.values():
+            meta.validate = Mock(side_effect=meta.validate)
+        t = Table.from_rows(self.meta, rows)
+        for meta in self.meta.elements.values():
+            meta.validate.assert_called_once()
+        assert t.verify_column_lengths() == 10000
+        assert ["row9999", 9999, 4999.5] == t[9999]
+
+
 class TestTableRowOperations(unittest.TestCase):
     def setUp(self):
         meta = Mock()
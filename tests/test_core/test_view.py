@@ -47,3 +47,11 @@ class TestView(unittest.TestCase):
     def test_view_init_fails(self):
         with self.assertRaises(NotImplementedError):
             v = View()
+
+    def test_subclass_cached(self):
+        data2 = BlockMeta()
+        o2 = make_view(self.controller, self.context, data2)
+        assert type(o2) is type(self.o)
+        assert o2._data is data2
+        o3 = make_view(self.controller, self.context, {"a": 2})
+        assert type(o3) is not type(self.o)
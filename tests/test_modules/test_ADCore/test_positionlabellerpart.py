@@ -1,10 +1,15 @@
+from xml.etree import cElementTree as ET
+
 from mock import MagicMock, call, ANY
 
 from scanpointgenerator import LineGenerator, CompoundGenerator
 
+from malcolm.compat import et_to_string
 from malcolm.core import Context, call_with_params, Process, Future
 from malcolm.modules.ADCore.blocks import position_labeller_block
 from malcolm.modules.ADCore.parts import PositionLabellerPart
+from malcolm.modules.ADCore.parts.positionlabellerpart import \
+    XML_MAX_SIZE, POSITIONS_PER_XML
 from malcolm.modules.ADCore.infos import UniqueIdInfo
 from malcolm.testutil import ChildTestCase
 
@@ -90,3 +95,58 @@ class TestPositionLabellerPart(ChildTestCase):
 </pos_layout>""".replace("\n", "")
         assert child.mock_calls == [call.xml.put_value(expected_xml)]
         assert self.o.end_index == 6
+
+    def make_et_xml(self, generator, start_index, end_index):
+        root_el = ET.Element("pos_layout")
+        dimensions_el = ET.SubElement(root_el, "dimensions")
+        for i in range(len(generator.dimensions)):
+            ET.SubElement(dimensions_el, "dimension", name="d%d" % i)
+        ET.SubElement(dimensions_el, "dimension", name="FilePluginClose")
+        positions_el = ET.SubElement(root_el, "positions")
+        for i in range(start_index, end_index):
+            point = generator.get_point(i)
+            positions = dict(
+                FilePluginClose="%d" % (i == generator.size - 1))
+            for j, value in enumerate(point.indexes):
+                positions["d%d" % j] = str(value)
+            positions_el.append(ET.Element("position", **positions))
+        return et_to_string(root_el)
+
+    def test_make_xml_packs_positions(self):
+        xs = LineGenerator("x", "mm", 0.0, 0.5, 1000, alternate=True)
+        ys = LineGenerator("y", "mm", 0.0, 0.1, 100)
+        self.o.generator = CompoundGenerator([ys, xs], [], [])
+        self.o.generator.prepare()
+        self.o.steps_up_to = self.o.generator.size
+        xml, end_index = self.o._make_xml(50000)
+        assert xml == self.make_et_xml(self.o.generator, 50000, end_index)
+        # Packed as many positions as would fit
+        assert end_index == 70451
+        assert len(xml) < XML_MAX_SIZE
+        assert len(xml) + 50 > XML_MAX_SIZE
+
+    def test_load_more_positions_batch_size(self):
+        child = MagicMock()
+        xs = LineGenerator("x", "mm", 0.0, 0.5, 1000, alternate=True)
+        ys = LineGenerator("y", "mm", 0.0, 0.1, 100)
+        self.o.generator = CompoundGenerator([ys, xs], [], [])
+        self.o.generator.prepare()
+        self.o.steps_up_to = self.o.generator.size
+        self.o.end_index = 5000
+        self.o.load_more_positions(3999, child)
+        assert self.o.end_index == 5000 + POSITIONS_PER_XML
+        child.xml.put_value.assert_called_once_with(
+            self.make_et_xml(self.o.generator, 5000, self.o.end_index))
+        # Plenty left, so don't load any more
+        self.o.load_more_positions(4000, child)
+        assert child.xml.put_value.call_count == 1
+
+    def test_make_xml_last_point(self):
+        xs = LineGenerator("x", "mm", 0.0, 0.5, 100)
+        ys = LineGenerator("y", "mm", 0.0, 0.1, 100)
+        self.o.generator = CompoundGenerator([ys, xs], [], [])
+        self.o.generator.prepare()
+        self.o.steps_up_to = self.o.generator.size
+        xml, end_index = self.o._make_xml(5000)
+        assert end_index == 10000
+        assert xml == self.make_et_xml(self.o.generator, 5000, 10000)
@@ -48,3 +48,8 @@ class PandABlocksRunnableControllerTest(unittest.TestCase):
         assert inenc.valCapture.value == "No"
         assert inenc.valDatasetName.value == ""
         assert inenc.valDatasetType.value == "position"
+
+    def test_next_poll_period(self):
+        assert self.o._next_poll_period(0.02, {}) == 0.04
+        self.o.state.set_value("Running")
+        assert self.o._next_poll_period(0.02, {}) == 0.02
@@ -1,6 +1,8 @@
 import unittest
 from mock import Mock
 
+from malcolm.core import Process, Queue, Get, Post, Return, Part, \
+    call_with_params, method_takes
 from malcolm.modules.builtin.controllers import BasicController
 
 
@@ -9,9 +11,67 @@ class TestBaseController(unittest.TestCase):
         params = Mock()
         params.mri = "MyMRI"
         params.description = "My description"
+        params.requestWorker = False
         process = Mock()
         o = BasicController(process, [], params)
         assert o.mri == params.mri
         assert o.params is params
         assert o.process is process
 
+
+    def test_request_worker(self):
+        process = Process("proc")
+        o = call_with_params(
+            BasicController, process, [], mri="MyMRI", requestWorker=True)
+        process.add_controller("MyMRI", o)
+        process.start()
+        try:
+            assert o.use_request_worker
+            q = Queue()
+            requests = [Get(id=i, path=["MyMRI", "health", "value"],
+                            callback=q.put) for i in range(3)]
+            for request in requests:
+                queued = o.handle_request(request)
+                queued.wait(timeout=1)
+                # Can be waited on more than once
+                queued.wait(timeout=0)
+            assert [q.get(timeout=0).id for _ in requests] == [0, 1, 2]
+            o.update_request_stats(3, 0.5)
+            assert o.request_batch_size.value == 3
+            assert o.request_latency.value == 0.5
+        finally:
+            process.stop(timeout=1)
+
+    def test_no_request_worker(self):
+        o = call_with_params(BasicController, Mock(), [], mri="MyMRI")
+        assert not o.use_request_worker
+        assert "requestBatchSize" not in o._block
+
+    def test_request_worker_not_blocked_by_post(self):
+        release = Queue()
+
+        class SlowPart(Part):
+            @method_takes()
+            def slow(self):
+                release.get(timeout=5)
+
+        process = Process("proc")
+        o = call_with_params(
+            BasicController, process, [SlowPart("slow")], mri="MyMRI",
+            requestWorker=True)
+        process.add_controller("MyMRI", o)
+        process.start()
+        try:
+            q = Queue()
+            o.handle_request(Post(id=1, path=["MyMRI", "slow"],
+                                  callback=q.put))
+            # The Get is handled while the Post is still running
+            o.handle_request(Get(id=2, path=["MyMRI", "health", "value"],
+                                 callback=q.put))
+            assert q.get(timeout=1).id == 2
+            release.put(None)
+            response = q.get(timeout=1)
+            assert response.id == 1
+            self.assertIsInstance(response, Return)
+        finally:
+            process.stop(timeout=1)
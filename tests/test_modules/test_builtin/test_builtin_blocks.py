@@ -2,7 +2,7 @@ import unittest
 from mock import Mock
 
 from malcolm.core import call_with_params
-from malcolm.modules.builtin.blocks import proxy_block
+from malcolm.modules.builtin.blocks import proxy_block, process_block
 
 
 class TestBuiltin(unittest.TestCase):
@@ -14,3 +14,11 @@ class TestBuiltin(unittest.TestCase):
             "my_mri", controller, True)
         process.get_controller.assert_called_once_with("comms_mri")
         assert controller.client_comms == process.get_controller.return_value
+
+    def test_process_block(self):
+        process = Mock()
+        controller = call_with_params(
+            process_block, process, mri="PROC", poolSizes=["comms=4"])
+        process.set_pool_size.assert_called_once_with("comms", 4)
+        process.add_controller.assert_called_once_with("PROC", controller)
+        assert controller.params.statsPeriod == 1.0
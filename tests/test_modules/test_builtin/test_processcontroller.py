@@ -0,0 +1,51 @@
+import unittest
+
+from malcolm.core import Process, Context, call_with_params
+from malcolm.modules.builtin.controllers import ProcessController
+from malcolm.modules.builtin.controllers.processcontroller import \
+    parse_pool_sizes
+
+
+class TestProcessController(unittest.TestCase):
+
+    def setUp(self):
+        self.process = Process("proc")
+        self.o = call_with_params(
+            ProcessController, self.process, (), mri="PROC",
+            poolSizes=["comms=2", "hooks=3"], statsPeriod=0.01)
+        self.process.add_controller("PROC", self.o)
+        self.process.start()
+
+    def tearDown(self):
+        self.process.stop(timeout=1)
+
+    def test_parse_pool_sizes(self):
+        assert parse_pool_sizes(["io=4", "comms=16"]) == {"io": 4, "comms": 16}
+        with self.assertRaises(AssertionError):
+            parse_pool_sizes(["io"])
+
+    def pool_row(self, pools, name):
+        # Without cothread there is also a default pool that the stats loop
+        # is running in, so only look at the named one
+        return pools[list(pools.name).index(name)]
+
+    def test_pool_stats(self):
+        self.process.spawn(lambda: None, (), {}, False, "hooks").wait(1)
+        self.o.update_pool_stats()
+        name, size, queued, active, max_wait = self.pool_row(
+            self.o.pools.value, "hooks")
+        assert size == 3
+        assert queued == 0
+        assert active == 0
+        assert max_wait >= 0
+
+    def test_stats_loop(self):
+        self.process.spawn(lambda: None, (), {}, False, "comms").wait(1)
+        context = Context(self.process)
+        block = context.block_view("PROC")
+        # Wait for the stats loop to tick
+        for _ in range(100):
+            if "comms" in block.pools.value.name:
+                break
+            context.sleep(0.01)
+        assert self.pool_row(block.pools.value, "comms")[1] == 2
@@ -1,8 +1,8 @@
 import unittest
-from mock import MagicMock
+from mock import MagicMock, patch
 
 from malcolm.modules.builtin.controllers import ProxyController
-from malcolm.core import Process, call_with_params
+from malcolm.core import Process, call_with_params, Controller, Put, Get
 
 
 class TestProxyController(unittest.TestCase):
@@ -18,3 +18,19 @@ class TestProxyController(unittest.TestCase):
         assert self.o.mri == "mri"
         assert self.o.params.comms == "comms"
         assert self.o.client_comms == self.comms
+
+    def test_handle_requests(self):
+        put = Put(id=1, path=["mri", "attr", "value"], value=3)
+        get = Get(id=2, path=["mri", "meta"])
+        with patch.object(Controller, "handle_requests") as handle_requests:
+            handle_requests.return_value = ["spawned"]
+            ret = self.o.handle_requests([put, get])
+        self.comms.send_to_server.assert_called_once_with(put)
+        handle_requests.assert_called_once_with([get])
+        assert ret == [self.comms.send_to_server.return_value, "spawned"]
+
+    def test_handle_request_forwards_put(self):
+        put = Put(id=1, path=["mri", "attr", "value"], value=3)
+        assert self.o.handle_request(put) == \
+            self.comms.send_to_server.return_value
+        self.comms.send_to_server.assert_called_once_with(put)
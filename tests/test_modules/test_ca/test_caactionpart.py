@@ -31,13 +31,16 @@ class TestCAActionPart(unittest.TestCase):
         assert p.params.wait == True
         assert p.method.description == "desc"
         assert self.yielded == [("mname", ANY, p.caput)]
+        attributes = list(p.create_attribute_models())
+        assert [(name, func) for name, _, func in attributes] == [
+            ("mnamePutLatencyCounts", None), ("mnamePutLatencyCount", None),
+            ("mnamePutLatencyMean", None), ("mnamePutLatencyMax", None)]
 
     def test_reset(self, catools):
         p = self.create_part()
-        p.catools.caget.reset_mock()
-        p.catools.caget.return_value = [caint(4)]
+        p.catools.caget_batched.return_value = [caint(4)]
         p.connect_pvs("unused context object")
-        p.catools.caget.assert_called_with(["pv"])
+        p.catools.caget_batched.assert_called_with(["pv"])
 
     def test_caput(self, catools):
         p = self.create_part()
@@ -45,6 +48,7 @@ class TestCAActionPart(unittest.TestCase):
         p.caput()
         p.catools.caput.assert_called_once_with(
             "pv", 1, wait=True, timeout=None)
+        assert p.put_latency.count == 1
 
     def test_caput_status_pv_ok(self, catools):
         p = self.create_part(dict(
@@ -0,0 +1,123 @@
+import unittest
+import json
+import zlib
+from mock import MagicMock, patch, ANY
+
+import numpy as np
+from tornado.websocket import websocket_connect
+from tornado import gen
+
+from malcolm.core import call_with_params, Process, Queue, binary_decode
+from malcolm.modules.builtin.controllers import StatefulController
+from malcolm.modules.builtin.vmetas import NumberArrayMeta
+from malcolm.modules.ca.parts import CADoubleArrayPart
+from malcolm.modules.ca.parts.caarraypart import CAArrayPart, ArraySummary
+from malcolm.modules.web.blocks import web_server_block
+
+
+class ca_array(np.ndarray):
+    ok = True
+    severity = 0
+    raw_stamp = (340000, 43)
+
+
+class TestArraySummary(unittest.TestCase):
+    def test_small(self):
+        assert str(ArraySummary([1, 2, 3])) == "1 2 3"
+
+    def test_large(self):
+        value = np.arange(10000, dtype=np.float64)
+        crc = zlib.crc32(value.tobytes()) & 0xffffffff
+        assert str(ArraySummary(value)) == \
+            "<float64[10000] min=0.0 max=9999.0 crc32=%08x>" % crc
+
+    def test_large_list(self):
+        s = str(ArraySummary(list(np.arange(200, dtype=np.int64))))
+        assert s.startswith("<int64[200] min=0 max=199 crc32=")
+
+
+@patch("malcolm.modules.ca.parts.capart.CaToolsHelper")
+class TestCAArrayPart(unittest.TestCase):
+    def test_format_caput_value_lazy(self, catools):
+        class MyCAArrayPart(CAArrayPart):
+            create_meta = MagicMock(return_value=NumberArrayMeta("float64"))
+            get_datatype = MagicMock()
+
+        p = call_with_params(MyCAArrayPart, name="attr", description="desc",
+                             pv="pv")
+        p.log = MagicMock()
+        value = np.arange(10000, dtype=np.float64)
+        assert p.format_caput_value(value) is value
+        p.log.info.assert_called_once_with(
+            "caput -c -w %s %s -a %d %s", 5.0, "pv", 10000, ANY)
+        summary = p.log.info.call_args[0][-1]
+        assert isinstance(summary, ArraySummary)
+        assert summary.value is value
+
+    def test_validate_value_view(self, catools):
+        p = call_with_params(
+            CADoubleArrayPart, name="attr", description="desc", pv="pv")
+        list(p.create_attribute_models())
+        value = np.arange(10.0).view(ca_array)
+        p.update_value(value)
+        assert type(p.attr.value) == np.ndarray
+        assert np.may_share_memory(p.attr.value, value)
+        assert not p.attr.value.flags.writeable
+        # Wrong dtype is still validated
+        with self.assertRaises(TypeError):
+            p.update_value(np.arange(10).view(ca_array))
+
+
+class TestCAArrayPartWebsocketBenchmark(unittest.TestCase):
+    socket = 8887
+
+    def setUp(self):
+        patcher = patch("malcolm.modules.ca.parts.capart.CaToolsHelper")
+        catools = patcher.start().instance.return_value
+        self.addCleanup(patcher.stop)
+        initial = np.array([], dtype=np.float64).view(ca_array)
+        catools.caget_batched.return_value = [initial, initial]
+        self.process = Process("proc")
+        self.part = call_with_params(
+            CADoubleArrayPart, name="wave", description="desc", pv="pv")
+        controller = call_with_params(
+            StatefulController, self.process, [self.part], mri="wave")
+        self.process.add_controller("wave", controller)
+        self.server = call_with_params(
+            web_server_block, self.process, mri="server", port=self.socket)
+        self.process.start()
+        self.result = Queue()
+
+    def tearDown(self):
+        self.process.stop(timeout=1)
+
+    @gen.coroutine
+    def subscribe(self):
+        conn = yield websocket_connect(
+            "ws://localhost:%s/ws?format=binary" % self.socket)
+        req = dict(
+            typeid="malcolm:core/Subscribe:1.0",
+            id=0,
+            path=["wave", "wave", "value"],
+            delta=False
+        )
+        conn.write_message(json.dumps(req))
+        while True:
+            message = yield conn.read_message()
+            if message is None:
+                break
+            self.result.put(binary_decode(message))
+
+    def test_1MB_waveform_updates(self):
+        self.server._loop.add_callback(self.subscribe)
+        # Initial empty value
+        assert len(self.result.get(timeout=2)["value"]) == 0
+        # 1MB of float64
+        value = np.arange(131072, dtype=np.float64)
+        for i in range(10):
+            # A fresh array each time like catools gives to monitor_callback
+            value = (value + 1).view(ca_array)
+            self.part.update_value(value)
+            resp = self.result.get(timeout=2)
+            assert resp["value"][0] == i + 1
+            assert resp["value"].nbytes == 1024 * 1024
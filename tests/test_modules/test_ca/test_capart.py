@@ -1,9 +1,12 @@
+import time
 import unittest
+import weakref
 from mock import MagicMock, patch
 
 from malcolm.core import call_with_params, AlarmSeverity, AlarmStatus
 from malcolm.modules.builtin.vmetas import NumberMeta
-from malcolm.modules.ca.parts.capart import CAPart
+from malcolm.modules.ca.parts.capart import CAPart, MonitorCoalescer, \
+    LatencyHistogram
 
 
 class caint(int):
@@ -29,7 +32,7 @@ class TestCAPart(unittest.TestCase):
             get_datatype = MagicMock()
 
         p = call_with_params(MyCAPart, **params)
-        list(p.create_attribute_models())
+        self.yielded = list(p.create_attribute_models())
         return p
 
     def test_init(self, catools):
@@ -37,6 +40,11 @@ class TestCAPart(unittest.TestCase):
         assert p.params.pv == "pv"
         assert p.params.rbv == "pv2"
         assert p.attr.meta == p.create_meta.return_value
+        assert [(name, func) for name, _, func in self.yielded] == [
+            ("attrname", p.caput), ("attrnamePutLatencyCounts", None),
+            ("attrnamePutLatencyCount", None),
+            ("attrnamePutLatencyMean", None),
+            ("attrnamePutLatencyMax", None)]
 
     def test_init_no_pv_no_rbv(self, catools):
         # create test for no pv or rbv
@@ -58,16 +66,16 @@ class TestCAPart(unittest.TestCase):
 
     def test_reset(self, catools):
         p = self.create_part()
-        p.catools.caget.return_value = [caint(4), caint(5)]
+        p.catools.caget_batched.return_value = [caint(4), caint(5)]
         p.reset("unused context object")
-        p.catools.caget.assert_called_with(
+        p.catools.caget_batched.assert_called_with(
             ["pv2", "pv"],
             format=p.catools.FORMAT_CTRL, datatype=p.get_datatype())
-        p.catools.camonitor.assert_called_once_with(
+        p.catools.camonitor_batched.assert_called_once_with(
             "pv2", p.monitor_callback, format=p.catools.FORMAT_TIME,
             datatype=p.get_datatype(), notify_disconnect=True)
         assert p.attr.value == 4
-        assert p.monitor == p.catools.camonitor()
+        assert p.monitor == p.catools.camonitor_batched()
 
     def test_caput(self, catools):
         p = self.create_part()
@@ -81,6 +89,9 @@ class TestCAPart(unittest.TestCase):
         p.catools.caget.assert_called_once_with(
             "pv2", format=p.catools.FORMAT_TIME, datatype=datatype)
         assert p.attr.value == 3
+        assert p.put_latency.count == 1
+        assert p.put_latency.count_attr.value == 1
+        assert p.put_latency.max_attr.value == p.put_latency.max
 
     def test_close_monitor(self, catools):
         p = self.create_part()
@@ -111,3 +122,123 @@ class TestCAPart(unittest.TestCase):
         assert p.attr.alarm.severity == AlarmSeverity.INVALID_ALARM
         assert p.attr.alarm.status == AlarmStatus.DEVICE_STATUS
         assert p.attr.alarm.message == "PV disconnected"
+
+    def test_monitor_callback_no_controller(self, catools):
+        p = self.create_part()
+        p.monitor_callback(caint(6))
+        assert p.attr.value == 6
+
+    def test_monitor_callback_coalesces(self, catools):
+        p1 = self.create_part()
+        p2 = self.create_part()
+        controller = MagicMock()
+        p1.controller = p2.controller = controller
+        p1.monitor_callback(caint(1))
+        p2.monitor_callback(caint(2))
+        p1.monitor_callback(caint(3))
+        # Nothing applied or slept yet, just one flush scheduled
+        assert p1.attr.value == 0
+        assert p2.attr.value == 0
+        p1.catools.cothread.Sleep.assert_not_called()
+        coalescer = MonitorCoalescer.for_controller(
+            controller, p1.catools.cothread)
+        p1.catools.cothread.Timer.assert_called_once_with(0, coalescer.flush)
+        coalescer.flush()
+        assert p1.attr.value == 3
+        assert p2.attr.value == 2
+        controller.changes_squashed.__enter__.assert_called_once_with()
+        # Next update waits out minDelta
+        p1.monitor_callback(caint(4))
+        delay = p1.catools.cothread.Timer.call_args[0][0]
+        assert 0 < delay <= p1.params.minDelta
+
+    def test_monitor_callback_keeps_each_min_delta(self, catools):
+        fast = self.create_part()
+        slow = self.create_part(dict(
+            name="slow", description="desc", pv="pv", minDelta=10.0))
+        controller = MagicMock()
+        fast.controller = slow.controller = controller
+        coalescer = MonitorCoalescer.for_controller(
+            controller, fast.catools.cothread)
+        fast.monitor_callback(caint(1))
+        slow.monitor_callback(caint(2))
+        coalescer.flush()
+        assert (fast.attr.value, slow.attr.value) == (1, 2)
+        fast.monitor_callback(caint(3))
+        slow.monitor_callback(caint(4))
+        # Pretend the fast part's minDelta has passed, but not the slow one's
+        coalescer.next_flush[fast] = 0
+        coalescer.flush()
+        assert (fast.attr.value, slow.attr.value) == (3, 2)
+        # Waiting for the slow part
+        delay = fast.catools.cothread.Timer.call_args[0][0]
+        assert 9 < delay <= 10
+
+    def test_monitor_callback_error_isolated(self, catools):
+        bad = self.create_part()
+        good = self.create_part()
+        waiting = self.create_part()
+        controller = MagicMock()
+        bad.controller = good.controller = waiting.controller = controller
+        coalescer = MonitorCoalescer.for_controller(
+            controller, good.catools.cothread)
+        bad.update_value = MagicMock(side_effect=ValueError("bad"))
+        bad.log = MagicMock()
+        bad.monitor_callback(caint(1))
+        good.monitor_callback(caint(2))
+        waiting.monitor_callback(caint(3))
+        # Not due until later
+        coalescer.next_flush[waiting] = time.time() + 10
+        good.catools.cothread.Timer.reset_mock()
+        coalescer.flush()
+        bad.log.exception.assert_called_once()
+        assert good.attr.value == 2
+        # The waiting part is still scheduled
+        assert waiting in coalescer.pending
+        good.catools.cothread.Timer.assert_called_once()
+
+    def test_coalescer_does_not_keep_controller_alive(self, catools):
+        p = self.create_part()
+
+        class Controller(object):
+            changes_squashed = MagicMock()
+
+        p.controller = Controller()
+        p.monitor_callback(caint(1))
+        assert p.controller in MonitorCoalescer._instances
+        controller = weakref.ref(p.controller)
+        p.controller = None
+        assert controller() is None
+
+    def test_close_monitor_discards_pending(self, catools):
+        p = self.create_part()
+        p.controller = MagicMock()
+        p.monitor = MagicMock()
+        p.monitor_callback(caint(5))
+        p.close_monitor()
+        MonitorCoalescer.for_controller(
+            p.controller, p.catools.cothread).flush()
+        assert p.attr.value == 0
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_record(self):
+        h = LatencyHistogram()
+        assert h.mean == 0.0
+        for latency in (0.0005, 0.002, 0.003, 0.5, 20.0):
+            h.record(latency)
+        assert h.counts == [1, 2, 0, 1, 0, 1]
+        assert h.count == 5
+        assert h.max == 20.0
+        self.assertAlmostEqual(h.mean, 20.5055 / 5)
+
+    def test_record_publishes_in_one_change(self):
+        h = LatencyHistogram()
+        list(h.create_attribute_models("put", "puts"))
+        controller = MagicMock()
+        h.record(0.5, controller)
+        controller.changes_squashed.__enter__.assert_called_once_with()
+        assert list(h.counts_attr.value) == [0, 0, 0, 1, 0, 0]
+        assert h.count_attr.value == 1
+        assert h.mean_attr.value == 0.5
+        assert h.max_attr.value == 0.5
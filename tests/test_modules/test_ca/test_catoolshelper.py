@@ -0,0 +1,64 @@
+import unittest
+from mock import Mock, ANY
+
+import cothread
+
+from malcolm.modules.ca.parts.catoolshelper import CaToolsHelper
+
+
+class TestCaToolsHelper(unittest.TestCase):
+    def setUp(self):
+        # Make one without importing catools, which needs libca
+        self.o = CaToolsHelper.__new__(CaToolsHelper)
+        self.o.cothread = cothread
+        self.o.catools = Mock()
+        self.o.catools.caget.side_effect = lambda pvs, **kwargs: [
+            "%s value" % pv for pv in pvs]
+        self.o.in_cothread_thread = True
+        self.o._caget_batches = {}
+        self.o._camonitor_batches = {}
+
+    def test_caget_batched(self):
+        pv_lists = [["pv%d" % i, "pv%d.RBV" % i] for i in range(100)]
+        spawned = [cothread.Spawn(self.o.caget_batched, pvs, datatype=1)
+                   for pvs in pv_lists]
+        # One with different arguments
+        spawned.append(cothread.Spawn(self.o.caget_batched, ["other"]))
+        values = [s.Wait() for s in spawned]
+        assert values[0] == ["pv0 value", "pv0.RBV value"]
+        assert values[99] == ["pv99 value", "pv99.RBV value"]
+        assert values[100] == ["other value"]
+        assert self.o.catools.caget.call_count == 2
+        self.o.catools.caget.assert_any_call(
+            sum(pv_lists, []), throw=False, datatype=1)
+        self.o.catools.caget.assert_any_call(["other"], throw=False)
+        assert self.o._caget_batches == {}
+        # A later call makes a new batch
+        assert self.o.caget_batched(["pv0"], datatype=1) == ["pv0 value"]
+        assert self.o.catools.caget.call_count == 3
+
+    def test_camonitor_batched(self):
+        subscriptions = [Mock() for _ in range(100)]
+        self.o.catools.camonitor.return_value = subscriptions
+        callbacks = [Mock() for _ in range(100)]
+        spawned = [cothread.Spawn(self.o.camonitor_batched, "pv%d" % i,
+                                  callbacks[i], datatype=1)
+                   for i in range(100)]
+        assert [s.Wait() for s in spawned] == subscriptions
+        self.o.catools.camonitor.assert_called_once_with(
+            ["pv%d" % i for i in range(100)], ANY, datatype=1)
+        assert self.o._camonitor_batches == {}
+        # Updates go to the callback for that pv
+        callback = self.o.catools.camonitor.call_args[0][1]
+        callback("value", 42)
+        callbacks[42].assert_called_once_with("value")
+        callbacks[41].assert_not_called()
+
+    def test_caget_batched_error(self):
+        self.o.catools.caget.side_effect = ValueError("Bad")
+        spawned = [
+            cothread.Spawn(self.o.caget_batched, [pv], raise_on_wait=True)
+            for pv in ("pv1", "pv2")]
+        for s in spawned:
+            with self.assertRaises(ValueError):
+                s.Wait()
@@ -1,4 +1,6 @@
 from collections import OrderedDict
+import socket
+import threading
 import unittest
 from mock import call, Mock
 
@@ -6,6 +8,102 @@ from malcolm.modules.pandablocks.controllers.pandablocksclient import \
     PandABlocksClient, FieldData, BlockData
 
 
+class FakePandA(object):
+    """A PandA TCP server on localhost that answers introspection queries
+    for a set of blocks, replying to each batch of requests in one write"""
+
+    def __init__(self, blocks):
+        # {block_name: (number, {field_name: (field_type, field_subtype)})}
+        self.blocks = blocks
+        self.num_requests = 0
+        self.num_recvs = 0
+        self._server = socket.socket()
+        self._server.bind(("localhost", 0))
+        self._server.listen(1)
+        self.port = self._server.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _respond(self, request):
+        request = request.rstrip("?")
+        if request == "*BLOCKS":
+            lines = ["%s %d" % (name, number)
+                     for name, (number, _) in self.blocks.items()]
+        elif request.startswith("*DESC."):
+            return "OK =Description of %s\n" % request[6:]
+        elif request.startswith("*ENUMS."):
+            lines = ["ZERO", "ONE", "%s.OUT" % request[7:]]
+        elif request == "*CHANGES":
+            lines = []
+        else:
+            _, fields = self.blocks[request.split(".")[0]]
+            lines = ["%s %d %s %s" % (name, i, field_type, field_subtype)
+                     for i, (name, (field_type, field_subtype))
+                     in enumerate(fields.items())]
+        return "".join("!%s\n" % line for line in lines) + ".\n"
+
+    def _serve(self):
+        conn, _ = self._server.accept()
+        buf = ""
+        while True:
+            rx = conn.recv(65536)
+            if not rx:
+                break
+            self.num_recvs += 1
+            buf += rx.decode()
+            requests = buf.split("\n")
+            buf = requests.pop()
+            self.num_requests += len(requests)
+            conn.sendall("".join(self._respond(r) for r in requests).encode())
+        conn.close()
+        self._server.close()
+
+
+class PandABoxClientServerTest(unittest.TestCase):
+    def setUp(self):
+        # A block set about the size of a real PandA
+        field_types = [
+            ("param", "enum"), ("param", "pos"), ("param", "time"),
+            ("read", "uint"), ("bit_mux", ""), ("pos_mux", ""),
+            ("bit_out", ""), ("pos_out", ""), ("ext_out", "timestamp")]
+        blocks = OrderedDict()
+        for i in range(30):
+            fields = OrderedDict()
+            for j in range(20):
+                fields["FIELD%d" % j] = field_types[(i + j) % len(
+                    field_types)]
+            blocks["BLOCK%d" % i] = ((i % 4) + 1, fields)
+        self.server = FakePandA(blocks)
+        self.c = PandABlocksClient("localhost", self.server.port)
+        self.c.start()
+
+    def tearDown(self):
+        self.c.stop()
+
+    def test_blocks_data_batched(self):
+        blocks_data = self.c.get_blocks_data()
+        assert len(blocks_data) == 30
+        assert blocks_data["BLOCK3"].number == 4
+        assert blocks_data["BLOCK3"].description == "Description of BLOCK3"
+        field_data = blocks_data["BLOCK0"].fields["FIELD4"]
+        assert field_data == FieldData(
+            "bit_mux", "", "Description of BLOCK0.FIELD4",
+            ["ZERO", "ONE", "BLOCK0.FIELD4.OUT"])
+        # Requests are batched up rather than sent one at a time
+        # *BLOCKS?, 2 per block, then 1 per field and 1 per field with enums
+        assert self.server.num_requests == 992
+        assert self.server.num_recvs < self.server.num_requests / 4
+        assert self.c.get_changes() == OrderedDict()
+
+    def test_large_multiline_response(self):
+        self.server.blocks["BLOCK0"][1].update(
+            ("EXTRA%d" % i, ("param", "uint")) for i in range(5000))
+        lines = self.c.send_recv("BLOCK0.*?\n")
+        assert len(lines) == 5020
+        assert lines[-1] == "EXTRA4999 5019 param uint"
+
+
 class PandABoxControlTest(unittest.TestCase):
     def setUp(self):
         self.c = PandABlocksClient("h", "p")
@@ -13,13 +111,21 @@ class PandABoxControlTest(unittest.TestCase):
     def start(self, messages=None):
         self.socket = Mock()
         if messages:
-            self.socket.recv.side_effect = messages
+            # Then an empty recv as the socket closes
+            self.socket.recv.side_effect = [
+                m.encode() for m in messages] + [b""]
 
         def socket_cls():
             return self.socket
 
         self.c.start(socket_cls=socket_cls)
 
+    def sent(self):
+        # Split up what was sent, however it was batched into writes
+        data = b"".join(c[0][0] for c in self.socket.sendall.call_args_list)
+        data = data.decode()
+        return [line + "\n" for line in data.split("\n")[:-1]]
+
     def tearDown(self):
         if self.c.started:
             self.c.stop()
@@ -62,18 +168,18 @@ class PandABoxControlTest(unittest.TestCase):
         self.start(messages)
         block_data = self.c.get_blocks_data()
         self.c.stop()
-        assert self.socket.send.call_args_list == [
-            call("*BLOCKS?\n"),
-            call("*DESC.TTLIN?\n"),
-            call("*DESC.TTLOUT?\n"),
-            call("TTLIN.*?\n"),
-            call("TTLOUT.*?\n"),
-            call("*DESC.TTLIN.TERM?\n"),
-            call("*DESC.TTLIN.VAL?\n"),
-            call("*ENUMS.TTLIN.TERM?\n"),
-            call("*ENUMS.TTLIN.VAL.CAPTURE?\n"),
-            call("*DESC.TTLOUT.VAL?\n"),
-            call("*ENUMS.TTLOUT.VAL?\n"),
+        assert self.sent() == [
+            "*BLOCKS?\n",
+            "*DESC.TTLIN?\n",
+            "*DESC.TTLOUT?\n",
+            "TTLIN.*?\n",
+            "TTLOUT.*?\n",
+            "*DESC.TTLIN.TERM?\n",
+            "*DESC.TTLIN.VAL?\n",
+            "*ENUMS.TTLIN.TERM?\n",
+            "*ENUMS.TTLIN.VAL.CAPTURE?\n",
+            "*DESC.TTLOUT.VAL?\n",
+            "*ENUMS.TTLOUT.VAL?\n",
         ]
         assert list(block_data) == ["TTLIN", "TTLOUT"]
         in_fields = OrderedDict()
@@ -108,8 +214,7 @@ class PandABoxControlTest(unittest.TestCase):
         self.start(messages)
         changes = self.c.get_changes()
         self.c.stop()
-        assert self.socket.send.call_args_list == [
-            call("*CHANGES?\n"), call("SEQ1.TABLE?\n")]
+        assert self.sent() == ["*CHANGES?\n", "SEQ1.TABLE?\n"]
         expected = OrderedDict()
         expected["PULSE0.WIDTH"] = "1.43166e+09"
         expected["PULSE1.WIDTH"] = "1.43166e+09"
@@ -123,38 +228,56 @@ class PandABoxControlTest(unittest.TestCase):
         assert changes == expected
 
     def test_set_field(self):
-        messages = "OK\n"
+        messages = ["OK\n"]
         self.start(messages)
         self.c.set_field("PULSE0", "WIDTH", 0)
         self.c.stop()
-        self.socket.send.assert_called_once_with("PULSE0.WIDTH=0\n")
+        self.socket.sendall.assert_called_once_with(b"PULSE0.WIDTH=0\n")
 
     def test_set_table(self):
-        messages = "OK\n"
+        messages = ["OK\n"]
         self.start(messages)
         self.c.set_table("SEQ1", "TABLE", [1, 2, 3])
         self.c.stop()
-        self.socket.send.assert_called_once_with("""SEQ1.TABLE<
+        self.socket.sendall.assert_called_once_with(b"""SEQ1.TABLE<
 1
 2
 3
 
 """)
 
+    def test_prefetch_table_fields(self):
+        messages = ["!15:0 REPEATS\n.\n!15:0 REPEATS\n", "!31:16 TIME\n.\n"]
+        self.start(messages)
+        self.c.prefetch_table_fields([("SEQ1", "TABLE"), ("SEQ2", "TABLE")])
+        assert self.sent() == ["SEQ1.TABLE.FIELDS?\n", "SEQ2.TABLE.FIELDS?\n"]
+        assert self.c.get_table_fields("SEQ2", "TABLE") == OrderedDict(
+            [("REPEATS", (15, 0)), ("TIME", (31, 16))])
+        # Already got them, so nothing more to send
+        self.c.prefetch_table_fields([("SEQ1", "TABLE")])
+        assert len(self.sent()) == 2
+
+    def test_idn(self):
+        self.start(["OK =PandA SW: 1.1 FPGA: 1.2 rootfs: 1.3\n"])
+        assert self.c.get_idn() == "PandA SW: 1.1 FPGA: 1.2 rootfs: 1.3"
+
     def test_table_fields(self):
-        messages = """!31:0    REPEATS
+        messages = ["""!31:0    REPEATS
 !32:32   USE_INPA
 !64:54   STUFF
 !37:37   INPB
 .
-"""
+"""]
         self.start(messages)
         fields = self.c.get_table_fields("SEQ1", "TABLE")
         self.c.stop()
-        self.socket.send.assert_called_once_with("SEQ1.TABLE.FIELDS?\n")
+        self.socket.sendall.assert_called_once_with(b"SEQ1.TABLE.FIELDS?\n")
         expected = OrderedDict()
         expected["REPEATS"] = (31, 0)
         expected["USE_INPA"] = (32, 32)
         expected["STUFF"] = (64, 54)
         expected["INPB"] = (37, 37)
         assert fields == expected
+        # Only asks once
+        assert self.c.get_table_fields("SEQ1", "TABLE") == expected
+        self.socket.sendall.assert_called_once_with(b"SEQ1.TABLE.FIELDS?\n")
@@ -1,37 +1,44 @@
 from collections import OrderedDict
+import os
+import shutil
+import tempfile
 import unittest
 from mock import call, Mock, patch, ANY, MagicMock
 from xml.etree import cElementTree as ET
 
-from malcolm.core import call_with_params
+from malcolm.core import call_with_params, Queue
 from malcolm.modules.pandablocks.controllers import PandABlocksManagerController
 from malcolm.modules.pandablocks.controllers.pandablocksclient import \
     FieldData, BlockData
 
 
+def make_blocks_data():
+    blocks_data = OrderedDict()
+    fields = OrderedDict()
+    fields["INP"] = FieldData("pos_mux", "", "Input A", ["ZERO", "COUNTER.OUT"])
+    fields["START"] = FieldData("param", "pos", "Start position", [])
+    fields["STEP"] = FieldData("param", "relative_pos", "Step position", [])
+    fields["OUT"] = FieldData("bit_out", "", "Output", [])
+    blocks_data["PCOMP"] = BlockData(1, "", fields)
+    fields = OrderedDict()
+    fields["INP"] = FieldData("bit_mux", "", "Input", ["ZERO", "TTLIN.VAL"])
+    fields["START"] = FieldData("param", "pos", "Start position", [])
+    fields["OUT"] = FieldData("pos_out", "", "Output", ["No", "Capture"])
+    blocks_data["COUNTER"] = BlockData(1, "", fields)
+    fields = OrderedDict()
+    fields["VAL"] = FieldData("bit_out", "", "Output", [])
+    blocks_data["TTLIN"] = BlockData(1, "", fields)
+    return blocks_data
+
+
 class PandABlocksManagerControllerTest(unittest.TestCase):
     @patch("malcolm.modules.pandablocks.controllers.pandablocksmanagercontroller.PandABlocksClient")
     def setUp(self, mock_client):
         self.process = Mock()
         self.o = call_with_params(
             PandABlocksManagerController, self.process, [], mri="P", configDir="/tmp")
-        blocks_data = OrderedDict()
-        fields = OrderedDict()
-        fields["INP"] = FieldData("pos_mux", "", "Input A", ["ZERO", "COUNTER.OUT"])
-        fields["START"] = FieldData("param", "pos", "Start position", [])
-        fields["STEP"] = FieldData("param", "relative_pos", "Step position", [])
-        fields["OUT"] = FieldData("bit_out", "", "Output", [])
-        blocks_data["PCOMP"] = BlockData(1, "", fields)
-        fields = OrderedDict()
-        fields["INP"] = FieldData("bit_mux", "", "Input", ["ZERO", "TTLIN.VAL"])
-        fields["START"] = FieldData("param", "pos", "Start position", [])
-        fields["OUT"] = FieldData("pos_out", "", "Output", ["No", "Capture"])
-        blocks_data["COUNTER"] = BlockData(1, "", fields)
-        fields = OrderedDict()
-        fields["VAL"] = FieldData("bit_out", "", "Output", [])
-        blocks_data["TTLIN"] = BlockData(1, "", fields)
         self.client = self.o.client
-        self.client.get_blocks_data.return_value = blocks_data
+        self.client.get_blocks_data.return_value = make_blocks_data()
         self.o._make_blocks_parts()
         changes = OrderedDict()
         changes["PCOMP.INP"] = "ZERO"
@@ -79,6 +86,12 @@ class PandABlocksManagerControllerTest(unittest.TestCase):
         assert counter.outUnits.value == ""
         assert ttlin.val.value is False
 
+    def test_startup_timing(self):
+        self.client.prefetch_table_fields.assert_called_once_with([])
+        timing = self.o.startup_timing.value
+        assert timing.phase == ("introspect", "tables", "blocks", "changes")
+        assert all(t >= 0 for t in timing.time)
+
     def test_rewiring(self):
         pcomp, counter, ttlin = self._blocks()
         self.o.handle_changes({"COUNTER.OUT": 32.0})
@@ -171,3 +184,86 @@ class PandABlocksManagerControllerTest(unittest.TestCase):
         assert len(root.findall(".//*[@id='notA']")) == 1
         assert len(root.findall(".//*[@id='OR']")) == 0
         assert len(root.findall(".//*[@id='AND']")) == 1
+
+    def test_fields_index(self):
+        block_name, field_name, part, field_data = self.o._fields["PCOMP.INP"]
+        assert (block_name, field_name) == ("PCOMP", "INP")
+        assert part is self.o._blocks_parts["PCOMP"]["INP"]
+        assert field_data.field_type == "pos_mux"
+        # Unknown fields are dropped
+        self.o.handle_changes({"PCOMP.NOTHING": "1", "NOBLOCK.INP": "1"})
+        assert not self.o.changes
+
+    def test_next_poll_period(self):
+        assert self.o._next_poll_period(0.02, {}) == 0.04
+        assert self.o._next_poll_period(0.16, {}) == 0.2
+        assert self.o._next_poll_period(0.2, {"TTLIN.VAL": "1"}) == 0.02
+        # Waiting for a bit_out to toggle back
+        self.o.changes["TTLIN.VAL"] = False
+        assert self.o._next_poll_period(0.2, {}) == 0.02
+
+    @patch("malcolm.modules.pandablocks.controllers.pandablocksmanagercontroller.POLL_STATS_PERIOD", 0.0)
+    def test_poll_loop(self):
+        self.o._stop_queue = Queue()
+        polls = []
+
+        def get_changes():
+            polls.append(None)
+            if len(polls) == 4:
+                self.o._stop_queue.put(None)
+            if len(polls) == 1:
+                return {"COUNTER.OUT": "32"}
+            return {}
+
+        self.client.get_changes.side_effect = get_changes
+        self.o._poll_loop()
+        assert len(polls) == 4
+        pcomp, counter, ttlin = self._blocks()
+        assert counter.out.value == 32.0
+        # Backed off since the last change
+        assert self.o.poll_period.value == 0.16
+        assert self.o.poll_time.value >= 0
+        assert self.o.max_poll_time.value >= self.o.poll_time.value
+
+
+class PandABlocksManagerControllerCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    @patch("malcolm.modules.pandablocks.controllers.pandablocksmanagercontroller.PandABlocksClient")
+    def make_controller(self, idn, mock_client):
+        o = call_with_params(
+            PandABlocksManagerController, Mock(), [], mri="P",
+            configDir="/tmp", cacheDir=self.cache_dir)
+        o.client.table_fields = {}
+        o.client.get_idn.return_value = idn
+        o.client.get_blocks_data.return_value = make_blocks_data()
+        o.client.get_changes.return_value = {}
+        return o
+
+    def test_cache(self):
+        o = self.make_controller("PandA SW: 1.0 FPGA: 1.0")
+        o.client.table_fields[("SEQ1", "TABLE")] = OrderedDict(
+            [("REPEATS", (15, 0)), ("TRIGGER", (19, 16))])
+        o._make_blocks_parts()
+        assert o.client.get_blocks_data.call_count == 1
+        assert os.path.isfile(os.path.join(self.cache_dir, "localhost_8888.json"))
+        # Same firmware, so don't need to ask the box
+        o = self.make_controller("PandA SW: 1.0 FPGA: 1.0")
+        with patch.object(o, "_save_cache") as save_cache:
+            o._make_blocks_parts()
+        assert o.client.get_blocks_data.call_count == 0
+        # or write the cache again
+        save_cache.assert_not_called()
+        assert o._blocks_data["PCOMP"] == make_blocks_data()["PCOMP"]
+        assert list(o._blocks_data) == ["PCOMP", "COUNTER", "TTLIN"]
+        assert type(o._blocks_data["TTLIN"].fields["VAL"].description) == str
+        assert o.client.table_fields == {("SEQ1", "TABLE"): OrderedDict(
+            [("REPEATS", (15, 0)), ("TRIGGER", (19, 16))])}
+        # New firmware, so ask again
+        o = self.make_controller("PandA SW: 1.0 FPGA: 2.0")
+        o._make_blocks_parts()
+        assert o.client.get_blocks_data.call_count == 1
@@ -1,5 +1,7 @@
 from collections import OrderedDict
 import unittest
+
+import numpy as np
 from mock import Mock
 
 from malcolm.core import Table
@@ -58,6 +60,57 @@ class PandABoxTablePartTest(unittest.TestCase):
         assert list(table.triggerMask) == [True, False, False]
         assert list(table.timePhA) == [4294967295, 1, 0]
 
+    def test_straddling_fields(self):
+        fields = OrderedDict()
+        fields["POSITION"] = (47, 20)
+        fields["TIME"] = (95, 48)
+        fields["OUTA"] = (0, 0)
+        self.client.get_table_fields.return_value = fields
+        meta = TableMeta("Straddling table")
+        o = PandABlocksTablePart(
+            self.client, meta,
+            block_name="PCOMP1", field_name="TABLE", writeable=True)
+        assert meta.elements["position"].dtype == "uint32"
+        assert meta.elements["time"].dtype == "uint64"
+        positions = [0xFFFFFFF, 0x1234567, 0]
+        times = [2 ** 48 - 1, 0x123456789AB, 1]
+        outas = [True, False, True]
+        l = []
+        for position, time_, outa in zip(positions, times, outas):
+            int_value = position << 20 | time_ << 48 | outa
+            l += [(int_value >> (32 * i)) & 0xFFFFFFFF for i in range(3)]
+        table = o.table_from_list(l)
+        assert list(table.position) == positions
+        assert list(table.time) == times
+        assert list(table.outa) == outas
+        assert o.list_from_table(table) == l
+        table.position = np.array([0x10000000, 0, 0], dtype=np.uint32)
+        with self.assertRaises(AssertionError) as cm:
+            o.list_from_table(table)
+        assert str(cm.exception) == \
+            "Expected position[0] < 268435456, got 268435456"
+
+    def test_large_table_round_trip(self):
+        nrows = 4096
+        rng = np.random.RandomState(0)
+        table = Table(self.meta, dict(
+            nrepeats=rng.randint(0, 256, nrows).astype(np.uint8),
+            inputMask=rng.randint(0, 2, nrows).astype(np.bool_),
+            triggerMask=rng.randint(0, 2, nrows).astype(np.bool_),
+            timePhA=rng.randint(0, 2 ** 32, nrows, dtype=np.uint64).astype(
+                np.uint32)))
+        l = self.o.list_from_table(table)
+        # Values are received as strings
+        new_table = self.o.table_from_list([str(x) for x in l])
+        assert len(l) == nrows * 3
+        assert l[:3] == [
+            table.nrepeats[0],
+            table.inputMask[0] | table.triggerMask[0] << 16,
+            table.timePhA[0]]
+        for name in self.meta.elements:
+            assert new_table[name].dtype == table[name].dtype
+            assert list(new_table[name]) == list(table[name])
+
 
 if __name__ == "__main__":
     unittest.main(verbosity=2)
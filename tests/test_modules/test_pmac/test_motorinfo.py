@@ -1,5 +1,8 @@
 import unittest
 
+import numpy as np
+import pytest
+
 from malcolm.modules.pmac.infos import MotorInfo
 
 
@@ -221,4 +224,48 @@ class TestMotorPVT(unittest.TestCase):
         time_array, velocity_array = self.o.make_velocity_profile(
             v1, v2, distance, 0.0)
         assert time_array == [0.0, 0.25, 0.75, 0.875, 1.375, 1.625]
-        assert velocity_array == [v1, 0, 1, 1, 0, v2]
\ No newline at end of file
+        assert velocity_array == [v1, 0, 1, 1, 0, v2]
+
+    def test_make_velocity_profiles(self):
+        v1s = [0.1, 0, 0, 0.5, 0.5, -0.5]
+        v2s = [-0.1, 0, 0, 0.5, 0.5, -0.5]
+        distances = [0, 0.125, -1.02, 0.125, -0.25, 0.5]
+        min_times = [2, 0.5004166666666666, 5.2, 1.0, 1.5, 0.0]
+        time_arrays, velocity_arrays = self.o.make_velocity_profiles(
+            v1s, v2s, distances, min_times)
+        assert time_arrays.shape == velocity_arrays.shape == (6, 5)
+        for i, args in enumerate(zip(v1s, v2s, distances, min_times)):
+            time_array, velocity_array = self.o.make_velocity_profile(*args)
+            assert time_arrays[i, -1] == time_array[-1]
+            assert velocity_arrays[i, 0] == velocity_array[0]
+            assert velocity_arrays[i, -1] == velocity_array[-1]
+            # The batched profiles have no zero crossings, but cover the same
+            # distance
+            distance = np.sum(np.diff(time_arrays[i]) * (
+                velocity_arrays[i, 1:] + velocity_arrays[i, :-1]) / 2)
+            assert distance == pytest.approx(args[2])
+
+    def test_make_consistent_velocity_profiles(self):
+        o2 = MotorInfo(
+            cs_axis="Y",
+            cs_port="BRICK1CS2",
+            acceleration=0.5,
+            resolution=0.001,
+            offset=0.0,
+            max_velocity=1,
+            current_position=0.0,
+            scannable="t1y",
+            velocity_settle=0.0
+        )
+        motor_infos = dict(x=self.o, y=o2)
+        v1s = dict(x=np.array([0.1, 0]), y=np.array([0, 0.5]))
+        v2s = dict(x=np.array([-0.1, 0]), y=np.array([0, 0.5]))
+        distances = dict(x=np.array([0, 1.0]), y=np.array([0.5, 0.125]))
+        time_arrays, velocity_arrays = MotorInfo.\
+            make_consistent_velocity_profiles(
+                motor_infos, v1s, v2s, distances, 0.0)
+        assert time_arrays["x"][:, -1] == pytest.approx(
+            time_arrays["y"][:, -1])
+        # Slowing y down to match x makes it retrace, so x has to slow down
+        # to match it in turn
+        assert time_arrays["x"][:, -1] == pytest.approx([2.0, 3.7320508])
@@ -1,15 +1,25 @@
+import unittest
+
 from mock import Mock, call, patch, ANY
 
 from scanpointgenerator import LineGenerator, CompoundGenerator
+import numpy as np
 import pytest
 
 from malcolm.core import call_with_params, Context, Process
 from malcolm.modules.pmac.parts import PmacTrajectoryPart
+from malcolm.modules.pmac.parts.pmactrajectorypart import ProfileBuffer
 from malcolm.modules.pmac.infos import MotorInfo
 from malcolm.modules.pmac.blocks import pmac_trajectory_block
+from malcolm.modules.scanning.controllers import RunnableController
 from malcolm.testutil import ChildTestCase
 
 
+def exactly(values):
+    """Match the numpy arrays that are put to the child exactly"""
+    return pytest.approx(values, rel=0, abs=0)
+
+
 class TestPMACTrajectoryPart(ChildTestCase):
     def setUp(self):
         self.process = Process("Process")
@@ -20,7 +30,8 @@ class TestPMACTrajectoryPart(ChildTestCase):
         self.child.parts["i10"].attr.set_value(1705244)
         self.o = call_with_params(
             PmacTrajectoryPart, name="pmac", mri="PMAC:TRAJ")
-        list(self.o.create_attribute_models())
+        call_with_params(RunnableController, self.process, [self.o],
+                         mri="SCAN", configDir="/tmp")
         self.process.start()
 
     #def tearDown(self):
@@ -105,10 +116,11 @@ class TestPMACTrajectoryPart(ChildTestCase):
             call.put('pointsToBuild', 5),
             call.put('positionsA', pytest.approx([
                 0.4461796875, 0.285, 0.0775, -0.0836796875, -0.1375])),
-            call.put('positionsB', [0.0, 0.0, 0.0, 0.0, 0.0]),
-            call.put('timeArray', [207500, 207500, 207500, 207500, 207500]),
-            call.put('userPrograms', [8, 8, 8, 8, 8]),
-            call.put('velocityMode', [0, 0, 0, 0, 2]),
+            call.put('positionsB', pytest.approx([0.0, 0.0, 0.0, 0.0, 0.0])),
+            call.put('timeArray', exactly(
+                [207500, 207500, 207500, 207500, 207500])),
+            call.put('userPrograms', exactly([8, 8, 8, 8, 8])),
+            call.put('velocityMode', exactly([0, 0, 0, 0, 2])),
             call.post('buildProfile'),
             call.post('executeProfile'),
         ] + self.resolutions_and_use_call() + [
@@ -119,14 +131,14 @@ class TestPMACTrajectoryPart(ChildTestCase):
             call.put('positionsB', pytest.approx([
                 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.05,
                 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1])),
-            call.put('timeArray', [
+            call.put('timeArray', exactly([
                 100000, 500000, 500000, 500000, 500000, 500000, 500000,
                 200000, 200000, 500000, 500000, 500000, 500000, 500000,
-                500000, 100000]),
-            call.put('userPrograms', [
-                3, 4, 3, 4, 3, 4, 2, 8, 3, 4, 3, 4, 3, 4, 2, 8]),
-            call.put('velocityMode', [
-                2, 0, 0, 0, 0, 0, 1, 0, 2, 0, 0, 0, 0, 0, 1, 3]),
+                500000, 100000])),
+            call.put('userPrograms', exactly([
+                3, 4, 3, 4, 3, 4, 2, 8, 3, 4, 3, 4, 3, 4, 2, 8])),
+            call.put('velocityMode', exactly([
+                2, 0, 0, 0, 0, 0, 1, 0, 2, 0, 0, 0, 0, 0, 1, 3])),
             call.post('buildProfile')]
         assert self.o.completed_steps_lookup == [
                 0, 0, 1, 1, 2, 2, 3, 3, 3, 3, 4, 4, 5, 5, 6, 6]
@@ -143,9 +155,9 @@ class TestPMACTrajectoryPart(ChildTestCase):
             call.put('pointsToBuild', 2),
             call.put('positionsA', pytest.approx([-0.06875, -0.1375])),
             call.put('positionsB', pytest.approx([0.1, 0.0])),
-            call.put('timeArray', [282843, 282842]),
-            call.put('userPrograms', [8, 8]),
-            call.put('velocityMode', [0, 2]),
+            call.put('timeArray', exactly([282843, 282842])),
+            call.put('userPrograms', exactly([8, 8])),
+            call.put('velocityMode', exactly([0, 2])),
             call.post('buildProfile'),
             call.post('executeProfile'),
         ] + self.resolutions_and_use_call() + [
@@ -165,9 +177,12 @@ class TestPMACTrajectoryPart(ChildTestCase):
         positionsA = self.child.handled_requests.put.call_args_list[-5][0][1]
         assert len(positionsA) == 4
         assert positionsA[-1] == 0.25
-        assert self.o.end_index == 2
-        assert len(self.o.completed_steps_lookup) == 5
-        assert len(self.o.profile["time_array"]) == 1
+        assert self.o.buffer_headroom.value == 4
+        # The next chunk is calculated in the background
+        self.o.wait_for_prefetch()
+        assert self.o.end_index == 3
+        assert len(self.o.completed_steps_lookup) == 9
+        assert len(self.o.profile["time_array"]) == 5
         update_completed_steps = Mock()
         self.child.handled_requests.reset_mock()
         self.o.update_step(
@@ -180,16 +195,18 @@ class TestPMACTrajectoryPart(ChildTestCase):
                 0.375, 0.5, 0.625, 0.6375])),
             call.put('positionsB', pytest.approx([
                 0.0, 0.0, 0.0, 0.05])),
-            call.put('timeArray', [
-                500000, 500000, 500000, 200000]),
-            call.put('userPrograms', [
-                3, 4, 2, 8]),
-            call.put('velocityMode', [
-                0, 0, 1, 0]),
+            call.put('timeArray', exactly([
+                500000, 500000, 500000, 200000])),
+            call.put('userPrograms', exactly([
+                3, 4, 2, 8])),
+            call.put('velocityMode', exactly([
+                0, 0, 1, 0])),
             call.post('appendProfile')]
-        assert self.o.end_index == 3
-        assert len(self.o.completed_steps_lookup) == 9
-        assert len(self.o.profile["time_array"]) == 1
+        assert self.o.buffer_headroom.value == 5
+        self.o.wait_for_prefetch()
+        assert self.o.end_index == 5
+        assert len(self.o.completed_steps_lookup) == 13
+        assert len(self.o.profile["time_array"]) == 5
 
     def test_run(self):
         update = Mock()
@@ -212,9 +229,9 @@ class TestPMACTrajectoryPart(ChildTestCase):
             call.put('useY', False),
             call.put('useZ', False),
             call.put('pointsToBuild', 1),
-            call.put('timeArray', [100000]),
-            call.put('userPrograms', [8]),
-            call.put('velocityMode', [3]),
+            call.put('timeArray', exactly([100000])),
+            call.put('userPrograms', exactly([8])),
+            call.put('velocityMode', exactly([3])),
             call.post('buildProfile'),
             call.post('executeProfile')]
 
@@ -232,11 +249,11 @@ class TestPMACTrajectoryPart(ChildTestCase):
             call.put('pointsToBuild', 8),
             call.put('positionsA', pytest.approx([
                 0.625, 0.5, 0.375, 0.25, 0.125, 0.0, -0.125, -0.1375])),
-            call.put('timeArray', [
+            call.put('timeArray', exactly([
                 100000, 500000, 500000, 500000, 500000, 500000, 500000,
-                100000]),
-            call.put('userPrograms', [3, 4, 3, 4, 3, 4, 2, 8]),
-            call.put('velocityMode', [2, 0, 0, 0, 0, 0, 1, 3]),
+                100000])),
+            call.put('userPrograms', exactly([3, 4, 3, 4, 3, 4, 2, 8])),
+            call.put('velocityMode', exactly([2, 0, 0, 0, 0, 0, 1, 3])),
             call.post('buildProfile')]
 
     @patch("malcolm.modules.pmac.parts.pmactrajectorypart.INTERPOLATE_INTERVAL",
@@ -250,12 +267,14 @@ class TestPMACTrajectoryPart(ChildTestCase):
                 0.625, 0.5625, 0.5, 0.4375, 0.375, 0.3125, 0.25, 0.1875,
                 0.125, 0.0625, 0.0, -0.0625, -0.125,
                 -0.12506377551020409])),
-            call.put('timeArray',
+            call.put('timeArray', exactly(
                  [7143, 3500000, 3500000, 3500000, 3500000, 3500000, 3500000,
                   3500000, 3500000, 3500000, 3500000, 3500000, 3500000,
-                  7143]),
-            call.put('userPrograms', [3, 0, 4, 0, 3, 0, 4, 0, 3, 0, 4, 0, 2, 8]),
-            call.put('velocityMode', [2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 3]),
+                  7143])),
+            call.put('userPrograms', exactly(
+                [3, 0, 4, 0, 3, 0, 4, 0, 3, 0, 4, 0, 2, 8])),
+            call.put('velocityMode', exactly(
+                [2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 3])),
             call.post('buildProfile')]
         assert self.o.completed_steps_lookup == (
                          [3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 6, 6])
@@ -268,6 +287,111 @@ class TestPMACTrajectoryPart(ChildTestCase):
             call.put('pointsToBuild', 5),
             call.put('positionsA', pytest.approx([
                 -8.2575, -6.1775, -4.0975, -2.0175, -0.1375])),
-            call.put('timeArray', [2080000, 2080000, 2080000, 2080000, 2080000]),
-            call.put('userPrograms', [8, 8, 8, 8, 8]),
-            call.put('velocityMode', [0, 0, 0, 0, 2])]
+            call.put('timeArray', exactly(
+                [2080000, 2080000, 2080000, 2080000, 2080000])),
+            call.put('userPrograms', exactly([8, 8, 8, 8, 8])),
+            call.put('velocityMode', exactly([0, 0, 0, 0, 2]))]
+
+    def test_generator_profile_fills_buffer(self):
+        part_info = self.make_part_info()
+        xs = LineGenerator("x", "mm", 0.0, 0.5, 1000, alternate=False)
+        ys = LineGenerator("y", "mm", 0.0, 0.1, 10)
+        generator = CompoundGenerator([ys, xs], [], [], 0.1)
+        generator.prepare()
+        self.o.generator = generator
+        self.o.min_turnaround = Mock(value=0.0)
+        _, self.o.axis_mapping = self.o._make_axis_mapping(
+            part_info, ["x", "y"])
+        self.o.steps_up_to = generator.size
+        self.o.completed_steps_lookup = []
+        self.o.profile = ProfileBuffer(["x", "y"])
+        self.o.calculate_generator_profile(0, do_run_up=True)
+        # Filled the profile, stopping at the end of the point that filled it
+        assert len(self.o.profile["time_array"]) == 10001
+        assert self.o.end_index == 4910
+        assert self.o.completed_steps_lookup[-2:] == [4909, 4910]
+        # The end of each row is a dead frame followed by a gap
+        assert list(self.o.profile["user_programs"][1999:2002]) == [4, 2, 8]
+        assert self.o.completed_steps_lookup[1999:2002] == [999, 1000, 1000]
+
+    def test_size_chunks(self):
+        self.o.size_chunks(1000, 0.5, 0.1)
+        assert self.o.chunk_points.value == 10000
+        assert self.o.refill_points.value == 10000
+        self.o.target_headroom.set_value(2.0)
+        self.o.size_chunks(1000, 0.5, 0.1)
+        assert self.o.chunk_points.value == 4000
+        assert self.o.refill_points.value == 4000
+        # Points in front of the PMAC cover calculating the next chunk
+        self.o.size_chunks(1000, 0.5, 3.0)
+        assert self.o.refill_points.value == 9000
+        assert self.o.chunk_points.value == 9000
+        # Slow scans still write a reasonable number of points at a time
+        self.o.size_chunks(2, 1.0, 0.1)
+        assert self.o.chunk_points.value == 100
+        self.o.log = Mock()
+        self.o.size_chunks(10000, 0.01, 0.1)
+        assert self.o.chunk_points.value == 2000000
+        self.o.log.warning.assert_called_once()
+
+    @patch("malcolm.modules.pmac.parts.pmactrajectorypart.INTERPOLATE_INTERVAL",
+           0.2)
+    def test_configure_with_target_headroom(self):
+        self.o.target_headroom.set_value(1000.0)
+        self.do_configure(axes_to_scan=["x", "y"])
+        # The whole scan is 16 points that take 6.6s
+        assert self.o.points_sent == 16
+        assert self.o.chunk_points.value == 2425
+        assert self.o.refill_points.value == 2425
+
+    def test_time_array_to_ticks(self):
+        ticks = self.o.time_array_to_ticks(
+            np.array([0.1, 1 / 3., 1 / 3., 1 / 3.]))
+        assert ticks.dtype == np.int32
+        # Total time is kept when the fractional ticks are carried along
+        assert ticks.tolist() == [100000, 333333, 333334, 333333]
+        ticks = self.o.time_array_to_ticks(np.full(7000, 0.0071428575))
+        assert ticks.sum() == 50000003
+
+
+class TestProfileBuffer(unittest.TestCase):
+    def setUp(self):
+        self.o = ProfileBuffer(["x"], 4)
+
+    def extend(self, num, start=0):
+        self.o.extend(
+            time_array=np.full(num, 0.1),
+            velocity_mode=np.zeros(num, dtype=np.int32),
+            user_programs=np.full(num, 4, dtype=np.int32),
+            trajectory=dict(x=np.arange(start, start + num, dtype=float)))
+
+    def test_take_leaves_chunk_alone(self):
+        self.extend(3)
+        self.extend(3, start=3)
+        assert len(self.o) == 6
+        chunk = self.o.take(4)
+        assert chunk["trajectory"]["x"].tolist() == [0, 1, 2, 3]
+        assert len(self.o) == 2
+        self.extend(3, start=6)
+        assert chunk["trajectory"]["x"].tolist() == [0, 1, 2, 3]
+        assert self.o["trajectory"]["x"].tolist() == [4, 5, 6, 7, 8]
+        assert self.o["user_programs"].dtype == np.int32
+        chunk = self.o.take(4)
+        assert chunk["time_array"].tolist() == [0.1] * 4
+        chunk = self.o.take(4)
+        assert chunk["trajectory"]["x"].tolist() == [8]
+        assert not self.o
+
+    def test_take_reuses_two_buffers(self):
+        self.extend(4)
+        first = self.o.take(3)["time_array"].base
+        self.extend(3, start=4)
+        second = self.o.take(3)["time_array"].base
+        assert first is not second
+        for i in range(10):
+            self.extend(3, start=7 + 3 * i)
+            chunk = self.o.take(3)
+            assert chunk["trajectory"]["x"].tolist() == [
+                6 + 3 * i, 7 + 3 * i, 8 + 3 * i]
+            base = chunk["time_array"].base
+            assert base is (first if i % 2 == 0 else second)
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+from scanpointgenerator import LineGenerator, CompoundGenerator, \
+    SpiralGenerator, CircularROI, ROIExcluder, RandomOffsetMutator
+
+from malcolm.modules.scanpointgenerator.points import get_points
+
+
+class TestGetPoints(unittest.TestCase):
+
+    def setUp(self):
+        xs = LineGenerator("x", "mm", 0.0, 0.5, 3, alternate=True)
+        ys = LineGenerator("y", "mm", 0.0, 0.1, 2)
+        self.generator = CompoundGenerator([ys, xs], [], [], 0.1)
+        self.generator.prepare()
+
+    def assert_matches_get_point(self, generator, start, finish):
+        points = get_points(generator, start, finish)
+        assert len(points) == finish - start
+        for i in range(finish - start):
+            expected = generator.get_point(start + i)
+            for axis in generator.axes:
+                assert points.positions[axis][i] == expected.positions[axis]
+                assert points.lower[axis][i] == expected.lower[axis]
+                assert points.upper[axis][i] == expected.upper[axis]
+            assert list(points.indexes[i]) == expected.indexes
+            assert points.duration[i] == expected.duration
+
+    def test_matches_get_point(self):
+        self.assert_matches_get_point(self.generator, 1, 5)
+        points = get_points(self.generator, 1, 5)
+        np.testing.assert_equal(points.upper["x"], [0.375, 0.625, 0.375, 0.125])
+
+    def test_matches_get_point_nested_alternating(self):
+        zs = LineGenerator("z", "mm", 1.0, 2.0, 3, alternate=True)
+        ys = LineGenerator("y", "mm", 0.0, 0.1, 4, alternate=True)
+        xs = LineGenerator("x", "mm", 0.0, 0.5, 5, alternate=True)
+        generator = CompoundGenerator([zs, ys, xs], [], [], 0.1)
+        generator.prepare()
+        self.assert_matches_get_point(generator, 0, generator.size)
+        self.assert_matches_get_point(generator, 7, 23)
+
+    def test_matches_get_point_with_region(self):
+        ys = LineGenerator("y", "mm", 0.0, 1.0, 6, alternate=True)
+        xs = LineGenerator("x", "mm", 0.0, 1.0, 7, alternate=True)
+        excluder = ROIExcluder([CircularROI([0.5, 0.5], 0.4)], ["x", "y"])
+        generator = CompoundGenerator([ys, xs], [excluder], [], 0.2)
+        generator.prepare()
+        assert len(generator.dimensions) == 1
+        self.assert_matches_get_point(generator, 0, generator.size)
+
+    def test_matches_get_point_spiral_not_continuous(self):
+        zs = LineGenerator("z", "mm", 1.0, 2.0, 2)
+        spiral = SpiralGenerator(["x", "y"], "mm", [0.0, 0.0], 1.0)
+        generator = CompoundGenerator([zs, spiral], [], [], 0.1,
+                                      continuous=False)
+        generator.prepare()
+        self.assert_matches_get_point(generator, 0, generator.size)
+
+    def test_matches_get_point_with_mutator(self):
+        xs = LineGenerator("x", "mm", 0.0, 0.5, 5)
+        mutator = RandomOffsetMutator(1, ["x"], dict(x=0.1))
+        generator = CompoundGenerator([xs], [], [mutator], 0.1)
+        generator.prepare()
+        self.assert_matches_get_point(generator, 0, generator.size)
+
+    def test_getitem(self):
+        point = get_points(self.generator, 0, 6)[4]
+        assert point.positions == dict(x=0.25, y=0.1)
+        assert point.upper == dict(x=0.125, y=0.1)
+        assert point.indexes == [1, 1]
+        assert point.duration == 0.1
+
+    def test_empty_range_fails(self):
+        with self.assertRaises(AssertionError):
+            get_points(self.generator, 3, 3)
@@ -9,6 +9,7 @@ from malcolm.core import Process, call_with_params, Queue, Context, \
 from malcolm.modules.builtin.blocks import proxy_block
 from malcolm.modules.demo.blocks import hello_block, counter_block
 from malcolm.modules.web.blocks import web_server_block, websocket_client_block
+from malcolm.modules.web.controllers import WebsocketClientComms
 
 
 class TestSystemWSCommsServerOnly(unittest.TestCase):
@@ -97,3 +98,22 @@ class TestSystemWSCommsServerAndClient(unittest.TestCase):
         assert block2.counter.value == 0
         assert self.client.remote_blocks.value == (
             "hello", "counter", "server")
+
+
+class TestSystemWSCommsServerAndBinaryClient(TestSystemWSCommsServerAndClient):
+    socket = 8885
+
+    def setUp(self):
+        self.process = Process("proc")
+        self.hello = call_with_params(hello_block, self.process, mri="hello")
+        self.counter = call_with_params(
+            counter_block, self.process, mri="counter")
+        self.server = call_with_params(
+            web_server_block, self.process, mri="server", port=self.socket)
+        self.process.start()
+        self.process2 = Process("proc2")
+        self.client = call_with_params(
+            WebsocketClientComms, self.process2, (), mri="client",
+            port=self.socket, binary=True)
+        self.process2.add_controller("client", self.client)
+        self.process2.start()
@@ -15,4 +15,5 @@ class TestWebsocketClientComms(unittest.TestCase):
         assert self.o.params.hostname == "localhost"
         assert self.o.params.port == 8080
         assert self.o.params.connectTimeout == 5.0
+        assert self.o.params.binary is False
         assert self.o.mri == "mri"
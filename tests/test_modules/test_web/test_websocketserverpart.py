@@ -0,0 +1,59 @@
+import unittest
+
+from mock import MagicMock, patch
+import numpy as np
+
+from malcolm.core import call_with_params, json_encode, Update, Delta, \
+    Return, Error
+from malcolm.modules.web.parts import WebsocketServerPart
+
+
+class TestWebsocketServerPart(unittest.TestCase):
+
+    def setUp(self):
+        self.o = call_with_params(WebsocketServerPart, name="ws")
+
+    def test_encode_matches_json_encode(self):
+        value = dict(typeid="epics:nt/NTScalarArray:1.0",
+                     value=np.arange(5, dtype=np.float64))
+        for response in (Update(3, value),
+                         Delta(4, [[["value"], np.arange(3)], [["alarm"]]]),
+                         Return(5, 32),
+                         Error(6, "bad")):
+            assert self.o._encode_response(response) == json_encode(response)
+
+    def test_payload_encoded_once(self):
+        value = dict(value=np.arange(100000, dtype=np.float64))
+        changes = [[["value"], np.arange(10)]]
+        n_clients = 40
+        notify_batch = {}
+        responses = []
+        # Clients of two nodes interleaved, as the tornado loop may see them
+        for i in range(n_clients):
+            responses += [Update(i, value), Delta(i + n_clients, changes)]
+        for response in responses:
+            response.notify_batch = notify_batch
+        with patch("malcolm.modules.web.parts.websocketserverpart."
+                   "json_encode", side_effect=json_encode) as mock_encode:
+            for response in responses:
+                self.o.on_response(response, MagicMock())
+        # One call for each payload, then typeid and id for each client
+        payload_calls = [c for c in mock_encode.call_args_list
+                         if c[0][0] is value or c[0][0] is changes]
+        assert len(payload_calls) == 2
+
+    def test_new_batch_reencoded(self):
+        value = np.arange(3)
+        response = Update(1, value)
+        response.notify_batch = {}
+        assert self.o._encode_response(response) == \
+            '{"typeid": "malcolm:core/Update:1.0", "id": 1, "value": [0, 1, 2]}'
+        value[1] = 5
+        response = Update(2, value)
+        response.notify_batch = {}
+        assert self.o._encode_response(response) == \
+            '{"typeid": "malcolm:core/Update:1.0", "id": 2, "value": [0, 5, 2]}'
+        # Without a batch it is always encoded
+        value[1] = 6
+        assert self.o._encode_response(Update(3, value)) == \
+            '{"typeid": "malcolm:core/Update:1.0", "id": 3, "value": [0, 6, 2]}'